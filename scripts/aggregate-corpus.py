@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""training-corpus の重複した文をまとめ、learn-corpus に渡すコーパスを work/corpus/ に作る。
+
+Usage:
+    python3 scripts/aggregate-corpus.py [--out work/corpus/] [--keep-num]
+                                        [--may-epochs N] [--should-epochs N] [--must-epochs N]
+
+同じ tier の完全に同じ行、数字+接尾辞のトークン (`3時頃/3じごろ`) の数字だけが
+違う行 (--keep-num で無効)、上の tier にもある行を除き、tier ごとに除いた行数と、
+学習の量 (行数 × エポック数) がどれだけ減ったかを表示する。
+まとめた行とその件数は work/corpus/groups.tsv に書く。
+
+既定では使わない。make CORPUS_DIR=work/corpus で data/bigram.model をこの出力から
+学習する。既定を変えるときは、前後の make evaluate の結果を比べること。
+規則の詳細は akaza_tools/aggregate.py を参照。
+"""
+
+import argparse
+import sys
+
+from akaza_tools.aggregate import EXACT, NUM, TIER, TIERS, aggregate
+from akaza_tools.sweep import DEFAULTS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="training-corpus の重複した文をまとめる")
+    parser.add_argument("--out", default="work/corpus/")
+    for tier in TIERS:
+        parser.add_argument(f"--{tier}-epochs", type=int, default=DEFAULTS[f"{tier}_epochs"],
+                            help="学習の量の見積もりに使うエポック数")
+    parser.add_argument("--keep-num", action="store_true",
+                        help="数字だけが違う行をまとめない (<NUM> に正規化せずに比べる)")
+    args = parser.parse_args()
+
+    try:
+        aggregator = aggregate(args.out, merge_num=not args.keep_num)
+    except FileNotFoundError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"{'tier':<8} {'lines':>6} {'kept':>6} {EXACT:>6} {NUM:>6} {TIER:>6} "
+          f"{'epochs':>7} {'work':>10} {'saved':>10}")
+    total_before = total_after = 0
+    for tier in TIERS:
+        s = aggregator.stats[tier]
+        epochs = getattr(args, f"{tier}_epochs")
+        before, after = s.lines * epochs, s.kept * epochs
+        total_before += before
+        total_after += after
+        print(f"{tier:<8} {s.lines:>6} {s.kept:>6} {s.removed[EXACT]:>6} {s.removed[NUM]:>6} {s.removed[TIER]:>6} "
+              f"{epochs:>7} {after:>10} {before - after:>10}")
+    saved = total_before - total_after
+    print(f"\n学習の量 (行 × エポック): {total_before} → {total_after} "
+          f"(-{saved / max(total_before, 1) * 100:.1f}%)")
+    print(f"Saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
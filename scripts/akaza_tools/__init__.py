@@ -0,0 +1,5 @@
+"""scripts/ 以下の評価・分析ツールで共有するモジュール群。
+
+scripts/*.py は `python3 scripts/xxx.py` として実行されるため、
+sys.path の先頭に scripts/ が入り、このパッケージを import できる。
+"""
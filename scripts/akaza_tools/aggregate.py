@@ -0,0 +1,137 @@
+"""learn-corpus の前に、training-corpus の重複した文をまとめる (任意)。
+
+must → should → may の順に1行ずつ読み、空白を1つにした行が同じ文は
+最初の1行だけを残す。
+
+- 同じ tier に同じ行が複数あれば1行にする
+- 上の tier にある文は下の tier からは消す (上の tier のほうがエポック数が多く、
+  同じ文を下の tier で学習しても結果はほとんど変わらない)
+
+merge_num なら (既定)、数字+接尾辞のトークンだけが違う行もまとめる。
+akaza-data はモデルを作るときに `3時頃/3じごろ` → `<NUM>時頃/<NUM>じごろ` のように
+正規化してカウントを集約するので (docs/num-token-normalization.md)、
+normalize_num_token で同じ正規化をした行で比べる。裸の数字 (`1/1`) と、先頭が
+数字でないトークン (`第1回/だい1かい`) はそのまま。全角・半角だけが違う行はまとめない。
+
+learn-corpus が学習のときにも同じ正規化をするかは、akaza-data のソースで
+確かめられていない。まとめ方を変えたら make CORPUS_DIR=work/corpus evaluate の
+結果を、--keep-num で作ったものと比べること。
+
+learn-corpus は文ごとの重みを受け取れないので、まとめた件数 (重み) は
+groups.tsv に記録するだけにしている。
+"""
+
+import hashlib
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+from akaza_tools.incremental import TRAINING_CORPORA
+
+TIERS = ("must", "should", "may")
+AGGREGATED_DIR = "work/corpus"
+
+# 除いた理由
+EXACT = "exact"  # 同じ tier の同じ行
+TIER = "tier"  # 上の tier にある
+NUM = "num"  # 数字+接尾辞のトークンの数字だけが違う
+
+NUM_TOKEN = "<NUM>"
+_LEADING_DIGITS = re.compile(r"[0-9]+")
+
+
+def normalize_num_token(token: str) -> str:
+    """"1匹/1ひき" → "<NUM>匹/<NUM>ひき"。akaza-data の normalize_num_token と同じ規則。
+
+    表層が ASCII の数字で始まり、そのあとに接尾辞があるときだけ、表層と読みの
+    先頭の数字を <NUM> にする。裸の数字 ("1/1") や数字で始まらないトークンはそのまま。
+    """
+    surface, sep, reading = token.partition("/")
+    m = _LEADING_DIGITS.match(surface)
+    if not sep or m is None or m.end() == len(surface):
+        return token
+    return (NUM_TOKEN + surface[m.end():] + "/"
+            + _LEADING_DIGITS.sub(NUM_TOKEN, reading, count=1))
+
+
+def tier_corpora(corpus_dir: str) -> tuple[str, ...]:
+    """corpus_dir の must, should, may のコーパスのパス。"""
+    return tuple(os.path.join(corpus_dir, f"{tier}.txt") for tier in TIERS)
+
+
+# Makefile で CORPUS_DIR=work/corpus にしたときのコーパス (must, should, may)
+AGGREGATED_CORPORA = tier_corpora(AGGREGATED_DIR)
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode(), digest_size=8).digest()
+
+
+@dataclass
+class TierStats:
+    lines: int = 0
+    kept: int = 0
+    removed: Counter = field(default_factory=Counter)
+
+
+@dataclass
+class Group:
+    tier: str
+    line: str  # 残した行
+    weight: int = 1
+
+
+class Aggregator:
+    """行ごとに最初の1行だけを残す。行は 8 バイトのハッシュで持つ。"""
+
+    def __init__(self, merge_num: bool = True):
+        self.merge_num = merge_num
+        self.groups: dict[bytes, Group] = {}
+        self.stats = {tier: TierStats() for tier in TIERS}
+
+    def key(self, line: str) -> str:
+        """まとめるかどうかを比べる文字列。"""
+        if not self.merge_num:
+            return line
+        return " ".join(normalize_num_token(token) for token in line.split(" "))
+
+    def feed(self, tier: str, line: str) -> bool:
+        """行を残すなら True。"""
+        stats = self.stats[tier]
+        stats.lines += 1
+        line = " ".join(line.split())
+        digest = _digest(self.key(line))
+        group = self.groups.get(digest)
+        if group is None:
+            self.groups[digest] = Group(tier, line)
+            stats.kept += 1
+            return True
+        group.weight += 1
+        if group.tier != tier:
+            stats.removed[TIER] += 1
+        else:
+            stats.removed[EXACT if group.line == line else NUM] += 1
+        return False
+
+
+def aggregate(out_dir: str, corpora=TRAINING_CORPORA, merge_num: bool = True) -> Aggregator:
+    """corpora (must, should, may の順) をまとめて out_dir/<tier>.txt に書く。"""
+    os.makedirs(out_dir, exist_ok=True)
+    aggregator = Aggregator(merge_num)
+    for tier, path in zip(TIERS, corpora):
+        tmp = os.path.join(out_dir, f"{tier}.txt.tmp")
+        with open(path) as src, open(tmp, "w") as dst:
+            for line in src:
+                if not line.strip() or line.startswith(";;"):
+                    continue
+                if aggregator.feed(tier, line):
+                    dst.write(" ".join(line.split()) + "\n")
+        os.replace(tmp, os.path.join(out_dir, f"{tier}.txt"))
+
+    with open(os.path.join(out_dir, "groups.tsv"), "w") as f:
+        f.write("weight\ttier\tline\n")
+        for group in sorted(aggregator.groups.values(), key=lambda g: -g.weight):
+            if group.weight > 1:
+                f.write(f"{group.weight}\t{group.tier}\t{group.line}\n")
+    return aggregator
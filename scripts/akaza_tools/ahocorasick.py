@@ -0,0 +1,65 @@
+"""Aho–Corasick 法による複数文字列の同時検索。
+
+パターン数によらず、テキストの長さに比例する時間で全出現位置を列挙する。
+"""
+
+from typing import Iterator
+
+
+class Automaton:
+    """パターン集合から作るオートマトン。pickle してキャッシュできる。"""
+
+    def __init__(self, patterns):
+        self.patterns: list[str] = []
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.output: list[list[int]] = [[]]  # 状態ごとに、そこで終わるパターンの番号
+
+        for pattern in patterns:
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = nxt
+            self.output[state].append(len(self.patterns))
+            self.patterns.append(pattern)
+
+        # 幅優先で失敗遷移を作り、失敗先の出力を引き継ぐ
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterator[tuple[int, int]]:
+        """(開始位置, パターン番号) を出現の終了位置順に返す。"""
+        goto, fail, output, patterns = self.goto, self.fail, self.output, self.patterns
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for p in output[state]:
+                yield i + 1 - len(patterns[p]), p
+
+    def search(self, text: str) -> bool:
+        """いずれかのパターンが text に含まれていれば True。"""
+        return next(self.iter_matches(text), None) is not None
+
+    def matches_by_start(self, text: str) -> dict[int, list[int]]:
+        """開始位置ごとのパターン番号の一覧。"""
+        starts: dict[int, list[int]] = {}
+        for start, p in self.iter_matches(text):
+            starts.setdefault(start, []).append(p)
+        return starts
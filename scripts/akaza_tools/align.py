@@ -0,0 +1,195 @@
+"""期待値 (corpus) と変換結果 (akaza) のアライメントによる誤り箇所の抽出。
+
+anthy-corpus は期待値が `|` で文節に区切られているので、まず文節単位で
+前方・後方から一致する文節を取り除き、残りの区間の中で両側に1回ずつしか
+現れない文節をアンカーにして再帰的に分割する。アンカーが見つからない区間が
+1つの誤り箇所になる。ただし区間に文節が複数あれば、文字数が両側で同じなら
+文節の境界で切り、違えば区間の中の文字単位の差分を文節の境界で切って、
+文節ごとの誤り箇所に分ける。文節の情報がない場合は文字単位の差分に
+フォールバックする。
+
+1文に複数の誤りがある場合も、それぞれを別の Span として返す。
+"""
+
+import bisect
+import difflib
+from collections import Counter
+from dataclasses import dataclass
+
+from akaza_tools.evaluate import EVALUATE_CORPORA, iter_corpus_lines
+
+
+@dataclass(frozen=True)
+class Span:
+    corpus: str  # 期待値側の誤り箇所
+    akaza: str  # 変換結果側の誤り箇所
+    start: int  # 期待値での開始位置 (文字)
+    reading: str | None = None  # 誤り箇所を含む文節の読み (文節の情報がある場合)
+
+
+def _trim(corpus: str, akaza: str) -> tuple[int, str, str]:
+    """共通の前方・後方を除き、(前方一致の長さ, corpus 側, akaza 側) を返す。"""
+    i = 0
+    while i < len(corpus) and i < len(akaza) and corpus[i] == akaza[i]:
+        i += 1
+    j_c, j_a = len(corpus), len(akaza)
+    while j_c > i and j_a > i and corpus[j_c - 1] == akaza[j_a - 1]:
+        j_c -= 1
+        j_a -= 1
+    return i, corpus[i:j_c], akaza[i:j_a]
+
+
+class _BunsetsuAligner:
+    def __init__(self, bunsetsu: list[str], akaza: str, readings: list[str] | None):
+        self.bunsetsu = bunsetsu
+        self.akaza = akaza
+        self.readings = readings
+        self.offsets = [0]
+        for b in bunsetsu:
+            self.offsets.append(self.offsets[-1] + len(b))
+        self.spans: list[Span] = []
+
+    def align(self, lo: int, hi: int, a_lo: int, a_hi: int) -> None:
+        bunsetsu, akaza = self.bunsetsu, self.akaza
+        while (lo < hi and a_lo + len(bunsetsu[lo]) <= a_hi
+               and akaza.startswith(bunsetsu[lo], a_lo)):
+            a_lo += len(bunsetsu[lo])
+            lo += 1
+        while (hi > lo and a_hi - len(bunsetsu[hi - 1]) >= a_lo
+               and akaza.endswith(bunsetsu[hi - 1], a_lo, a_hi)):
+            a_hi -= len(bunsetsu[hi - 1])
+            hi -= 1
+        if lo == hi and a_lo == a_hi:
+            return
+
+        anchor = self._find_anchor(lo, hi, a_lo, a_hi) if lo < hi and a_lo < a_hi else None
+        if anchor is None:
+            self._emit(lo, hi, a_lo, a_hi)
+            return
+        j, q = anchor
+        self.align(lo, j, a_lo, q)
+        self.align(j + 1, hi, q + len(bunsetsu[j]), a_hi)
+
+    def _find_anchor(self, lo, hi, a_lo, a_hi) -> tuple[int, int] | None:
+        """区間内で期待値側・変換結果側の両方に1回だけ現れる最長の文節を探す。"""
+        counts = Counter(self.bunsetsu[lo:hi])
+        best = None
+        for j in range(lo, hi):
+            b = self.bunsetsu[j]
+            if len(b) < 2 or counts[b] != 1:
+                continue
+            if best is not None and len(b) <= len(self.bunsetsu[best[0]]):
+                continue
+            q = self.akaza.find(b, a_lo, a_hi)
+            if q < 0 or self.akaza.find(b, q + 1, a_hi) >= 0:
+                continue
+            best = (j, q)
+        return best
+
+    def _emit(self, lo, hi, a_lo, a_hi) -> None:
+        if hi - lo < 2 or a_lo == a_hi:
+            self._emit_span(lo, hi, a_lo, a_hi)
+            return
+        # 区間の文字数が期待値と変換結果で同じなら、文節の境界で切っても長さが揃うので
+        # 文節ごとに別の誤り箇所にする (良い|天気 → いい転記 は 良い→いい と 天気→転記)
+        if a_hi - a_lo == self.offsets[hi] - self.offsets[lo]:
+            for j in range(lo, hi):
+                q = a_lo + self.offsets[j] - self.offsets[lo]
+                if not self.akaza.startswith(self.bunsetsu[j], q):
+                    self._emit_span(j, j + 1, q, q + len(self.bunsetsu[j]))
+            return
+        # 長さが違えば区間の中で文字単位の差分を取り、文節の境界で切って文節ごとに
+        # まとめる (私は|学校へ|行きました → わたしは学校絵いきました は
+        # 私→わたし, へ→絵, 行→い)
+        corpus = "".join(self.bunsetsu[lo:hi])
+        akaza = self.akaza[a_lo:a_hi]
+        base = self.offsets[lo]
+        pieces: list[list[int]] = []  # [最初の文節, 最後の文節 + 1, i1, i2, j1, j2]
+        opcodes = difflib.SequenceMatcher(None, corpus, akaza, autojunk=False).get_opcodes()
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == "equal":
+                continue
+            # 文字数が同じ置き換えは、変換結果も同じ位置で文節の境界で切る
+            while i2 - i1 == j2 - j1:
+                first, _ = self._covering(base + i1, base + i2, lo, hi)
+                cut = self.offsets[first + 1] - base
+                if cut >= i2:
+                    break
+                pieces.append([first, first + 1, i1, cut, j1, j1 + cut - i1])
+                i1, j1 = cut, j1 + cut - i1
+            first, end = self._covering(base + i1, base + i2, lo, hi)
+            prev = pieces[-1] if pieces else None
+            if prev and prev[3] == i1 and prev[5] == j1 and prev[1] > first:
+                prev[1], prev[3], prev[5] = max(prev[1], end), i2, j2
+            else:
+                pieces.append([first, end, i1, i2, j1, j2])
+        for first, end, i1, i2, j1, j2 in pieces:
+            reading = "".join(self.readings[first:end]) if self.readings else None
+            self.spans.append(Span(corpus[i1:i2], akaza[j1:j2], base + i1, reading))
+
+    def _covering(self, start, stop, lo, hi) -> tuple[int, int]:
+        """期待値の start〜stop (文字) を含む文節の範囲 [最初, 最後 + 1)。"""
+        first = min(max(bisect.bisect_right(self.offsets, start) - 1, lo), hi - 1)
+        end = min(max(bisect.bisect_left(self.offsets, stop), first + 1), hi)
+        return first, end
+
+    def _emit_span(self, lo, hi, a_lo, a_hi) -> None:
+        corpus = "".join(self.bunsetsu[lo:hi])
+        prefix, c_diff, a_diff = _trim(corpus, self.akaza[a_lo:a_hi])
+        reading = "".join(self.readings[lo:hi]) if self.readings else None
+        self.spans.append(Span(c_diff, a_diff, self.offsets[lo] + prefix, reading))
+
+
+def align_bunsetsu(bunsetsu: list[str], akaza: str,
+                   readings: list[str] | None = None) -> list[Span]:
+    """文節に区切られた期待値と変換結果を比較し、誤り箇所を返す。"""
+    aligner = _BunsetsuAligner(bunsetsu, akaza, readings)
+    aligner.align(0, len(bunsetsu), 0, len(akaza))
+    return aligner.spans
+
+
+def align_chars(corpus: str, akaza: str) -> list[Span]:
+    """文節の情報がない場合の文字単位の差分。"""
+    opcodes = difflib.SequenceMatcher(None, corpus, akaza, autojunk=False).get_opcodes()
+    spans = []
+    current = None
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            if current is not None:
+                spans.append(current)
+                current = None
+            continue
+        if current is None:
+            current = [i1, i2, j1, j2]
+        else:
+            current[1], current[3] = i2, j2
+    if current is not None:
+        spans.append(current)
+    result = []
+    for i1, i2, j1, j2 in spans:
+        prefix, c_diff, a_diff = _trim(corpus[i1:i2], akaza[j1:j2])
+        result.append(Span(c_diff, a_diff, i1 + prefix))
+    return result
+
+
+class BunsetsuIndex:
+    """評価コーパスの (読み, 期待値) から文節区切りを引く。"""
+
+    def __init__(self, corpora=EVALUATE_CORPORA):
+        self.bunsetsu: dict[tuple[str, str], tuple[list[str], list[str] | None]] = {}
+        for line in iter_corpus_lines(corpora):
+            reading, _, surface = line.partition(" ")
+            readings = [r for r in reading.split("|") if r]
+            surfaces = [s for s in surface.split("|") if s]
+            if len(readings) != len(surfaces):
+                readings = None
+            self.bunsetsu["".join(reading.split("|")), "".join(surfaces)] = (
+                surfaces, readings)
+
+    def align(self, reading: str, corpus: str, akaza: str) -> list[Span]:
+        """文節の情報があれば文節単位、なければ文字単位でアライメントする。"""
+        entry = self.bunsetsu.get((reading, corpus))
+        if entry is None:
+            return align_chars(corpus, akaza)
+        surfaces, readings = entry
+        return align_bunsetsu(surfaces, akaza, readings)
@@ -0,0 +1,184 @@
+"""モデル・辞書の生成物のコンテンツアドレスのキャッシュ (work/cache/)。
+
+キーは入力ファイルを正規化した内容 (`;;` コメント行・空行を除き、空白を
+まとめたもの)、生成コマンドの引数、--salt (CORPUS_STATS_VERSION など)、
+akaza-data のバージョンのハッシュ。コーパスは生成コマンドに渡した .txt の
+ファイル (Makefile の CORPUS_DIR の下のもの) をそのまま入力とするので、
+work/corpus のように別のスクリプトで作ったコーパスも、作り方が変われば
+キーが変わる。コメントや空白だけの変更、ブランチの切り替えやコーパスの
+差し戻しでは、学習し直さずに以前の生成物を取り出せる。
+
+キャッシュは work/cache/<target>/<key>/ に置き、取り出すたびに mtime を
+更新する。合計サイズが上限を超えたら mtime の古い (最近使っていない) ものから消す。
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import time
+from dataclasses import dataclass
+
+CACHE_DIR = "work/cache"
+
+
+@dataclass(frozen=True)
+class Target:
+    inputs: tuple[str, ...]
+    outputs: tuple[str, ...]
+    # 生成コマンドの引数のうち、この拡張子のファイルも入力とする (コーパス)
+    command_suffixes: tuple[str, ...] = ()
+
+
+TARGETS = {
+    "model": Target(
+        inputs=("data/SKK-JISYO.akaza",),
+        outputs=("data/unigram.model", "data/bigram.model", "data/skip_bigram.model"),
+        command_suffixes=(".txt",),
+    ),
+    "dict": Target(
+        inputs=("dict/SKK-JISYO.akaza",),
+        outputs=("data/SKK-JISYO.akaza",),
+        command_suffixes=(".txt",),
+    ),
+}
+
+_SPACES_RE = re.compile(r"[ \t]+")
+_SIZE_RE = re.compile(r"^(\d+(?:\.\d+)?)([KMGT]?)B?$", re.IGNORECASE)
+
+
+def parse_size(text: str) -> int:
+    """"4G" や "500M" をバイト数にする。"""
+    m = _SIZE_RE.match(text.strip())
+    if not m:
+        raise ValueError(f"サイズの指定が不正です: {text!r}")
+    return int(float(m.group(1)) * 1024 ** " KMGT".index(m.group(2).upper() or " "))
+
+
+def normalized_digest(path: str) -> str:
+    """コメント行・空行を除き、空白を正規化した内容の sha256。"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for raw in f:
+            line = _SPACES_RE.sub(" ", raw.decode("utf-8", errors="surrogateescape")).strip()
+            if not line or line.startswith(";;"):
+                continue
+            h.update(line.encode("utf-8", errors="surrogateescape") + b"\n")
+    return h.hexdigest()
+
+
+def akaza_data_version() -> str:
+    try:
+        result = subprocess.run(["akaza-data", "--version"], capture_output=True,
+                                text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return ""
+    return result.stdout.strip()
+
+
+def command_inputs(target: Target, command: list[str]) -> list[str]:
+    """command の引数 (--opt=path の形も含む) に書かれた入力ファイル。"""
+    paths = []
+    for arg in command:
+        path = arg.partition("=")[2] if arg.startswith("-") else arg
+        if (path.endswith(target.command_suffixes) and path not in target.outputs
+                and path not in paths):
+            paths.append(path)
+    return paths
+
+
+def cache_key(target: Target, command: list[str], salt: str = "") -> str:
+    h = hashlib.sha256()
+    for path in (*target.inputs, *command_inputs(target, command)):
+        h.update(f"{path}\0{normalized_digest(path)}\n".encode())
+    h.update("\0".join(command).encode() + b"\n")
+    h.update(f"{salt}\n{akaza_data_version()}\n".encode())
+    return h.hexdigest()[:32]
+
+
+def _entry_dir(name: str, key: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, name, key)
+
+
+def restore(name: str, key: str, cache_dir: str = CACHE_DIR) -> bool:
+    """キャッシュがあれば生成物を取り出して True を返す。"""
+    entry = _entry_dir(name, key, cache_dir)
+    outputs = TARGETS[name].outputs
+    if not all(os.path.exists(os.path.join(entry, os.path.basename(p))) for p in outputs):
+        return False
+    for path in outputs:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        shutil.copyfile(os.path.join(entry, os.path.basename(path)), tmp)
+        os.replace(tmp, path)
+    os.utime(entry)
+    return True
+
+
+def store(name: str, key: str, cache_dir: str = CACHE_DIR) -> None:
+    """生成物をキャッシュに保存する。"""
+    entry = _entry_dir(name, key, cache_dir)
+    tmp = f"{entry}.{os.getpid()}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+    for path in TARGETS[name].outputs:
+        shutil.copyfile(path, os.path.join(tmp, os.path.basename(path)))
+    if os.path.exists(entry):
+        shutil.rmtree(entry)
+    os.replace(tmp, entry)
+
+
+def _dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, f))
+               for root, _, files in os.walk(path) for f in files)
+
+
+def list_entries(cache_dir: str = CACHE_DIR) -> list[tuple[float, int, str]]:
+    """(最終使用時刻, サイズ, パス) を古い順に返す。"""
+    entries = []
+    if not os.path.isdir(cache_dir):
+        return entries
+    for name in sorted(os.listdir(cache_dir)):
+        target_dir = os.path.join(cache_dir, name)
+        if not os.path.isdir(target_dir):
+            continue
+        for key in os.listdir(target_dir):
+            path = os.path.join(target_dir, key)
+            if os.path.isdir(path) and not key.endswith(".tmp"):
+                entries.append((os.path.getmtime(path), _dir_size(path), path))
+    return sorted(entries)
+
+
+def evict(max_size: int, cache_dir: str = CACHE_DIR, keep: str | None = None) -> list[str]:
+    """合計サイズが max_size 以下になるまで、最近使っていないものから消す。"""
+    entries = list_entries(cache_dir)
+    total = sum(size for _, size, _ in entries)
+    removed = []
+    for _, size, path in entries:
+        if total <= max_size:
+            break
+        if keep is not None and os.path.samefile(path, keep):
+            continue
+        shutil.rmtree(path)
+        total -= size
+        removed.append(path)
+    return removed
+
+
+def run(name: str, command: list[str], salt: str = "", max_size: int | None = None,
+        cache_dir: str = CACHE_DIR, log=print) -> int:
+    """キャッシュがあれば取り出し、なければ command を実行して保存する。"""
+    key = cache_key(TARGETS[name], command, salt)
+    if restore(name, key, cache_dir):
+        log(f"build-cache: {name} {key} から取り出しました")
+        return 0
+    start = time.monotonic()
+    returncode = subprocess.run(command).returncode
+    if returncode != 0:
+        return returncode
+    store(name, key, cache_dir)
+    log(f"build-cache: {name} {key} に保存しました ({time.monotonic() - start:.0f}s)")
+    if max_size is not None:
+        for path in evict(max_size, cache_dir, keep=_entry_dir(name, key, cache_dir)):
+            log(f"build-cache: evict {path}")
+    return 0
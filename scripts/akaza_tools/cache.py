@@ -0,0 +1,221 @@
+"""評価結果のバイナリキャッシュ (results.cache)。
+
+tmp/evaluate/<timestamp>/raw.txt をパースした結果を、文 ID (評価コーパスでの
+出現順) ごとの列として保存する。mmap して memoryview で直接参照するので、
+読み込み時にテキストのパースも配列のコピーも発生しない。
+
+フォーマット (リトルエンディアン):
+
+    magic          8 bytes  b"AKZEVAL1"
+    corpus_digest  8 bytes  評価コーパスの (読み, 期待値) 列の sha1 先頭8バイト
+    n_sentences    u32
+    n_strings      u32
+    status         u8  × n_sentences  (0=GOOD, 1=TOP-5, 2=BAD)、4バイト境界までパディング
+    reading_id     u32 × n_sentences
+    corpus_id      u32 × n_sentences
+    akaza_id       u32 × n_sentences  (GOOD の文は corpus_id と同じ)
+    str_offsets    u32 × (n_strings + 1)
+    str_blob       UTF-8 文字列を連結したもの
+
+u32 の列はネイティブのバイトオーダーのまま読み書きするので、
+リトルエンディアンの環境 (x86_64, aarch64) を前提としている。
+corpus_digest が異なるキャッシュ同士は文 ID が対応しないので比較できない。
+評価コーパスが変わる前の raw.txt (文の数や読み・期待値が合わないもの) からは
+キャッシュを作らない (今の corpus_digest を付けると正しいキャッシュに見えてしまう)。
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+from typing import Iterator
+
+from akaza_tools.evaluate import EVALUATE_CORPORA, iter_corpus_lines, parse_summary
+from akaza_tools.records import Record, parse_line, read_records
+
+CACHE_NAME = "results.cache"
+MAGIC = b"AKZEVAL1"
+HEADER = struct.Struct("<8s8sII")
+
+GOOD, TOP5, BAD = 0, 1, 2
+STATUS_CODES = {"TOP-5": TOP5, "BAD": BAD}
+STATUS_NAMES = {GOOD: "GOOD", TOP5: "TOP-5", BAD: "BAD"}
+
+
+def corpus_keys(corpora=EVALUATE_CORPORA) -> list[tuple[str, str]]:
+    """評価コーパスの (読み, 期待値) を文 ID 順に返す。"""
+    keys = []
+    for line in iter_corpus_lines(corpora):
+        reading, _, surface = line.partition(" ")
+        keys.append((reading.replace("|", ""), surface.replace("|", "")))
+    return keys
+
+
+def corpus_digest(keys: list[tuple[str, str]]) -> bytes:
+    h = hashlib.sha1()
+    for reading, surface in keys:
+        h.update(f"{reading}\t{surface}\n".encode())
+    return h.digest()[:8]
+
+
+def cache_path(eval_dir: str) -> str:
+    return os.path.join(eval_dir, CACHE_NAME)
+
+
+def build_cache(eval_dir: str, keys: list[tuple[str, str]] | None = None) -> str:
+    """eval_dir/raw.txt から results.cache を作成してパスを返す。
+
+    raw.txt が今の評価コーパスの結果でなければ (集計行の文の数が違うか、
+    評価コーパスにない文がある)、古い results.cache を消して ValueError を投げる。
+    """
+    if keys is None:
+        keys = corpus_keys()
+    ids: dict[tuple[str, str], list[int]] = {}
+    for i, key in enumerate(keys):
+        ids.setdefault(key, []).append(i)
+
+    strings: dict[str, int] = {}
+
+    def intern(s: str) -> int:
+        sid = strings.get(s)
+        if sid is None:
+            sid = strings[s] = len(strings)
+        return sid
+
+    n = len(keys)
+    status = bytearray(n)
+    reading_ids = array("I", (intern(r) for r, _ in keys))
+    corpus_ids = array("I", (intern(c) for _, c in keys))
+    akaza_ids = array("I", corpus_ids)
+
+    raw = os.path.join(eval_dir, "raw.txt")
+    summary = None
+    unknown = 0
+    with open(raw) as f:
+        for line in f:
+            record = parse_line(line)
+            if record is None:
+                summary = parse_summary(line) or summary
+                continue
+            found = ids.get((record.reading, record.corpus), ())
+            unknown += not found
+            for i in found:
+                status[i] = STATUS_CODES[record.status]
+                akaza_ids[i] = intern(record.akaza)
+
+    path = cache_path(eval_dir)
+    if unknown or (summary is not None and summary.total != n):
+        if os.path.exists(path):
+            os.remove(path)
+        total = summary.total if summary is not None else "?"
+        raise ValueError(f"{raw}: 今の評価コーパスの結果ではありません "
+                         f"({total} 文 / 評価コーパス {n} 文, 評価コーパスにない文 {unknown})")
+
+    blob = bytearray()
+    offsets = array("I", [0])
+    for s in strings:  # dict は挿入順 = ID 順
+        blob += s.encode()
+        offsets.append(len(blob))
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, corpus_digest(keys), n, len(strings)))
+        f.write(status)
+        f.write(b"\0" * (-n % 4))
+        for column in (reading_ids, corpus_ids, akaza_ids, offsets):
+            f.write(column.tobytes())
+        f.write(blob)
+    os.replace(tmp, path)
+    return path
+
+
+class EvalCache:
+    """results.cache を mmap して読む。
+
+    status, reading_ids などはファイルを直接指す memoryview。
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        magic, self.digest, n, n_strings = HEADER.unpack_from(buf)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: results.cache の形式ではありません")
+        self.n_sentences = n
+        pos = HEADER.size
+        self.status = buf[pos:pos + n]
+        pos += n + (-n % 4)
+
+        def u32(count):
+            nonlocal pos
+            view = buf[pos:pos + 4 * count].cast("I")
+            pos += 4 * count
+            return view
+
+        self.reading_ids = u32(n)
+        self.corpus_ids = u32(n)
+        self.akaza_ids = u32(n)
+        self._offsets = u32(n_strings + 1)
+        self._blob = buf[pos:]
+
+    def string(self, sid: int) -> str:
+        return bytes(self._blob[self._offsets[sid]:self._offsets[sid + 1]]).decode()
+
+    def record(self, i: int) -> Record:
+        status = STATUS_NAMES[self.status[i]]
+        reading = self.string(self.reading_ids[i])
+        corpus = self.string(self.corpus_ids[i])
+        akaza = self.string(self.akaza_ids[i])
+        line = f"[{status}] {reading} => corpus={corpus}, akaza={akaza}"
+        return Record(status, reading, corpus, akaza, line)
+
+    def iter_records(self, statuses=("BAD", "TOP-5")) -> Iterator[Record]:
+        """指定ステータスの文を文 ID 順に返す。"""
+        codes = {code for code, name in STATUS_NAMES.items() if name in statuses}
+        for i, code in enumerate(self.status):
+            if code in codes:
+                yield self.record(i)
+
+    def count(self, code: int) -> int:
+        return bytes(self.status).count(code)
+
+
+def open_cache(eval_dir: str) -> EvalCache | None:
+    """eval_dir に raw.txt より新しい results.cache があれば開く。"""
+    path = cache_path(eval_dir)
+    raw = os.path.join(eval_dir, "raw.txt")
+    if not os.path.exists(path):
+        return None
+    if os.path.exists(raw) and os.path.getmtime(raw) > os.path.getmtime(path):
+        return None
+    return EvalCache(path)
+
+
+def open_or_build_cache(eval_dir: str) -> EvalCache | None:
+    """results.cache を開く。古いかなければ raw.txt から作る。
+
+    raw.txt がないか、今の評価コーパスの結果でなければ None。
+    """
+    cache = open_cache(eval_dir)
+    if cache is None and os.path.exists(os.path.join(eval_dir, "raw.txt")):
+        try:
+            cache = EvalCache(build_cache(eval_dir))
+        except ValueError:
+            return None
+    return cache
+
+
+def read_eval_records(eval_dir: str, statuses=("BAD", "TOP-5")) -> Iterator[Record]:
+    """評価ディレクトリのレコードを返す。
+
+    results.cache があればそれを使い、なければ bad.txt (BAD のみの場合) か
+    raw.txt をパースする。
+    """
+    cache = open_cache(eval_dir)
+    if cache is not None:
+        yield from cache.iter_records(statuses)
+        return
+    name = "bad.txt" if tuple(statuses) == ("BAD",) else "raw.txt"
+    yield from read_records(os.path.join(eval_dir, name), statuses)
@@ -0,0 +1,97 @@
+"""分類 TSV の結果を accept.tsv / 候補ファイルに振り分ける。
+
+分類 TSV のフォーマット:
+    reading\tcorpus\takaza\tcategory\tsubcategory\tnotes
+"""
+
+import sys
+
+from akaza_tools.records import ACCEPT_PATH, Record
+
+HOMOPHONE_PAIRS_PATH = "/tmp/homophone-pairs.txt"
+SHOULD_CANDIDATES_PATH = "/tmp/should-candidates.txt"
+
+
+class CorpusMap:
+    """[BAD] レコードから reading→corpus の対応を集める。"""
+
+    def __init__(self):
+        self.corpus: dict[str, str] = {}
+
+    def feed(self, record: Record) -> None:
+        if record.status == "BAD":
+            self.corpus[record.reading] = record.corpus
+
+
+def apply_classification(tsv_file: str, corpus_map: dict[str, str],
+                         existing_accept: set[str],
+                         accept_path: str = ACCEPT_PATH) -> None:
+    """分類 TSV をカテゴリ別に処理する。
+
+    style, corpus_wrong → accept.tsv に追加
+    homophone           → HOMOPHONE_PAIRS_PATH に同音異義語ペア一覧を出力
+    colloquial_breakdown, bigram_needed, idiom_unknown → SHOULD_CANDIDATES_PATH に候補出力
+    number_issue, skip  → スキップ
+    """
+    accept_lines = []
+    homophone_pairs = []
+    should_candidates = []
+    skip_count = 0
+    number_count = 0
+
+    with open(tsv_file) as f:
+        header = f.readline()
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            parts = line.split("\t")
+            if len(parts) < 4:
+                continue
+            reading, corpus_val, akaza, category = parts[0], parts[1], parts[2], parts[3]
+            subcategory = parts[4] if len(parts) > 4 else ""
+            notes = parts[5] if len(parts) > 5 else ""
+
+            corpus_expected = corpus_map.get(reading, corpus_val)
+
+            if category in ("style", "corpus_wrong"):
+                if reading not in existing_accept:
+                    reason = f"{category}:{subcategory}" if subcategory else category
+                    accept_lines.append(f"{reading}\t{akaza}\t{corpus_expected}\t{reason}")
+
+            elif category == "homophone":
+                homophone_pairs.append(f"{subcategory}\t{reading}\t{corpus_expected}\t{akaza}")
+
+            elif category in ("colloquial_breakdown", "bigram_needed", "idiom_unknown"):
+                should_candidates.append(
+                    f"{category}\t{subcategory}\t{reading}\t{corpus_expected}\t{akaza}")
+
+            elif category == "number_issue":
+                number_count += 1
+            else:
+                skip_count += 1
+
+    # accept.tsv に追記
+    if accept_lines:
+        with open(accept_path, "a") as f:
+            for line in accept_lines:
+                f.write(line + "\n")
+        print(f"accept.tsv: +{len(accept_lines)} entries", file=sys.stderr)
+
+    # homophone ペア一覧
+    if homophone_pairs:
+        outfile = HOMOPHONE_PAIRS_PATH
+        with open(outfile, "w") as f:
+            for line in homophone_pairs:
+                f.write(line + "\n")
+        print(f"Homophone pairs: {len(homophone_pairs)} → {outfile}", file=sys.stderr)
+
+    # should 候補一覧
+    if should_candidates:
+        outfile = SHOULD_CANDIDATES_PATH
+        with open(outfile, "w") as f:
+            for line in should_candidates:
+                f.write(line + "\n")
+        print(f"Should candidates: {len(should_candidates)} → {outfile}", file=sys.stderr)
+
+    print(f"Skipped: {skip_count}, Number issues: {number_count}", file=sys.stderr)
@@ -0,0 +1,118 @@
+"""[BAD] の期待値が辞書の語で組み立てられるか (語彙の不足か、スコアの負けか) の判定。
+
+SKK-JISYO.L・data/SKK-JISYO.akaza・dict/SKK-JISYO.akaza のエントリを
+読み → 表層の集合の索引にまとめ、tmp/cache/ に pickle してキャッシュする。
+送りありエントリ (きm /決/) は validate.py と同じく語幹の読み (き → 決) で入れ、
+後ろの送り仮名は読みそのままの文字として照合するので、活用した語も組み立てられる。
+
+誤り箇所 (akaza_tools/align.py の Span) に重なる文節ごとに、その読みを
+辞書の語と読みそのままの文字 (ひらがな・カタカナ・全角半角の違いは許す) の
+並びで期待値の表層にできるかを調べる。できない文節が1つでもあれば absent (辞書に語がない)、
+すべて組み立てられるなら outscored (候補にはなるがコストで負けている)。
+文節の情報がない文は文全体で判定する。
+"""
+
+import os
+import unicodedata
+
+from akaza_tools.align import BunsetsuIndex
+from akaza_tools.diskcache import load_or_build, mtime_key
+from akaza_tools.evaluate import EUCJP_DICT, UTF8_DICT
+from akaza_tools.incremental import BASE_DICT
+from akaza_tools.lattice import hiragana_to_katakana, parse_skk
+from akaza_tools.records import Record
+
+COVERAGE_DICTS = ((EUCJP_DICT, "euc-jp"), (UTF8_DICT, "utf-8"), (BASE_DICT, "utf-8"))
+ABSENT = "absent"
+OUTSCORED = "outscored"
+
+
+class CoverageIndex:
+    def __init__(self, entries: dict[str, list[str]]):
+        self.surfaces = {reading: frozenset(s) for reading, s in entries.items()}
+        self.max_reading_len = max(map(len, self.surfaces), default=1)
+        self._memo: dict[tuple[str, str], bool] = {}
+
+    def covers(self, reading: str, surface: str) -> bool:
+        """reading を辞書の語と読みそのままの文字の並びに分けて surface にできるか。"""
+        key = (reading, surface)
+        found = self._memo.get(key)
+        if found is None:
+            found = self._memo[key] = self._search(reading, surface)
+        return found
+
+    def _search(self, reading: str, surface: str) -> bool:
+        goal = (len(reading), len(surface))
+        stack = [(0, 0)]
+        seen = {(0, 0)}
+        while stack:
+            i, j = stack.pop()
+            if (i, j) == goal:
+                return True
+            steps = []
+            if i < len(reading) and j < len(surface) and surface[j] in (
+                    reading[i], hiragana_to_katakana(reading[i]),
+                    unicodedata.normalize("NFKC", reading[i])):
+                steps.append((i + 1, j + 1))
+            for end in range(i + 1, min(len(reading), i + self.max_reading_len) + 1):
+                for word in self.surfaces.get(reading[i:end], ()):
+                    if surface.startswith(word, j):
+                        steps.append((end, j + len(word)))
+            for step in steps:
+                if step not in seen:
+                    seen.add(step)
+                    stack.append(step)
+        return False
+
+    def __getstate__(self):
+        return {"surfaces": self.surfaces, "max_reading_len": self.max_reading_len}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._memo = {}
+
+
+def load_coverage_index(dicts=COVERAGE_DICTS) -> CoverageIndex:
+    paths = [path for path, _ in dicts]
+
+    def build():
+        entries: dict[str, list[str]] = {}
+        for path, encoding in dicts:
+            if os.path.exists(path):
+                parse_skk(path, encoding, entries, okuri_stem=True)
+        return CoverageIndex(entries)
+
+    return load_or_build("coverage-index", mtime_key(paths), build)
+
+
+class CoverageClassifier:
+    """[BAD] レコードを absent / outscored に分類し、辞書にない文節を返す。"""
+
+    def __init__(self, coverage: CoverageIndex, index: BunsetsuIndex | None):
+        self.coverage = coverage
+        self.index = index
+
+    def classify(self, record: Record) -> tuple[str, list[str]]:
+        entry = self.index.bunsetsu.get((record.reading, record.corpus)) if self.index else None
+        if entry is None or entry[1] is None:
+            pairs = [(record.corpus, record.reading)]
+        else:
+            pairs = self._error_bunsetsu(record, *entry)
+        missing = [f"{surface}/{reading}" for surface, reading in pairs
+                   if not self.coverage.covers(reading, surface)]
+        return (ABSENT if missing else OUTSCORED), missing
+
+    def _error_bunsetsu(self, record: Record, surfaces: list[str],
+                        readings: list[str]) -> list[tuple[str, str]]:
+        """誤り箇所に重なる文節の (表層, 読み)。"""
+        offsets = [0]
+        for s in surfaces:
+            offsets.append(offsets[-1] + len(s))
+        selected = set()
+        for span in self.index.align(record.reading, record.corpus, record.akaza):
+            end = span.start + max(len(span.corpus), 1)
+            selected.update(k for k in range(len(surfaces))
+                            if offsets[k] < end and span.start < offsets[k + 1])
+        if not selected:
+            selected = set(range(len(surfaces)))
+        return [(surfaces[k], readings[k]) for k in sorted(selected)]
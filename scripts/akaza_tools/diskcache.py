@@ -0,0 +1,91 @@
+"""入力ファイルから作るデータ構造の、ディスク上の pickle キャッシュ。
+
+キャッシュは tmp/cache/<name>-<key>.pickle に置く。key は入力ファイルの
+内容のハッシュや mtime と、build を定義しているモジュールのソースのハッシュから
+作るので、入力や作り方のコードが変わると別のファイルになり、古いキャッシュは
+次に作り直したときに削除する。
+"""
+
+import glob
+import hashlib
+import os
+import pickle
+import sys
+from functools import lru_cache
+from typing import Callable, TypeVar
+
+CACHE_DIR = "tmp/cache"
+
+T = TypeVar("T")
+
+
+def content_key(paths) -> str:
+    """ファイルの内容の sha1 (存在しないファイルは空として扱う)。"""
+    h = hashlib.sha1()
+    for path in paths:
+        h.update(path.encode() + b"\0")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+        h.update(b"\0")
+    return h.hexdigest()[:16]
+
+
+def mtime_key(paths) -> str:
+    """ファイルのパス・mtime・サイズの sha1。内容を読まずに変更を検出する。"""
+    h = hashlib.sha1()
+    for path in paths:
+        st = os.stat(path) if os.path.exists(path) else None
+        stamp = f"{st.st_mtime_ns}:{st.st_size}" if st else "-"
+        h.update(f"{path}\0{stamp}\0".encode())
+    return h.hexdigest()[:16]
+
+
+@lru_cache(maxsize=None)
+def _source_key(module_name: str) -> str:
+    """モジュールのソースの sha1。ソースがない (組み込みの) モジュールは空文字列。"""
+    path = getattr(sys.modules.get(module_name), "__file__", None)
+    if not path or not path.endswith(".py"):
+        return ""
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:8]
+
+
+def load_or_build(name: str, key: str, build: Callable[[], T],
+                  cache_dir: str = CACHE_DIR) -> T:
+    """キャッシュがあれば読み込み、なければ build() で作って保存する。
+
+    build を定義しているモジュールのソースのハッシュを key に足すので、
+    作り方を直すと古いキャッシュは使われない。
+    """
+    source = _source_key(getattr(build, "__module__", None) or "")
+    if source:
+        key = f"{key}-{source}"
+    path = os.path.join(cache_dir, f"{name}-{key}.pickle")
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            pass  # 壊れたキャッシュは作り直す
+
+    value = build()
+    save(name, key, value, cache_dir)
+    return value
+
+
+def save(name: str, key: str, value, cache_dir: str = CACHE_DIR) -> None:
+    """value を保存し、同じ name の古いキャッシュを削除する。"""
+    path = os.path.join(cache_dir, f"{name}-{key}.pickle")
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        for old in glob.glob(os.path.join(cache_dir, f"{name}-*.pickle")):
+            if old != path:
+                os.remove(old)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # キャッシュが書けなくても結果は返す
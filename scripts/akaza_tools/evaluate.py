@@ -0,0 +1,190 @@
+"""akaza-data evaluate の実行と、シャードごとの結果のマージ。
+
+anthy-corpus を N 個のシャードに分割し、シャードごとに akaza-data evaluate を
+並列に実行する。出力は `make evaluate` と同じ形式 ([BAD]/[TOP-5] 行 + サマリー行)
+にマージするので、run-evaluate.sh 以降の処理はそのまま使える。
+"""
+
+import os
+import re
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+# Makefile の evaluate ターゲットと同じ設定。
+# corpus.4.txt は誤変換をおさめたものなので評価用には使わない。
+EVALUATE_CORPORA = (
+    "anthy-corpus/corpus.0.txt",
+    "anthy-corpus/corpus.1.txt",
+    "anthy-corpus/corpus.2.txt",
+    "anthy-corpus/corpus.3.txt",
+    "anthy-corpus/corpus.5.txt",
+)
+EUCJP_DICT = "skk-dev-dict/SKK-JISYO.L"
+UTF8_DICT = "data/SKK-JISYO.akaza"
+MODEL_DIR = "data/"
+
+# "Good=5962, Top-5=473, Bad=4630, elapsed=183403ms, 再現率=91.646194"
+# 差分評価では再現率を計算できないので "再現率=nan" になる。
+SUMMARY_RE = re.compile(
+    r"Good=(\d+), Top-5=(\d+), Bad=(\d+), elapsed=(\d+)ms, 再現率=([0-9.]+|nan)")
+
+
+@dataclass
+class Summary:
+    good: int
+    top5: int
+    bad: int
+    elapsed_ms: int
+    recall: float
+
+    @property
+    def total(self) -> int:
+        return self.good + self.top5 + self.bad
+
+    def format(self) -> str:
+        return (f"Good={self.good}, Top-5={self.top5}, Bad={self.bad}, "
+                f"elapsed={self.elapsed_ms}ms, 再現率={self.recall:.6f}")
+
+
+def parse_summary(line: str) -> Summary | None:
+    m = SUMMARY_RE.search(line)
+    if not m:
+        return None
+    return Summary(int(m.group(1)), int(m.group(2)), int(m.group(3)),
+                   int(m.group(4)), float(m.group(5)))
+
+
+def iter_corpus_lines(paths=EVALUATE_CORPORA):
+    """評価コーパスの文の行 (コメント・空行を除く) を順に返す。"""
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                line = line.rstrip("\n")
+                if not line.strip() or line.startswith("#"):
+                    continue
+                yield line
+
+
+def surface_length(corpus_line: str) -> int:
+    """コーパス行の期待される変換結果の文字数 (`|` を除く)。"""
+    _, _, surface = corpus_line.partition(" ")
+    return len(surface.replace("|", ""))
+
+
+def split_shards(lines: list[str], n: int) -> list[list[str]]:
+    """行を順序を保ったまま、件数がほぼ均等な n 個の連続区間に分割する。"""
+    n = max(1, min(n, len(lines)))
+    size, rest = divmod(len(lines), n)
+    shards = []
+    start = 0
+    for i in range(n):
+        end = start + size + (1 if i < rest else 0)
+        shards.append(lines[start:end])
+        start = end
+    return shards
+
+
+def split_interleaved(lines: list[str], n: int) -> list[list[str]]:
+    """行を i % n で n 個に振り分ける。
+
+    各シャードがコーパス全体から均等に文を含むので、途中までのシャードの
+    結果から全体の Bad 率を推定できる。
+    """
+    n = max(1, min(n, len(lines)))
+    return [lines[i::n] for i in range(n)]
+
+
+def run_evaluate(corpora, model_dir: str = MODEL_DIR,
+                 eucjp_dict: str = EUCJP_DICT,
+                 utf8_dict: str = UTF8_DICT,
+                 running: set | None = None) -> tuple[list[str], Summary]:
+    """akaza-data evaluate を1プロセス実行し、(サマリー以外の出力行, サマリー) を返す。
+
+    running を渡すと、実行中のプロセス (Popen) をそこに入れておく
+    (途中で打ち切る側が kill できるように)。
+    """
+    cmd = ["akaza-data", "evaluate"]
+    cmd += [f"--corpus={c}" for c in corpora]
+    cmd += [f"--eucjp-dict={eucjp_dict}",
+            f"--utf8-dict={utf8_dict}",
+            f"--model-dir={model_dir}",
+            "-vv"]
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          text=True) as proc:
+        if running is not None:
+            running.add(proc)
+        try:
+            stdout, _ = proc.communicate()
+        finally:
+            if running is not None:
+                running.discard(proc)
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stdout)
+    lines = []
+    summary = None
+    for line in stdout.splitlines():
+        parsed = parse_summary(line)
+        if parsed is not None:
+            summary = parsed
+        else:
+            lines.append(line)
+    if summary is None:
+        raise RuntimeError(f"サマリー行が見つかりません: {' '.join(cmd)}")
+    return lines, summary
+
+
+def merge_summaries(summaries: list[Summary], weights: list[int],
+                    elapsed_ms: int) -> Summary:
+    """シャードのサマリーを合算する。
+
+    再現率は akaza-data 内部で文字単位に計算されているため、シャードの
+    期待出力の文字数で重み付けした平均で近似する。
+    """
+    total_weight = sum(weights)
+    recall = (sum(s.recall * w for s, w in zip(summaries, weights)) / total_weight
+              if total_weight else 0.0)
+    return Summary(
+        good=sum(s.good for s in summaries),
+        top5=sum(s.top5 for s in summaries),
+        bad=sum(s.bad for s in summaries),
+        elapsed_ms=elapsed_ms,
+        recall=recall,
+    )
+
+
+def evaluate_sharded(shard_dir: Path, jobs: int | None = None,
+                     corpora=EVALUATE_CORPORA,
+                     model_dir: str = MODEL_DIR,
+                     eucjp_dict: str = EUCJP_DICT,
+                     utf8_dict: str = UTF8_DICT) -> tuple[list[str], Summary]:
+    """評価コーパスをシャードに分けて並列に evaluate し、結果をマージする。
+
+    出力行はコーパスの順序のまま連結される。
+    """
+    jobs = jobs or os.cpu_count() or 1
+    lines = list(iter_corpus_lines(corpora))
+    shards = split_shards(lines, jobs)
+
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    shard_paths = []
+    for i, shard in enumerate(shards):
+        path = shard_dir / f"shard-{i:03d}.txt"
+        path.write_text("".join(line + "\n" for line in shard))
+        shard_paths.append(path)
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(shard_paths)) as pool:
+        results = list(pool.map(
+            lambda p: run_evaluate([str(p)], model_dir, eucjp_dict, utf8_dict),
+            shard_paths))
+    elapsed_ms = int((time.monotonic() - start) * 1000)
+
+    output = [line for shard_lines, _ in results for line in shard_lines]
+    summary = merge_summaries(
+        [s for _, s in results],
+        [sum(surface_length(line) for line in shard) for shard in shards],
+        elapsed_ms)
+    return output, summary
@@ -0,0 +1,82 @@
+"""accept.tsv / ignore.txt と表記の正規化キーによる BAD 行のフィルタリング。"""
+
+import os
+
+from akaza_tools.filterstore import FilterStore
+from akaza_tools.normalize import Normalizer, load_normalizer
+from akaza_tools.records import Record
+
+# classify() の結果
+IGNORED = "ignored"
+ACCEPTED = "accepted"
+EQUIVALENT = "equivalent"
+
+
+class BadFilter:
+    """[BAD] レコードを1件ずつ受け取り、accept/ignore に該当しないものを残す。
+
+    accept.tsv にない文でも、期待値と変換結果の正規化キー (akaza_tools.normalize) が
+    同じなら表記揺れとして除外する。
+    """
+
+    def __init__(self, store: FilterStore, normalizer: Normalizer | None = None):
+        self.store = store
+        self.normalizer = normalizer if normalizer is not None else load_normalizer()
+        self.total_bad = 0
+        self.accepted = 0
+        self.equivalent = 0
+        self.ignored = 0
+        self.real_bad: list[Record] = []
+
+    def classify(self, record: Record) -> str | None:
+        """除外する理由 (IGNORED, ACCEPTED, EQUIVALENT)。除外しなければ None。"""
+        if self.store.is_ignored(record.reading):
+            return IGNORED
+        if self.store.is_accepted(record.reading, record.corpus, record.akaza):
+            return ACCEPTED
+        if self.normalizer.equivalent(record.corpus, record.akaza):
+            return EQUIVALENT
+        return None
+
+    def feed(self, record: Record) -> bool:
+        """本当の BAD なら True を返す。"""
+        if record.status != "BAD":
+            return False
+        self.total_bad += 1
+        verdict = self.classify(record)
+        if verdict == IGNORED:
+            self.ignored += 1
+        elif verdict == ACCEPTED:
+            self.accepted += 1
+        elif verdict == EQUIVALENT:
+            self.equivalent += 1
+        else:
+            self.real_bad.append(record)
+        return verdict is None
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as f:
+            for record in self.real_bad:
+                f.write(record.line + "\n")
+
+    def print_report(self, eval_dir: str, filtered_bad_file: str) -> None:
+        filtered_bad = len(self.real_bad)
+        filtered_out = self.accepted + self.equivalent + self.ignored
+        ratio = filtered_out / self.total_bad * 100 if self.total_bad else 0.0
+
+        print(f"=== Filtered Evaluate Results ===")
+        print(f"  Source: {eval_dir}")
+        print(f"")
+        print(f"  Original BAD:           {self.total_bad}")
+        print(f"  Accepted (style/OK):    {self.accepted}")
+        print(f"  Accepted (orthography): {self.equivalent}")
+        print(f"  Ignored (ambiguous):    {self.ignored}")
+        print(f"  ─────────────────────")
+        print(f"  Real BAD:               {filtered_bad}")
+        print(f"  Filtered out:           {filtered_out} ({ratio:.1f}%)")
+        print(f"")
+        print(f"  Filtered BAD saved to: {filtered_bad_file}")
+
+
+def filtered_bad_path(eval_dir: str) -> str:
+    return os.path.join(eval_dir, "bad-filtered.txt")
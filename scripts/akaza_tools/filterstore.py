@@ -0,0 +1,114 @@
+"""accept.tsv / ignore.txt をコンパイルした評価フィルタの索引。
+
+accept.tsv のルール (1列目: 入力読み, 2列目: 許容する akaza 出力):
+
+    よみ        変換結果        その読みで、その変換結果を許容する (完全一致)
+    よみ*       表記A/表記B     その読みで始まる文で、期待値の 表記A を 表記B に
+                                置き換えた変換結果を許容する (前方一致)
+    *           表記A/表記B     すべての文で同上 (ワイルドカード)
+
+ignore.txt は1列目の読みを除外する。`よみ*` と書くとその読みで始まる文を除外する。
+
+索引は tmp/cache/ に保存し、2つのファイルの mtime が変わったときだけ作り直す。
+完全一致は dict で、前方一致は「ルールのある接頭辞の長さ」ごとに読みを切り出して
+引くので、1行あたりの照合はルールの数によらない。
+"""
+
+from akaza_tools.diskcache import load_or_build, mtime_key
+from akaza_tools.records import ACCEPT_PATH, IGNORE_PATH
+from akaza_tools.style import StyleMatcher
+
+
+def iter_rules(path: str):
+    """(行番号, タブ区切りの列) を返す。ファイルがなければ何も返さない。"""
+    try:
+        f = open(path)
+    except FileNotFoundError:
+        return
+    with f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            yield lineno, line.split("\t")
+
+
+class PrefixIndex:
+    """接頭辞 → 値 の索引。読みにマッチする接頭辞を短い順に返す。"""
+
+    def __init__(self, entries: dict[str, object]):
+        self.entries = entries
+        self.lengths = sorted({len(prefix) for prefix in entries})
+
+    def __bool__(self) -> bool:
+        return bool(self.entries)
+
+    def matches(self, reading: str) -> list[str]:
+        found = []
+        for n in self.lengths:
+            if n > len(reading):
+                break
+            if reading[:n] in self.entries:
+                found.append(reading[:n])
+        return found
+
+
+class FilterStore:
+    """accept/ignore のルールの索引。pickle してキャッシュする。"""
+
+    def __init__(self, accept_path: str = ACCEPT_PATH, ignore_path: str = IGNORE_PATH):
+        self.exact: dict[str, set[str]] = {}
+        substitutions: dict[str, set[tuple[str, str]]] = {}
+        for lineno, parts in iter_rules(accept_path):
+            if len(parts) < 2:
+                continue
+            reading, akaza = parts[0], parts[1]
+            if not reading.endswith("*"):
+                self.exact.setdefault(reading, set()).add(akaza)
+                continue
+            corpus_variant, sep, akaza_variant = akaza.partition("/")
+            if not sep or not corpus_variant or not akaza_variant:
+                raise ValueError(
+                    f"{accept_path}:{lineno}: 前方一致ルールの2列目は 表記A/表記B: {akaza!r}")
+            substitutions.setdefault(reading[:-1], set()).add((corpus_variant, akaza_variant))
+        self.substitutions = PrefixIndex(substitutions)
+
+        self.ignore: set[str] = set()
+        ignore_prefixes: dict[str, None] = {}
+        for _, parts in iter_rules(ignore_path):
+            if parts[0].endswith("*"):
+                ignore_prefixes[parts[0][:-1]] = None
+            else:
+                self.ignore.add(parts[0])
+        self.ignore_prefixes = PrefixIndex(ignore_prefixes)
+
+        # マッチした接頭辞の組ごとに、置き換え規則を合わせた StyleMatcher を作る
+        self._matchers: dict[tuple[str, ...], StyleMatcher] = {}
+
+    @property
+    def accepted_readings(self) -> set[str]:
+        """完全一致ルールのある読み。"""
+        return set(self.exact)
+
+    def is_ignored(self, reading: str) -> bool:
+        return reading in self.ignore or bool(self.ignore_prefixes.matches(reading))
+
+    def is_accepted(self, reading: str, corpus: str, akaza: str) -> bool:
+        if akaza in self.exact.get(reading, ()):
+            return True
+        if not self.substitutions:
+            return False
+        prefixes = tuple(self.substitutions.matches(reading))
+        if not prefixes:
+            return False
+        matcher = self._matchers.get(prefixes)
+        if matcher is None:
+            pairs = set().union(*(self.substitutions.entries[p] for p in prefixes))
+            matcher = self._matchers[prefixes] = StyleMatcher(pairs)
+        return matcher.equivalent(corpus, akaza)
+
+
+def load_filter_store(accept_path: str = ACCEPT_PATH,
+                      ignore_path: str = IGNORE_PATH) -> FilterStore:
+    return load_or_build("filter-store", mtime_key([accept_path, ignore_path]),
+                         lambda: FilterStore(accept_path, ignore_path))
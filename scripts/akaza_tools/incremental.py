@@ -0,0 +1,158 @@
+"""差分評価: コーパス・辞書の変更に関係する文だけを再評価する。
+
+前回の評価結果 (tmp/evaluate/<timestamp>/raw.txt) と、そのときのコミットからの
+training-corpus/*.txt と dict/SKK-JISYO.akaza の git diff を使う。
+変更された行に含まれる読みを部分文字列として含む anthy-corpus の文だけを
+再評価し、それ以外の文の結果は前回の raw.txt から引き継ぐ。
+
+learn-corpus の学習は全体に影響するので、これは近似である。
+定期的にフル評価 (--verify) で結果が一致することを確認すること。
+"""
+
+import subprocess
+from pathlib import Path
+
+from akaza_tools.evaluate import (
+    EVALUATE_CORPORA, MODEL_DIR, Summary, evaluate_sharded, iter_corpus_lines,
+)
+from akaza_tools.records import iter_records, read_commit, read_records
+
+TRAINING_CORPORA = (
+    "training-corpus/must.txt",
+    "training-corpus/should.txt",
+    "training-corpus/may.txt",
+)
+BASE_DICT = "dict/SKK-JISYO.akaza"
+
+
+def corpus_key(corpus_line: str) -> tuple[str, str]:
+    """anthy-corpus の行から `|` を除いた (読み, 期待される変換結果) を返す。"""
+    reading, _, surface = corpus_line.partition(" ")
+    return reading.replace("|", ""), surface.replace("|", "")
+
+
+class ReadingIndex:
+    """読みの部分文字列検索用の文字 bigram 転置インデックス。"""
+
+    def __init__(self, readings: list[str]):
+        self.readings = readings
+        self.postings: dict[str, set[int]] = {}
+        for i, reading in enumerate(readings):
+            for j in range(len(reading) - 1):
+                self.postings.setdefault(reading[j:j + 2], set()).add(i)
+
+    def find(self, query: str) -> set[int]:
+        """query を部分文字列として含む読みの ID を返す。"""
+        if len(query) < 2:
+            return {i for i, r in enumerate(self.readings) if query in r}
+        grams = sorted((query[j:j + 2] for j in range(len(query) - 1)),
+                       key=lambda g: len(self.postings.get(g, ())))
+        candidates = set(self.postings.get(grams[0], ()))
+        for gram in grams[1:]:
+            if not candidates:
+                break
+            candidates &= self.postings.get(gram, set())
+        return {i for i in candidates if query in self.readings[i]}
+
+
+def diff_lines(base_commit: str, paths) -> list[tuple[str, str]]:
+    """base_commit から作業ツリーまでに追加・削除された行を (path, line) で返す。"""
+    proc = subprocess.run(
+        ["git", "diff", "--no-color", "--unified=0", base_commit, "--", *paths],
+        stdout=subprocess.PIPE, text=True, check=True)
+    changed = []
+    path = None
+    for line in proc.stdout.splitlines():
+        if line.startswith("diff --git "):
+            path = line.split(" b/", 1)[-1]
+        elif line.startswith(("+++ ", "--- ", "@@")):
+            continue
+        elif line[:1] in ("+", "-") and path is not None:
+            changed.append((path, line[1:]))
+    return changed
+
+
+def corpus_line_readings(line: str) -> set[str]:
+    """学習コーパスの1行から、評価結果に影響しうる読みを取り出す。
+
+    隣接する単語の読みを連結したもの (bigram の文脈) と、
+    漢字などを含み読みと表層形が異なる単語の読み (unigram) を返す。
+    """
+    if not line or line.startswith(";;"):
+        return set()
+    tokens = [t.split("/", 1) for t in line.split(" ") if t.count("/") == 1]
+    readings = set()
+    for surface, reading in tokens:
+        if surface != reading:
+            readings.add(reading)
+    for (_, r1), (_, r2) in zip(tokens, tokens[1:]):
+        readings.add(r1 + r2)
+    return readings
+
+
+def dict_line_readings(line: str) -> set[str]:
+    if not line or line.startswith(";;"):
+        return set()
+    reading, _, _ = line.partition(" ")
+    return {reading} if reading else set()
+
+
+def changed_readings(base_commit: str) -> set[str]:
+    """base_commit 以降に変更された学習コーパス・辞書の読みを返す。"""
+    readings = set()
+    for path, line in diff_lines(base_commit, (*TRAINING_CORPORA, BASE_DICT)):
+        if path == BASE_DICT:
+            readings |= dict_line_readings(line)
+        else:
+            readings |= corpus_line_readings(line)
+    return readings
+
+
+def evaluate_incremental(base_dir: Path, shard_dir: Path, jobs: int | None = None,
+                         corpora=EVALUATE_CORPORA, model_dir: str = MODEL_DIR
+                         ) -> tuple[list[str], Summary, int]:
+    """base_dir の評価結果に、変更の影響を受ける文だけを再評価した結果を重ねる。
+
+    (出力行, サマリー, 再評価した文の数) を返す。
+    再現率は文単位の結果からは再計算できないので nan になる。
+    """
+    lines = list(iter_corpus_lines(corpora))
+    keys = [corpus_key(line) for line in lines]
+    index = ReadingIndex([reading for reading, _ in keys])
+
+    base_commit = read_commit(str(base_dir))
+    if base_commit is None:
+        raise ValueError(f"{base_dir / 'summary.txt'} から評価時のコミットが読めません")
+    affected: set[int] = set()
+    for reading in changed_readings(base_commit):
+        affected |= index.find(reading)
+
+    results = {(r.reading, r.corpus): r.line for r in read_records(str(base_dir / "raw.txt"))}
+    if affected:
+        subset = shard_dir / "affected.txt"
+        subset.parent.mkdir(parents=True, exist_ok=True)
+        subset.write_text("".join(lines[i] + "\n" for i in sorted(affected)))
+        new_output, sub_summary = evaluate_sharded(
+            shard_dir / "shards", jobs, corpora=[str(subset)], model_dir=model_dir)
+        elapsed_ms = sub_summary.elapsed_ms
+        for i in affected:
+            results.pop(keys[i], None)
+        for r in iter_records(new_output):
+            results[r.reading, r.corpus] = r.line
+    else:
+        elapsed_ms = 0
+
+    output = []
+    top5 = bad = 0
+    for key in keys:
+        line = results.get(key)
+        if line is None:
+            continue
+        output.append(line)
+        if line.startswith("[BAD]"):
+            bad += 1
+        else:
+            top5 += 1
+    summary = Summary(good=len(lines) - top5 - bad, top5=top5, bad=bad,
+                      elapsed_ms=elapsed_ms, recall=float("nan"))
+    return output, summary, len(affected)
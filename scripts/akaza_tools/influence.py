@@ -0,0 +1,151 @@
+"""training-corpus のエントリを抜いて学習し直し、evaluate への影響を調べる。
+
+エントリを chunk_size 行ずつのグループに分け、グループごとに「そのグループだけを
+抜いたコーパス」で学習・評価する。Good/Bad が全体で学習したときと
+tolerance 以内しか変わらなければ、そのグループの全エントリを redundant とする。
+変わったグループは半分に分けて同じことを繰り返し (二分探索型のグループテスト)、
+1行になったところで、抜くと Bad が減るものを harmful、増えるものを useful とする。
+
+学習か評価が失敗したグループは分けずに、全エントリを failed とする。
+1つのグループの中で効果が打ち消し合うと、まとめて redundant と判定される。
+redundant の行を一度に消すときは、消した後のコーパスで evaluate して確かめること。
+
+エントリは training-corpus の行そのもの (ファイルと行番号) で、抜くときも行番号で
+抜くので、同じ行が2か所にあればそれぞれ別のエントリとして判定する。
+"""
+
+import shutil
+import subprocess
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from itertools import count
+from pathlib import Path
+
+from akaza_tools.aggregate import TIERS
+from akaza_tools.evaluate import Summary
+from akaza_tools.incremental import TRAINING_CORPORA
+from akaza_tools.sweep import Config, Sweep, learn_corpus_command
+
+REDUNDANT = "redundant"
+HARMFUL = "harmful"
+USEFUL = "useful"
+FAILED = "failed"
+
+
+@dataclass(frozen=True)
+class Entry:
+    tier: str
+    path: str
+    lineno: int
+    line: str
+
+    @property
+    def source(self) -> str:
+        return f"{self.path}:{self.lineno}"
+
+
+def load_entries(tiers: list[str], corpora=TRAINING_CORPORA) -> list[Entry]:
+    entries = []
+    for tier, path in zip(TIERS, corpora):
+        if tier not in tiers:
+            continue
+        with open(path) as f:
+            entries += [Entry(tier, path, lineno, " ".join(line.split()))
+                        for lineno, line in enumerate(f, 1)
+                        if line.strip() and not line.startswith(";;")]
+    return entries
+
+
+@dataclass
+class Verdict:
+    entry: Entry
+    verdict: str
+    delta_good: int  # 抜いたときの Good の変化
+    delta_bad: int
+    group_size: int  # 判定したときのグループの大きさ
+
+
+class InfluenceAnalysis:
+    def __init__(self, out_dir: Path, config: Config, entries: list[Entry],
+                 eval_jobs: int, tolerance: int = 0, corpora=TRAINING_CORPORA, log=print):
+        self.out_dir = out_dir
+        self.config = config
+        self.entries = entries
+        self.tolerance = tolerance
+        self.corpora = corpora
+        self.log = log
+        self.sweep = Sweep(out_dir, eval_jobs, abandon_z=None, log=log)
+        self.trial_ids = count()
+        self.baseline: Summary | None = None
+
+    def trial(self, held_out: frozenset[int]) -> Summary | None:
+        """held_out (entries の添字) を抜いたコーパスで学習・評価する。失敗したら None。"""
+        trial_dir = self.out_dir / f"trial-{next(self.trial_ids):05d}"
+        trial_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            removed = {(self.entries[i].path, self.entries[i].lineno) for i in held_out}
+            corpora = []
+            for tier, path in zip(TIERS, self.corpora):
+                dst = trial_dir / f"{tier}.txt"
+                with open(path) as src, open(dst, "w") as f:
+                    for lineno, line in enumerate(src, 1):
+                        if (path, lineno) not in removed:
+                            f.write(line)
+                corpora.append(str(dst))
+
+            with open(trial_dir / "learn-corpus.log", "w") as log:
+                proc = subprocess.run(learn_corpus_command(self.config, str(trial_dir), corpora),
+                                      stdout=log, stderr=subprocess.STDOUT)
+            if proc.returncode != 0:
+                self.log(f"{trial_dir.name}: learn-corpus が失敗しました (exit {proc.returncode})")
+                return None
+            result = self.sweep.evaluate(self.config, str(trial_dir))
+            return result.summary if result.status == "done" else None
+        finally:
+            shutil.rmtree(trial_dir, ignore_errors=True)
+
+    def _is_neutral(self, summary: Summary) -> bool:
+        return (abs(summary.bad - self.baseline.bad) <= self.tolerance
+                and abs(summary.good - self.baseline.good) <= self.tolerance)
+
+    def run(self, chunk_size: int, jobs: int) -> list[Verdict]:
+        start = time.monotonic()
+        self.baseline = self.trial(frozenset())
+        if self.baseline is None:
+            raise RuntimeError("全エントリで学習・評価できませんでした")
+        self.log(f"baseline: {self.baseline.format()} ({time.monotonic() - start:.0f}s)")
+
+        verdicts = []
+        groups = [frozenset(range(i, min(i + chunk_size, len(self.entries))))
+                  for i in range(0, len(self.entries), chunk_size)]
+        trials = 1
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            pending = {pool.submit(self.trial, g): g for g in groups}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    group = pending.pop(future)
+                    summary = future.result()
+                    trials += 1
+                    if summary is None:
+                        verdicts += [Verdict(self.entries[i], FAILED, 0, 0, len(group))
+                                     for i in sorted(group)]
+                        continue
+                    d_good = summary.good - self.baseline.good
+                    d_bad = summary.bad - self.baseline.bad
+                    self.log(f"{len(group):>4} entries: Good {d_good:+d}, Bad {d_bad:+d} "
+                             f"({len(pending)} pending)")
+                    if self._is_neutral(summary) or len(group) == 1:
+                        verdict = (REDUNDANT if self._is_neutral(summary)
+                                   else HARMFUL if d_bad < 0 or (d_bad == 0 and d_good > 0)
+                                   else USEFUL)
+                        verdicts += [Verdict(self.entries[i], verdict, d_good, d_bad, len(group))
+                                     for i in sorted(group)]
+                        continue
+                    ordered = sorted(group)
+                    half = len(ordered) // 2
+                    for part in (ordered[:half], ordered[half:]):
+                        pending[pool.submit(self.trial, frozenset(part))] = frozenset(part)
+        self.log(f"{trials} trainings in {time.monotonic() - start:.0f}s")
+        return verdicts
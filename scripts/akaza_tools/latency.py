@@ -0,0 +1,225 @@
+"""変換レイテンシのベンチマーク。
+
+評価コーパスから読みの長さ別に文を抽出し、1文ずつ akaza-data evaluate に
+かけて、summary の elapsed= (変換にかかった時間、ミリ秒単位) を文ごとの
+レイテンシとする。elapsed は整数のミリ秒で、1文の変換はたいてい 0〜1ms に
+丸められてしまうので、同じ文を repeat 回並べたコーパスを1回で変換し、
+elapsed を repeat で割る (分解能は 1/repeat ms)。
+プロセスの wall time から elapsed を引いたものをモデルの読み込み時間、
+子プロセスの ru_maxrss をピーク RSS とする。
+
+時間は測ったマシンによって変わるので、結果にはマシンの識別子 (runner) を残し、
+runner と repeat が同じ結果どうしだけを比べる。
+"""
+
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from akaza_tools.evaluate import (
+    EUCJP_DICT, EVALUATE_CORPORA, MODEL_DIR, UTF8_DICT, iter_corpus_lines, parse_summary,
+)
+
+# 読みの長さの区切り (各区間の上限)。最後の区間はそれより長いものすべて
+LENGTH_BUCKETS = (5, 10, 15, 20, 30, 50)
+# ヒストグラムのレイテンシの区切り (ms)
+LATENCY_BINS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def bucket_label(length: int) -> str:
+    lower = 1
+    for upper in LENGTH_BUCKETS:
+        if length <= upper:
+            return f"{lower}-{upper}"
+        lower = upper + 1
+    return f"{lower}+"
+
+
+def bucket_labels() -> list[str]:
+    return [bucket_label(n) for n in (*LENGTH_BUCKETS, LENGTH_BUCKETS[-1] + 1)]
+
+
+def reading_length(corpus_line: str) -> int:
+    reading, _, _ = corpus_line.partition(" ")
+    return len(reading.replace("|", ""))
+
+
+def select_sentences(per_bucket: int, rng: random.Random,
+                     corpora=EVALUATE_CORPORA) -> list[str]:
+    """読みの長さの区間ごとに最大 per_bucket 文を選ぶ。"""
+    buckets: dict[str, list[str]] = {}
+    for line in iter_corpus_lines(corpora):
+        buckets.setdefault(bucket_label(reading_length(line)), []).append(line)
+    selected = []
+    for label in bucket_labels():
+        lines = buckets.get(label, [])
+        selected += rng.sample(lines, min(per_bucket, len(lines)))
+    return selected
+
+
+def runner_id() -> str:
+    """時間を比べてよいマシンかどうかの識別子 (CPU の機種・コア数・アーキテクチャ)。"""
+    model = platform.processor() or ""
+    try:
+        with open("/proc/cpuinfo") as f:
+            model = next((line.split(":", 1)[1].strip() for line in f
+                          if line.startswith("model name")), model)
+    except OSError:
+        pass
+    return f"{model} x{os.cpu_count()} {platform.machine()}"
+
+
+def percentile(values: list[float], p: float) -> float:
+    """最近傍順位法のパーセンタイル。"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+@dataclass
+class Measurement:
+    wall_ms: float
+    elapsed_ms: int  # akaza-data が出力した変換時間
+    max_rss_kb: int
+
+
+def measure(corpus_path: str, model_dir: str = MODEL_DIR, eucjp_dict: str = EUCJP_DICT,
+            utf8_dict: str = UTF8_DICT) -> Measurement:
+    """akaza-data evaluate を1回実行し、時間とピーク RSS を測る。"""
+    cmd = ["akaza-data", "evaluate", f"--corpus={corpus_path}",
+           f"--eucjp-dict={eucjp_dict}", f"--utf8-dict={utf8_dict}",
+           f"--model-dir={model_dir}"]
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    output = proc.stdout.read()
+    _, status, rusage = os.wait4(proc.pid, 0)
+    wall_ms = (time.perf_counter() - start) * 1000
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, output)
+    summary = None
+    for line in output.splitlines():
+        summary = parse_summary(line) or summary
+    if summary is None:
+        raise RuntimeError(f"サマリー行が見つかりません: {' '.join(cmd)}")
+    return Measurement(wall_ms, summary.elapsed_ms, rusage.ru_maxrss)
+
+
+@dataclass
+class BucketStats:
+    count: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    histogram: list[int]  # LATENCY_BINS の各区間 + それ以上 の件数
+
+
+def bucket_stats(latencies: list[float]) -> BucketStats:
+    histogram = [0] * (len(LATENCY_BINS) + 1)
+    for ms in latencies:
+        histogram[next((i for i, b in enumerate(LATENCY_BINS) if ms < b), len(LATENCY_BINS))] += 1
+    return BucketStats(len(latencies), percentile(latencies, 50), percentile(latencies, 95),
+                       percentile(latencies, 99), max(latencies, default=0.0), histogram)
+
+
+@dataclass
+class LatencyReport:
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    load_ms: float  # モデルの読み込み時間 (中央値)
+    peak_rss_mb: float
+    n_sentences: int
+    buckets: dict[str, BucketStats] = field(default_factory=dict)
+    runner: str = ""  # runner_id()。古い latency.json にはない
+    repeat: int = 1  # 1文を何回並べて変換したか
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(asdict(self), f, ensure_ascii=False, indent=2)
+            f.write("\n")
+
+    @classmethod
+    def load(cls, path: str) -> "LatencyReport":
+        with open(path) as f:
+            data = json.load(f)
+        data["buckets"] = {k: BucketStats(**v) for k, v in data.get("buckets", {}).items()}
+        return cls(**data)
+
+
+def run_benchmark(sentences: list[str], work_dir: Path, load_runs: int = 3,
+                  repeat: int = 20, model_dir: str = MODEL_DIR,
+                  eucjp_dict: str = EUCJP_DICT, utf8_dict: str = UTF8_DICT,
+                  progress=None) -> LatencyReport:
+    """文を1つずつ順に、repeat 回並べて変換して測る (並列にすると互いの時間に
+    影響するので直列)。"""
+    work_dir.mkdir(parents=True, exist_ok=True)
+    empty = work_dir / "empty.txt"
+    empty.write_text("")
+    loads = []
+    peak_rss = 0
+    for _ in range(load_runs):
+        m = measure(str(empty), model_dir, eucjp_dict, utf8_dict)
+        loads.append(m.wall_ms)
+        peak_rss = max(peak_rss, m.max_rss_kb)
+
+    sentence_path = work_dir / "sentence.txt"
+    by_bucket: dict[str, list[float]] = {}
+    all_latencies = []
+    for i, line in enumerate(sentences):
+        sentence_path.write_text((line + "\n") * repeat)
+        m = measure(str(sentence_path), model_dir, eucjp_dict, utf8_dict)
+        loads.append(m.wall_ms - m.elapsed_ms)
+        peak_rss = max(peak_rss, m.max_rss_kb)
+        latency = m.elapsed_ms / repeat
+        by_bucket.setdefault(bucket_label(reading_length(line)), []).append(latency)
+        all_latencies.append(latency)
+        if progress is not None:
+            progress(i + 1, len(sentences))
+
+    return LatencyReport(
+        p50_ms=percentile(all_latencies, 50),
+        p95_ms=percentile(all_latencies, 95),
+        p99_ms=percentile(all_latencies, 99),
+        load_ms=percentile(loads, 50),
+        peak_rss_mb=round(peak_rss / 1024, 1),
+        n_sentences=len(sentences),
+        buckets={label: bucket_stats(by_bucket[label])
+                 for label in bucket_labels() if label in by_bucket},
+        runner=runner_id(),
+        repeat=repeat,
+    )
+
+
+def incomparable(report: LatencyReport, baseline: LatencyReport) -> str | None:
+    """report と baseline の時間を比べられない理由。比べられれば None。"""
+    if baseline.runner != report.runner:
+        return f"別のマシンで測った結果です ({baseline.runner or '不明'})"
+    if baseline.repeat != report.repeat:
+        return f"repeat が違います ({baseline.repeat} → {report.repeat})"
+    return None
+
+
+def regressions(report: LatencyReport, baseline: LatencyReport,
+                max_regression: float, min_delta_ms: float = 0.5) -> list[str]:
+    """baseline から max_regression (割合) を超えて遅くなった指標の説明。
+
+    incomparable() が None の組 (同じ runner・repeat) で使う。1文のレイテンシの
+    分解能は 1/repeat ms なので、min_delta_ms 未満の差は無視する。
+    """
+    found = []
+    for name in ("p50_ms", "p95_ms", "p99_ms", "load_ms", "peak_rss_mb"):
+        old, new = getattr(baseline, name), getattr(report, name)
+        if name.endswith("_ms") and new - old < min_delta_ms:
+            continue
+        if old > 0 and new > old * (1 + max_regression):
+            found.append(f"{name}: {old:g} → {new:g} (+{(new / old - 1) * 100:.0f}%)")
+    return found
@@ -0,0 +1,454 @@
+"""data/*.model と SKK 辞書を使った、Python 版の変換ラティスのスコアラー。
+
+akaza-data learn-corpus で作ったモデルを mmap し、読みからラティスを作って
+コストの小さい順に k 個の変換候補を返す。各文節の単語コスト・連接コストの
+内訳も返すので、「この文が学習されたら変換結果が変わるか」をプロセスを
+起動せずに確かめられる。
+
+モデルのフォーマット (marisa-trie のキー。数値はリトルエンディアン):
+
+    unigram.model      "表層/読み" 0xff + コスト f32          (キーの ID が単語 ID)
+                       "__TOTAL_WORDS__" 0xff + u32, "__UNIQUE_WORDS__" 0xff + u32
+    bigram.model       単語 ID 3バイト × 2 + コスト f32
+                       "__DEFAULT_EDGE_COST__" + コスト f32
+    skip_bigram.model  bigram.model と同じ (1つ飛ばした単語の組)
+
+このレイアウトは akaza の実装を読んで書いたもので、実際のモデルではまだ確かめていない。
+check_model_layout がメタデータのキーの有無と先頭のキーの形を調べ、合わなければ
+Scorer.load は ValueError にする (デフォルトのコストをでっち上げて黙って続けない)。
+学習し直したモデルでは lattice-score.py --agreement で akaza-data evaluate との
+一致率を測って記録すること。
+
+ラティスの候補は SKK 辞書のエントリと、ひらがな・カタカナのまま。送りありエントリ
+(きm /決/) は akaza の ari2nasi と同じように、送り仮名の子音の行のかなを読みと
+表層の両方に付けた送りなしエントリ (きま /決ま/, きめ /決め/ など) にして使う。
+skip-bigram は一次のビタビで多めに列挙した候補の並べ替えにだけ使うので、
+順位は akaza 本体と完全には一致しない。
+"""
+
+import heapq
+import math
+import os
+import struct
+from collections import Counter
+from dataclasses import dataclass, field
+from itertools import count
+
+from akaza_tools.diskcache import load_or_build, mtime_key
+from akaza_tools.evaluate import EUCJP_DICT, MODEL_DIR, UTF8_DICT
+
+try:
+    import marisa_trie
+except ImportError:  # モデルを読むときにだけ必要
+    marisa_trie = None
+
+BOS = "__BOS__"
+EOS = "__EOS__"
+ALPHA = 0.00001
+SKIP_BIGRAM_WEIGHT = 0.2
+# skip-bigram で並べ替える前に一次のビタビで列挙する候補数 (k の倍数)
+RERANK_FACTOR = 4
+
+_F32 = struct.Struct("<f")
+_U32 = struct.Struct("<I")
+# 単語 ID 3バイト × 2 + コスト f32
+_EDGE_KEY_LEN = 3 + 3 + 4
+UNIGRAM_META = ("__TOTAL_WORDS__", "__UNIQUE_WORDS__")
+DEFAULT_EDGE_COST = "__DEFAULT_EDGE_COST__"
+# check_model_layout が調べるキーの数
+LAYOUT_SAMPLE = 1000
+
+
+def open_trie(path: str):
+    if marisa_trie is None:
+        raise ModuleNotFoundError(
+            "marisa_trie がありません。pip install marisa-trie でインストールしてください")
+    trie = marisa_trie.BinaryTrie()
+    trie.mmap(path)
+    return trie
+
+
+def _lookup(trie, prefix: bytes, n_bytes: int) -> tuple[bytes, int] | None:
+    """prefix の直後に n_bytes の値が続くキーを探し、(値, キー ID) を返す。"""
+    for key, key_id in trie.items(prefix):
+        if len(key) == len(prefix) + n_bytes:
+            return key[len(prefix):], key_id
+    return None
+
+
+class UnigramModel:
+    def __init__(self, path: str):
+        self.trie = open_trie(path)
+        total = self._meta("__TOTAL_WORDS__")
+        unique = self._meta("__UNIQUE_WORDS__")
+        # 未知語のコスト (出現回数 0 として計算)
+        self.default_cost = -math.log10(ALPHA / (total + ALPHA * unique))
+
+    def _meta(self, name: str) -> int:
+        found = _lookup(self.trie, name.encode() + b"\xff", 4)
+        if found is None:
+            raise ValueError(f"unigram.model に {name} がありません")
+        return _U32.unpack(found[0])[0]
+
+    def lookup(self, word: str) -> tuple[int, float] | None:
+        """"表層/読み" の (単語 ID, コスト)。"""
+        found = _lookup(self.trie, word.encode() + b"\xff", 4)
+        if found is None:
+            return None
+        value, word_id = found
+        return word_id, _F32.unpack(value)[0]
+
+
+class BigramModel:
+    def __init__(self, path: str):
+        self.trie = open_trie(path)
+        found = _lookup(self.trie, DEFAULT_EDGE_COST.encode(), 4)
+        if found is None:
+            raise ValueError(f"{os.path.basename(path)} に {DEFAULT_EDGE_COST} がありません")
+        self.default_cost = _F32.unpack(found[0])[0]
+
+    def lookup(self, id1: int, id2: int) -> float | None:
+        found = _lookup(self.trie, id1.to_bytes(3, "little") + id2.to_bytes(3, "little"), 4)
+        return _F32.unpack(found[0])[0] if found else None
+
+
+def _check_cost(name: str, key: bytes, value: bytes) -> str | None:
+    cost = _F32.unpack(value)[0]
+    if not math.isfinite(cost) or cost < 0:
+        return f"{name}: コストが {cost} のキーがあります: {key!r}"
+    return None
+
+
+def check_model_layout(model_dir: str, sample: int = LAYOUT_SAMPLE) -> list[str]:
+    """model_dir のモデルが、このモジュールの想定するキーのレイアウトかを調べる。
+
+    メタデータのキーがあるか、先頭の sample 個のキーが unigram なら
+    "表層/読み" 0xff + f32、bigram なら 単語 ID × 2 (unigram の ID の範囲内) + f32
+    かを確かめ、合わないところを返す (空なら問題なし)。
+    """
+    problems = []
+    unigram = open_trie(os.path.join(model_dir, "unigram.model"))
+    for name in UNIGRAM_META:
+        if _lookup(unigram, name.encode() + b"\xff", 4) is None:
+            problems.append(f"unigram.model: {name} がありません")
+    for i, key in enumerate(unigram.iterkeys()):
+        if i >= sample:
+            break
+        if key.startswith(b"__"):
+            continue
+        word = key[:-5].decode(errors="replace")
+        if len(key) < 6 or key[-5] != 0xFF or "/" not in word or "\ufffd" in word:
+            problems.append(f"unigram.model: \"表層/読み\" 0xff + f32 ではないキー: {key!r}")
+        elif problem := _check_cost("unigram.model", key, key[-4:]):
+            problems.append(problem)
+    for name in ("bigram.model", "skip_bigram.model"):
+        path = os.path.join(model_dir, name)
+        if not os.path.exists(path):
+            continue
+        trie = open_trie(path)
+        if _lookup(trie, DEFAULT_EDGE_COST.encode(), 4) is None:
+            problems.append(f"{name}: {DEFAULT_EDGE_COST} がありません")
+        for i, key in enumerate(trie.iterkeys()):
+            if i >= sample:
+                break
+            if key.startswith(b"__"):
+                continue
+            if len(key) != _EDGE_KEY_LEN:
+                problems.append(f"{name}: 単語 ID × 2 + f32 ではないキー: {key!r}")
+                continue
+            ids = int.from_bytes(key[:3], "little"), int.from_bytes(key[3:6], "little")
+            if max(ids) >= len(unigram):
+                problems.append(f"{name}: unigram.model にない単語 ID {ids}: {key!r}")
+            elif problem := _check_cost(name, key, key[6:]):
+                problems.append(problem)
+    return problems
+
+
+# 送りありエントリの送り仮名のローマ字 (子音) → その行のかな
+OKURI_KANA = {
+    "a": "あ", "i": "い", "u": "う", "e": "え", "o": "お",
+    "k": "かきくけこ", "g": "がぎぐげご", "s": "さしすせそ", "z": "ざじずぜぞ", "j": "じ",
+    "t": "たちつてとっ", "d": "だぢづでど", "n": "なにぬねのん", "h": "はひふへほ",
+    "f": "ふ", "b": "ばびぶべぼ", "p": "ぱぴぷぺぽ", "m": "まみむめも", "y": "やゆよ",
+    "r": "らりるれろ", "w": "わを", "c": "ち",
+}
+
+
+def parse_skk(path: str, encoding: str, entries: dict[str, list[str]],
+              okuri_stem: bool = False) -> None:
+    """SKK 辞書を読み → 候補の entries に足す。
+
+    送りありエントリは、okuri_stem なら語幹の読み (きm → き) のまま、そうでなければ
+    OKURI_KANA の行のかなを付けた送りなしエントリ (きま /決ま/ ...) にして足す。
+    """
+    with open(path, encoding=encoding, errors="replace") as f:
+        for line in f:
+            if line.startswith(";;"):
+                continue
+            reading, sep, cands = line.rstrip("\n").partition(" /")
+            if not sep or not reading:
+                continue
+            okuri = [""]
+            if reading[-1].isascii():
+                if reading[-1] not in OKURI_KANA or len(reading) < 2:
+                    continue
+                okuri = [""] if okuri_stem else list(OKURI_KANA[reading[-1]])
+                reading = reading[:-1]
+            for kana in okuri:
+                surfaces = entries.setdefault(reading + kana, [])
+                for cand in cands.split("/"):
+                    cand = cand.split(";", 1)[0]
+                    if cand and cand + kana not in surfaces:
+                        surfaces.append(cand + kana)
+
+
+def load_dictionary(eucjp_dict: str = EUCJP_DICT,
+                    utf8_dict: str = UTF8_DICT) -> dict[str, list[str]]:
+    """SKK 辞書 (読み → 候補) を読み込む。tmp/cache/ に pickle してキャッシュする。"""
+    paths = [p for p in (eucjp_dict, utf8_dict) if os.path.exists(p)]
+
+    def build():
+        entries: dict[str, list[str]] = {}
+        if os.path.exists(eucjp_dict):
+            parse_skk(eucjp_dict, "euc-jp", entries)
+        if os.path.exists(utf8_dict):
+            parse_skk(utf8_dict, "utf-8", entries)
+        return entries
+
+    return load_or_build("skk-dict", mtime_key(paths), build)
+
+
+def hiragana_to_katakana(text: str) -> str:
+    return "".join(chr(ord(c) + 0x60) if "ぁ" <= c <= "ゖ" else c for c in text)
+
+
+@dataclass
+class Node:
+    start: int
+    end: int
+    surface: str
+    reading: str
+    word_id: int | None
+    word_cost: float
+
+    @property
+    def word(self) -> str:
+        return f"{self.surface}/{self.reading}"
+
+
+@dataclass
+class Segment:
+    """変換候補の1文節と、そのコストの内訳。"""
+    surface: str
+    reading: str
+    word_cost: float  # 単語コスト (unigram)
+    edge_cost: float  # 直前の文節 (先頭なら BOS) からの連接コスト (bigram)
+    skip_cost: float = 0.0  # 2つ前の文節からの skip-bigram コスト (重み付き)
+
+    @property
+    def cost(self) -> float:
+        return self.word_cost + self.edge_cost + self.skip_cost
+
+
+@dataclass
+class Path:
+    segments: list[Segment]
+    eos_cost: float  # 最後の文節から EOS への連接コスト
+    cost: float = field(init=False)
+
+    def __post_init__(self):
+        self.cost = sum(s.cost for s in self.segments) + self.eos_cost
+
+    @property
+    def surface(self) -> str:
+        return "".join(s.surface for s in self.segments)
+
+    def format(self) -> str:
+        return " ".join(f"{s.surface}/{s.reading}" for s in self.segments)
+
+
+class Scorer:
+    """読みのラティスを作り、k-best の変換候補をコストの内訳つきで返す。
+
+    単語・連接コストの参照結果はインスタンスにキャッシュするので、
+    score_batch でまとめて渡すと共通の単語の参照は1回で済む。
+    """
+
+    def __init__(self, unigram: UnigramModel, bigram: BigramModel,
+                 skip_bigram: BigramModel | None, dictionary: dict[str, list[str]]):
+        self.unigram = unigram
+        self.bigram = bigram
+        self.skip_bigram = skip_bigram
+        self.dictionary = dictionary
+        self.max_reading_len = max(map(len, dictionary), default=1)
+        self._words: dict[str, tuple[int | None, float]] = {}
+        self._edges: dict[tuple[int | None, int | None], float] = {}
+        self._skips: dict[tuple[int | None, int | None], float] = {}
+        self.bos = self._node(0, 0, BOS, BOS)
+        self.eos_id = self.word(f"{EOS}/{EOS}")[0]
+
+    @classmethod
+    def load(cls, model_dir: str = MODEL_DIR, eucjp_dict: str = EUCJP_DICT,
+             utf8_dict: str = UTF8_DICT) -> "Scorer":
+        problems = check_model_layout(model_dir)
+        if problems:
+            raise ValueError(f"{model_dir} のモデルのレイアウトが想定と違います:\n  "
+                             + "\n  ".join(problems[:10]))
+        skip_path = os.path.join(model_dir, "skip_bigram.model")
+        return cls(UnigramModel(os.path.join(model_dir, "unigram.model")),
+                   BigramModel(os.path.join(model_dir, "bigram.model")),
+                   BigramModel(skip_path) if os.path.exists(skip_path) else None,
+                   load_dictionary(eucjp_dict, utf8_dict))
+
+    # --- キャッシュつきの参照 ---
+
+    def word(self, word: str) -> tuple[int | None, float]:
+        found = self._words.get(word)
+        if found is None:
+            found = self.unigram.lookup(word) or (None, self.unigram.default_cost)
+            self._words[word] = found
+        return found
+
+    def edge_cost(self, prev: int | None, node: int | None) -> float:
+        key = (prev, node)
+        cost = self._edges.get(key)
+        if cost is None:
+            cost = None if prev is None or node is None else self.bigram.lookup(prev, node)
+            cost = self._edges[key] = self.bigram.default_cost if cost is None else cost
+        return cost
+
+    def skip_cost(self, prev: int | None, node: int | None) -> float:
+        if self.skip_bigram is None:
+            return 0.0
+        key = (prev, node)
+        cost = self._skips.get(key)
+        if cost is None:
+            cost = None if prev is None or node is None else self.skip_bigram.lookup(prev, node)
+            cost = self.skip_bigram.default_cost if cost is None else cost
+            cost = self._skips[key] = SKIP_BIGRAM_WEIGHT * cost
+        return cost
+
+    # --- ラティス ---
+
+    def _node(self, start: int, end: int, surface: str, reading: str) -> Node:
+        word_id, cost = self.word(f"{surface}/{reading}")
+        return Node(start, end, surface, reading, word_id, cost)
+
+    def candidates(self, reading: str) -> list[str]:
+        """読み1区間の表層の候補。辞書にない読みは1文字のときだけひらがなで候補にする。"""
+        surfaces = self.dictionary.get(reading)
+        if surfaces is None:
+            return [reading] if len(reading) == 1 else []
+        extra = [s for s in (reading, hiragana_to_katakana(reading)) if s not in surfaces]
+        return surfaces + extra
+
+    def lattice(self, reading: str) -> list[list[Node]]:
+        """終了位置ごとのノードの一覧 (ends[0] は BOS、ends[len] の末尾は EOS)。"""
+        n = len(reading)
+        ends: list[list[Node]] = [[] for _ in range(n + 1)]
+        ends[0].append(self.bos)
+        for i in range(n):
+            for j in range(i + 1, min(n, i + self.max_reading_len) + 1):
+                for surface in self.candidates(reading[i:j]):
+                    ends[j].append(self._node(i, j, surface, reading[i:j]))
+        return ends
+
+    def kbest(self, reading: str, k: int = 5) -> list[Path]:
+        """コストの小さい順に最大 k 個の変換候補を返す。"""
+        ends = self.lattice(reading)
+        n = len(reading)
+
+        # 前向きのビタビ: BOS からそのノードまで (ノードの単語コストを含む) の最小コスト
+        forward = {id(self.bos): 0.0}
+        for j in range(1, n + 1):
+            for node in ends[j]:
+                prevs = [p for p in ends[node.start] if id(p) in forward]
+                if prevs:
+                    forward[id(node)] = node.word_cost + min(
+                        forward[id(p)] + self.edge_cost(p.word_id, node.word_id) for p in prevs)
+        finals = [p for p in ends[n] if id(p) in forward and p is not self.bos]
+        if not finals:
+            return []
+
+        # 後ろ向きの A*: forward を残りのコストの (正確な) 見積もりとして使う
+        tie = count()
+        heap = []
+        for p in finals:
+            suffix = self.edge_cost(p.word_id, self.eos_id)
+            heapq.heappush(heap, (forward[id(p)] + suffix, next(tie), p, suffix, ()))
+        paths = []
+        limit = k * RERANK_FACTOR if self.skip_bigram is not None else k
+        while heap and len(paths) < limit:
+            _, _, node, suffix, tail = heapq.heappop(heap)
+            if node is self.bos:
+                paths.append(self._path(tail))
+                continue
+            rest = suffix + node.word_cost
+            for p in ends[node.start]:
+                if id(p) in forward:
+                    s = rest + self.edge_cost(p.word_id, node.word_id)
+                    heapq.heappush(heap, (forward[id(p)] + s, next(tie), p, s, (node,) + tail))
+        paths.sort(key=lambda path: path.cost)
+        return paths[:k]
+
+    def _path(self, nodes) -> Path:
+        segments = []
+        prev2, prev = None, self.bos
+        for node in nodes:
+            skip = self.skip_cost(prev2.word_id, node.word_id) if prev2 is not None else 0.0
+            segments.append(Segment(node.surface, node.reading, node.word_cost,
+                                    self.edge_cost(prev.word_id, node.word_id), skip))
+            prev2, prev = prev, node
+        eos_cost = self.edge_cost(prev.word_id, self.eos_id)
+        if prev2 is not None:
+            eos_cost += self.skip_cost(prev2.word_id, self.eos_id)
+        return Path(segments, eos_cost)
+
+    def score_words(self, words: list[tuple[str, str]]) -> Path:
+        """与えた分割 [(表層, 読み), ...] のコストを、kbest と同じ内訳で計算する。"""
+        pos = 0
+        nodes = []
+        for surface, reading in words:
+            nodes.append(self._node(pos, pos + len(reading), surface, reading))
+            pos += len(reading)
+        return self._path(nodes)
+
+    def score_batch(self, readings, k: int = 5) -> dict[str, list[Path]]:
+        """複数の読みをまとめて変換する。同じ読みは1回だけ計算する。"""
+        results: dict[str, list[Path]] = {}
+        for reading in readings:
+            if reading not in results:
+                results[reading] = self.kbest(reading, k)
+        return results
+
+
+@dataclass
+class Agreement:
+    """Python 版の1位と akaza-data evaluate の1位がどれだけ一致したか (status ごと)。"""
+    total: Counter = field(default_factory=Counter)
+    agreed: Counter = field(default_factory=Counter)
+    # (status, 読み, akaza-data の1位, Python 版の1位)
+    mismatches: list[tuple[str, str, str, str]] = field(default_factory=list)
+
+    @property
+    def rate(self) -> float:
+        n = sum(self.total.values())
+        return sum(self.agreed.values()) / n * 100 if n else 0.0
+
+
+def compare_with_evaluate(scorer: Scorer, records, max_examples: int = 20) -> Agreement:
+    """evaluate の結果 (Record の列) の読みを変換し、akaza-data の1位と比べる。
+
+    evaluate と check は同じモデル・辞書で同じ変換をするので、これが
+    lattice-score.py (Python 版) と check.sh (akaza-data check) の一致率になる。
+    """
+    result = Agreement()
+    for record in records:
+        paths = scorer.kbest(record.reading, 1)
+        surface = paths[0].surface if paths else ""
+        result.total[record.status] += 1
+        if surface == record.akaza:
+            result.agreed[record.status] += 1
+        elif len(result.mismatches) < max_examples:
+            result.mismatches.append((record.status, record.reading, record.akaza, surface))
+    return result
@@ -0,0 +1,268 @@
+"""学習した2つのモデル (unigram / bigram / skip_bigram) のコストの差分。
+
+marisa-trie のキーの列挙順は辞書順ではなく、bigram のキーの単語 ID はモデルごとに
+違う (unigram.model のキー ID)。そこで、それぞれのモデルのキーを
+単語の文字列 ("表層/読み"、bigram は2語をタブでつないだもの) とコストの組にして
+chunk 件ずつ整列した一時ファイルに書き、heapq.merge で辞書順に読みながら
+2つのモデルを突き合わせる (マージ結合)。どちらのモデルも dict には載せないので、
+メモリは chunk 件と上位 top 件ぶんしか使わない。
+
+単語 ID から文字列へは unigram.model の restore_key で引く (よく出る ID は LRU に残す)。
+
+キーのレイアウトは lattice.py と同じ想定で、実際のモデルではまだ確かめていない。
+iter_unigram / iter_bigram は形の合わないキーを読み飛ばすので、レイアウトが違うと
+「全部削除・全部追加」のようなもっともらしい差分になってしまう。diff_models は
+先に両方のモデルを lattice.check_model_layout で調べ、合わなければ ValueError にする。
+"""
+
+import heapq
+import os
+import struct
+import tempfile
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from akaza_tools.incremental import TRAINING_CORPORA
+from akaza_tools.lattice import BOS, EOS, check_model_layout, open_trie
+from akaza_tools.modelprune import COST_DELTA_BINS, default_edge_cost, is_edge
+
+UNIGRAM = "unigram"
+BIGRAM = "bigram"
+SKIP_BIGRAM = "skip_bigram"
+KINDS = (UNIGRAM, BIGRAM, SKIP_BIGRAM)
+# 一時ファイルに書くまでにメモリに溜める件数
+CHUNK = 1_000_000
+
+_F32 = struct.Struct("<f")
+
+
+def iter_unigram(trie) -> Iterator[tuple[str, float]]:
+    """unigram.model の ("表層/読み", コスト)。メタデータ (__TOTAL_WORDS__ など) は除く。"""
+    for key in trie.iterkeys():
+        if len(key) < 5 or key[-5] != 0xFF:
+            continue
+        word = key[:-5].decode(errors="replace")
+        if "/" in word:
+            yield word, _F32.unpack(key[-4:])[0]
+
+
+def word_lookup(unigram_trie, cache_size: int = 1 << 16):
+    """単語 ID → "表層/読み"。"""
+    @lru_cache(maxsize=cache_size)
+    def word(word_id: int) -> str:
+        return unigram_trie.restore_key(word_id)[:-5].decode(errors="replace")
+    return word
+
+
+def iter_bigram(trie, word) -> Iterator[tuple[str, float]]:
+    """bigram.model / skip_bigram.model の ("語1<TAB>語2", コスト)。"""
+    for key in trie.iterkeys():
+        if is_edge(key):
+            w1 = word(int.from_bytes(key[:3], "little"))
+            w2 = word(int.from_bytes(key[3:6], "little"))
+            yield f"{w1}\t{w2}", _F32.unpack(key[6:])[0]
+
+
+def _write_run(entries: list[tuple[str, float]], tmp_dir: str) -> str:
+    fd, path = tempfile.mkstemp(suffix=".run", dir=tmp_dir)
+    with os.fdopen(fd, "w") as f:
+        for key, cost in sorted(entries):
+            f.write(f"{key}\t{cost!r}\n")
+    return path
+
+
+def _read_run(f) -> Iterator[tuple[str, float]]:
+    for line in f:
+        key, _, cost = line.rstrip("\n").rpartition("\t")
+        yield key, float(cost)
+
+
+def sorted_entries(entries: Iterable[tuple[str, float]], tmp_dir: str,
+                   chunk: int = CHUNK) -> Iterator[tuple[str, float]]:
+    """entries を chunk 件ずつ整列して tmp_dir に書き、キーの順にマージして返す。"""
+    runs, batch = [], []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= chunk:
+            runs.append(_write_run(batch, tmp_dir))
+            batch = []
+    if not runs:
+        yield from sorted(batch)
+        return
+    if batch:
+        runs.append(_write_run(batch, tmp_dir))
+    files = [open(path) for path in runs]
+    try:
+        yield from heapq.merge(*(_read_run(f) for f in files))
+    finally:
+        for f, path in zip(files, runs):
+            f.close()
+            os.remove(path)
+
+
+def merge_join(old: Iterator[tuple[str, float]], new: Iterator[tuple[str, float]]
+               ) -> Iterator[tuple[str, float | None, float | None]]:
+    """キーの順に並んだ2つの列を突き合わせ、(キー, 旧コスト, 新コスト) を返す。"""
+    sentinel = (None, 0.0)
+    a, b = next(old, sentinel), next(new, sentinel)
+    while a[0] is not None or b[0] is not None:
+        if b[0] is None or (a[0] is not None and a[0] < b[0]):
+            yield a[0], a[1], None
+            a = next(old, sentinel)
+        elif a[0] is None or b[0] < a[0]:
+            yield b[0], None, b[1]
+            b = next(new, sentinel)
+        else:
+            yield a[0], a[1], b[1]
+            a, b = next(old, sentinel), next(new, sentinel)
+
+
+class _TopN:
+    """score の大きい順に n 件を残す。"""
+
+    def __init__(self, n: int):
+        self.n = n
+        self.heap: list[tuple[float, str, tuple]] = []
+
+    def push(self, score: float, key: str, item: tuple) -> None:
+        if len(self.heap) < self.n:
+            heapq.heappush(self.heap, (score, key, item))
+        elif self.n and score > self.heap[0][0]:
+            heapq.heapreplace(self.heap, (score, key, item))
+
+    def items(self) -> list[tuple]:
+        return [item for _, _, item in sorted(self.heap, reverse=True)]
+
+
+@dataclass
+class ModelDiff:
+    kind: str
+    common: int = 0
+    changed: int = 0
+    increased: int = 0  # コストが上がった (出にくくなった) キー
+    added: int = 0
+    removed: int = 0
+    # |新 - 旧| の COST_DELTA_BINS の各区間 + それ以上 の件数 (変わったキーのみ)
+    delta_histogram: list[int] = field(default_factory=lambda: [0] * (len(COST_DELTA_BINS) + 1))
+    sum_delta: float = 0.0
+    default_costs: tuple[float, float] | None = None  # bigram の (旧, 新) デフォルトコスト
+    top_changed: list[tuple[str, float, float]] = field(default_factory=list)
+    # 追加・削除されたキーはコストの低い (よく使われる) 順
+    top_added: list[tuple[str, float]] = field(default_factory=list)
+    top_removed: list[tuple[str, float]] = field(default_factory=list)
+
+    @property
+    def mean_delta(self) -> float:
+        return self.sum_delta / self.changed if self.changed else 0.0
+
+
+def diff_entries(kind: str, old: Iterator[tuple[str, float]],
+                 new: Iterator[tuple[str, float]], top: int) -> ModelDiff:
+    diff = ModelDiff(kind)
+    changed, added, removed = _TopN(top), _TopN(top), _TopN(top)
+    for key, a, b in merge_join(old, new):
+        if a is None:
+            diff.added += 1
+            added.push(-b, key, (key, b))
+        elif b is None:
+            diff.removed += 1
+            removed.push(-a, key, (key, a))
+        else:
+            diff.common += 1
+            if a == b:
+                continue
+            delta = b - a
+            diff.changed += 1
+            diff.increased += delta > 0
+            diff.sum_delta += delta
+            diff.delta_histogram[next((i for i, x in enumerate(COST_DELTA_BINS)
+                                       if abs(delta) < x), len(COST_DELTA_BINS))] += 1
+            changed.push(abs(delta), key, (key, a, b))
+    diff.top_changed = changed.items()
+    diff.top_added = added.items()
+    diff.top_removed = removed.items()
+    return diff
+
+
+def diff_models(old_dir: str, new_dir: str, kinds=KINDS, top: int = 20,
+                chunk: int = CHUNK, tmp_dir: str | None = None, log=print) -> list[ModelDiff]:
+    """2つのモデルディレクトリの kinds のモデルを比べる。
+
+    どちらかのモデルのキーのレイアウトが想定と違えば ValueError。
+    """
+    for model_dir in (old_dir, new_dir):
+        problems = check_model_layout(model_dir)
+        if problems:
+            raise ValueError(f"{model_dir} のモデルのレイアウトが想定と違います:\n  "
+                             + "\n  ".join(problems[:10]))
+    old_uni = open_trie(os.path.join(old_dir, "unigram.model"))
+    new_uni = open_trie(os.path.join(new_dir, "unigram.model"))
+    old_word, new_word = word_lookup(old_uni), word_lookup(new_uni)
+    diffs = []
+    with tempfile.TemporaryDirectory(prefix="model-diff-", dir=tmp_dir) as work:
+        for kind in kinds:
+            log(f"{kind}: comparing...")
+            if kind == UNIGRAM:
+                old, new = iter_unigram(old_uni), iter_unigram(new_uni)
+                default_costs = None
+            else:
+                name = f"{kind}.model"
+                if not (os.path.exists(os.path.join(old_dir, name))
+                        and os.path.exists(os.path.join(new_dir, name))):
+                    log(f"{kind}: {name} がないので飛ばします")
+                    continue
+                old_trie = open_trie(os.path.join(old_dir, name))
+                new_trie = open_trie(os.path.join(new_dir, name))
+                old, new = iter_bigram(old_trie, old_word), iter_bigram(new_trie, new_word)
+                default_costs = (default_edge_cost(old_trie), default_edge_cost(new_trie))
+            diff = diff_entries(kind, sorted_entries(old, work, chunk),
+                                sorted_entries(new, work, chunk), top)
+            diff.default_costs = default_costs
+            diffs.append(diff)
+    return diffs
+
+
+@dataclass
+class CorpusHits:
+    count: int = 0
+    examples: list[str] = field(default_factory=list)  # "path:行番号: 行"
+
+
+def link_corpus(keys: dict[str, set[str]], corpora=TRAINING_CORPORA,
+                max_examples: int = 3) -> dict[tuple[str, str], CorpusHits]:
+    """(種類, キー) → そのキーを含む training-corpus の行。
+
+    keys は種類 → キーの集合。bigram は隣り合う2語、skip_bigram は1語おいた2語で、
+    文頭・文末は __BOS__ / __EOS__ とする。トークンは書かれたままの表記で照合する
+    (learn-corpus はコーパスの表記のまま学習する)。
+    """
+    hits: dict[tuple[str, str], CorpusHits] = {}
+    unigrams, bigrams, skips = (keys.get(k, set()) for k in KINDS)
+
+    def hit(kind: str, key: str, where: str) -> None:
+        h = hits.setdefault((kind, key), CorpusHits())
+        h.count += 1
+        if len(h.examples) < max_examples:
+            h.examples.append(where)
+
+    for path in corpora:
+        if not os.path.exists(path):
+            continue
+        with open(path) as f:
+            for lineno, line in enumerate(f, 1):
+                if not line.strip() or line.startswith(";;"):
+                    continue
+                raw = line.split()
+                tokens = (f"{BOS}/{BOS}", *raw, f"{EOS}/{EOS}")
+                found = set()
+                for i, token in enumerate(tokens):
+                    if token in unigrams:
+                        found.add((UNIGRAM, token))
+                    if i + 1 < len(tokens) and f"{token}\t{tokens[i + 1]}" in bigrams:
+                        found.add((BIGRAM, f"{token}\t{tokens[i + 1]}"))
+                    if i + 2 < len(tokens) and f"{token}\t{tokens[i + 2]}" in skips:
+                        found.add((SKIP_BIGRAM, f"{token}\t{tokens[i + 2]}"))
+                for kind, key in found:
+                    hit(kind, key, f"{path}:{lineno}: {' '.join(raw)}")
+    return hits
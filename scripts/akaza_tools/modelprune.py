@@ -0,0 +1,154 @@
+"""bigram.model / skip_bigram.model の容量の分析と枝刈り。
+
+モデルにないエッジは __DEFAULT_EDGE_COST__ (バックオフのコスト) で連接されるので、
+コストがデフォルトとほとんど変わらないエントリは消しても変換結果への影響が小さい。
+|コスト - デフォルト| が threshold 未満のエントリを消して trie を作り直す。
+
+unigram.model はキーの ID が単語 ID として bigram のキーから参照されているので、
+作り直すと ID が変わってしまう。枝刈りの対象にはせず、そのままコピーする。
+
+quantize_bits を指定すると、コストを [最小, 最大] を 2^bits 段階に分けた値に丸める。
+キーのフォーマット (f32) は akaza 本体が読むので変えられないが、値の種類が減ると
+marisa-trie がキーの末尾を共有しやすくなり、ファイルが小さくなる。
+"""
+
+import os
+import shutil
+import struct
+from dataclasses import dataclass, field
+
+from akaza_tools.lattice import open_trie
+
+try:
+    import marisa_trie
+except ImportError:  # trie を作り直すときにだけ必要
+    marisa_trie = None
+
+MODEL_FILES = ("unigram.model", "bigram.model", "skip_bigram.model")
+PRUNABLE = ("bigram.model", "skip_bigram.model")
+DEFAULT_EDGE_COST_KEY = b"__DEFAULT_EDGE_COST__"
+# |コスト - デフォルト| のヒストグラムの区切り
+COST_DELTA_BINS = (0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+# 単語 ID 3バイト × 2 + コスト f32
+_EDGE_KEY_LEN = 3 + 3 + 4
+_F32 = struct.Struct("<f")
+
+
+def is_edge(key: bytes) -> bool:
+    # メタデータのキー ("__DEFAULT_EDGE_COST__" など) はどれもこれより長い
+    return len(key) == _EDGE_KEY_LEN
+
+
+def default_edge_cost(trie) -> float:
+    for key in trie.keys(DEFAULT_EDGE_COST_KEY):
+        if len(key) == len(DEFAULT_EDGE_COST_KEY) + 4:
+            return _F32.unpack(key[-4:])[0]
+    return 20.0
+
+
+@dataclass
+class ModelProfile:
+    path: str
+    size: int  # ファイルのバイト数
+    keys: int
+    edges: int = 0  # bigram のエントリ数 (unigram では 0)
+    default_cost: float | None = None
+    distinct_costs: int = 0
+    # COST_DELTA_BINS の各区間 + それ以上 のエントリ数
+    delta_histogram: list[int] = field(default_factory=list)
+
+
+def profile_model(path: str) -> ModelProfile:
+    trie = open_trie(path)
+    profile = ModelProfile(path, os.path.getsize(path), len(trie))
+    if os.path.basename(path) not in PRUNABLE:
+        return profile
+    default = profile.default_cost = default_edge_cost(trie)
+    histogram = [0] * (len(COST_DELTA_BINS) + 1)
+    costs = set()
+    for key in trie.iterkeys():
+        if not is_edge(key):
+            continue
+        cost = _F32.unpack(key[6:])[0]
+        costs.add(key[6:])
+        delta = abs(cost - default)
+        histogram[next((i for i, b in enumerate(COST_DELTA_BINS) if delta < b),
+                       len(COST_DELTA_BINS))] += 1
+        profile.edges += 1
+    profile.distinct_costs = len(costs)
+    profile.delta_histogram = histogram
+    return profile
+
+
+def profile_models(model_dir: str) -> list[ModelProfile]:
+    return [profile_model(os.path.join(model_dir, name)) for name in MODEL_FILES
+            if os.path.exists(os.path.join(model_dir, name))]
+
+
+class Quantizer:
+    """[lo, hi] を 2^bits 段階に分けた値への丸め。"""
+
+    def __init__(self, lo: float, hi: float, bits: int):
+        self.lo = lo
+        self.step = (hi - lo) / ((1 << bits) - 1) if hi > lo else 0.0
+
+    def __call__(self, cost: float) -> float:
+        if self.step == 0.0:
+            return cost
+        return self.lo + round((cost - self.lo) / self.step) * self.step
+
+
+@dataclass
+class PruneStats:
+    name: str
+    before: int  # エントリ数
+    after: int
+    size_before: int
+    size_after: int
+
+
+def prune_model(src: str, dst: str, threshold: float,
+                quantize_bits: int | None = None) -> PruneStats:
+    """src のエントリのうち、デフォルトのコストとの差が threshold 未満のものを消して dst に書く。"""
+    if marisa_trie is None:
+        raise ModuleNotFoundError(
+            "marisa_trie がありません。pip install marisa-trie でインストールしてください")
+    trie = open_trie(src)
+    default = default_edge_cost(trie)
+    edges, meta = [], []
+    for key in trie.iterkeys():
+        if is_edge(key):
+            edges.append((key[:6], _F32.unpack(key[6:])[0]))
+        else:
+            meta.append(key)
+
+    kept = [(pair, cost) for pair, cost in edges if abs(cost - default) >= threshold]
+    if quantize_bits and kept:
+        costs = [cost for _, cost in kept]
+        quantize = Quantizer(min(costs), max(costs), quantize_bits)
+        kept = [(pair, quantize(cost)) for pair, cost in kept]
+    keys = meta + [pair + _F32.pack(cost) for pair, cost in kept]
+
+    tmp = dst + ".tmp"
+    marisa_trie.BinaryTrie(keys).save(tmp)
+    os.replace(tmp, dst)
+    return PruneStats(os.path.basename(src), len(edges), len(kept),
+                      os.path.getsize(src), os.path.getsize(dst))
+
+
+def prune_models(src_dir: str, dst_dir: str, threshold: float,
+                 quantize_bits: int | None = None) -> list[PruneStats]:
+    """src_dir のモデルを枝刈りして dst_dir に書く。unigram.model はコピーするだけ。"""
+    os.makedirs(dst_dir, exist_ok=True)
+    if not os.path.samefile(src_dir, dst_dir):
+        shutil.copyfile(os.path.join(src_dir, "unigram.model"),
+                        os.path.join(dst_dir, "unigram.model"))
+    return [prune_model(os.path.join(src_dir, name), os.path.join(dst_dir, name),
+                        threshold, quantize_bits)
+            for name in PRUNABLE]
+
+
+def models_size(model_dir: str) -> int:
+    return sum(os.path.getsize(os.path.join(model_dir, name)) for name in MODEL_FILES
+               if os.path.exists(os.path.join(model_dir, name)))
@@ -0,0 +1,158 @@
+"""表記の正規化キー。キーが同じ期待値と変換結果は表記揺れだけが違うとみなす。
+
+キーは次の順に作る。
+
+1. str.translate の表で、全角英数字・記号・空白を半角に畳む
+2. 表記揺れの規則の各表記を Aho–Corasick のオートマトンで左から最長一致で探し、
+   その表記が属する同値類の代表 (かなを優先) に置き換える
+
+カタカナとひらがなは畳まない (カメラ と かめら は別の表記)。カタカナ・ひらがなの
+揺れは、規則に組として書かれたもの (例: 寝る↔ねる と同じように ネコ↔ねこ) だけを
+同じ表記とみなす。
+
+規則は evaluate-filter/skip-patterns.tsv の組と、evaluate-filter/accept.tsv の
+4列目 (理由) に書かれた `style:無い→ない,事→こと` や `寝る↔ねる` の組。
+組は推移的にまとめるので、何→なん と 何→なに があれば なん と なに も同じ表記になる。
+StyleMatcher.equivalent() と違い、置き換えの組み合わせを探索せずに文字列を
+1回なめるだけで済むので、規則が増えても1文あたりの時間はほとんど変わらない。
+"""
+
+import re
+from collections import Counter
+
+from akaza_tools.ahocorasick import Automaton
+from akaza_tools.diskcache import content_key, load_or_build
+from akaza_tools.filterstore import iter_rules
+from akaza_tools.records import ACCEPT_PATH
+from akaza_tools.style import SKIP_PATTERNS_PATH, load_skip_pairs
+
+# 全角の英数字・記号 (U+FF01 ！ から U+FF5E ～ まで) → 半角
+WIDTH_TABLE = {c: c - 0xFEE0 for c in range(0xFF01, 0xFF5F)}
+# 上に加えて全角空白 → 半角
+FOLD_TABLE = WIDTH_TABLE | {0x3000: 0x20}
+
+# accept.tsv の style: の理由に書かれた組 (表記A→表記B, 表記A↔表記B, 表記A/表記B,
+# 「表記A」と「表記B」)
+_WORD = r"[^\s,、+＋「」()（）/→↔:：]+"
+_NOTE_RE = re.compile(r"（[^）]*）|\([^)]*\)")
+_STYLE_PAIR_RES = (re.compile(rf"({_WORD})\s*[→↔/]\s*({_WORD})"),
+                   re.compile(r"「([^」/]+)」と「([^」/]+)」"))
+
+
+def fold(text: str) -> str:
+    return text.translate(FOLD_TABLE)
+
+
+def strip_okurigana(a: str, b: str) -> tuple[str, str]:
+    """共通の末尾 (送り仮名) を、どちらも2文字以上残るように除いた組。
+
+    活用形にも当てはまるようにする (例: 分かる→わかる は 分か→わか として
+    分かった/わかった にも使う)。1文字のかなまで縮めると 言→い と 居→い から
+    言≡居 のように別の語がまとまってしまうので、2文字は残す。
+    """
+    n = 0
+    while n < min(len(a), len(b)) - 2 and a[-1 - n] == b[-1 - n]:
+        n += 1
+    return (a[:-n], b[:-n]) if n else (a, b)
+
+
+def harvest_accept_pairs(path: str = ACCEPT_PATH) -> Counter[tuple[str, str]]:
+    """accept.tsv の理由の列から表記揺れの組を集める。組 → 書かれていた行数。"""
+    pairs = Counter()
+    for _, parts in iter_rules(path):
+        if len(parts) < 4 or not parts[3].startswith("style:"):
+            continue
+        reason = _NOTE_RE.sub("", parts[3].removeprefix("style:"))
+        for pattern in _STYLE_PAIR_RES:
+            for a, b in pattern.findall(reason):
+                pairs[strip_okurigana(a, b)] += 1
+    return pairs
+
+
+def _is_kana(text: str) -> bool:
+    return all("ぁ" <= c <= "ゖ" or "ァ" <= c <= "ヶ" or c in "ーゝゞヽヾ" for c in text)
+
+
+class Normalizer:
+    """表記の正規化キーを作る。pickle してキャッシュする。
+
+    組は優先度の高い順に渡す。同値類にかな以外の表記 (漢字を含む表記) と
+    かなの表記はそれぞれ1つしか入れない。泣く→なく と 鳴く→なく のように、
+    かなを介して別の漢字表記がまとまる組や、何→なん と 何→なに のように、
+    漢字を介して別の読みがまとまる組は後から来たほうを捨てて conflicts に残す
+    (なん と なに を同じ表記とみなすと、読みの誤りまで正解になってしまう)。
+    ただし 越→超 や ネコ↔ねこ のように組そのものが漢字表記同士・かな表記同士なら、
+    それぞれが類の唯一の漢字表記・かな表記である限りまとめる。
+    """
+
+    def __init__(self, pairs):
+        parent: dict[str, str] = {}
+        kanji: dict[str, set[str]] = {}  # 類の代表 → かな以外の表記
+        kana: dict[str, set[str]] = {}  # 類の代表 → かなの表記
+        self.conflicts: list[tuple[str, str]] = []
+
+        def find(x: str) -> str:
+            if x not in parent:
+                parent[x] = x
+                kanji[x], kana[x] = (set(), {x}) if _is_kana(x) else ({x}, set())
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for a, b in pairs:
+            a, b = fold(a), fold(b)
+            if not a or not b or a == b:
+                continue
+            ra, rb = find(a), find(b)
+            if ra == rb:
+                continue
+            merged = kanji[ra] | kanji[rb]
+            # かなの表記は両方の類にあるときだけ増える (猫→ねこ は ネコ≡ねこ の類に足せる)
+            if ((len(merged) > 1 and not (kanji[ra] == {a} and kanji[rb] == {b}))
+                    or (kana[ra] and kana[rb] and not (kana[ra] == {a} and kana[rb] == {b}))):
+                self.conflicts.append((a, b))
+                continue
+            # 代表は小さいほう (かなは漢字より符号位置が小さいので、かなが代表になる)
+            root, child = min(ra, rb), max(ra, rb)
+            parent[child] = root
+            kanji[root], kana[root] = merged, kana[ra] | kana[rb]
+            del kanji[child], kana[child]
+        variants = sorted(parent)
+        self.automaton = Automaton(variants)
+        self.canonical = [find(v) for v in variants]
+
+    @property
+    def n_variants(self) -> int:
+        return len(self.canonical)
+
+    def key(self, text: str) -> str:
+        text = fold(text)
+        starts = self.automaton.matches_by_start(text)
+        if not starts:
+            return text
+        patterns = self.automaton.patterns
+        out = []
+        i = 0
+        while i < len(text):
+            found = starts.get(i)
+            if not found:
+                out.append(text[i])
+                i += 1
+                continue
+            p = max(found, key=lambda p: len(patterns[p]))
+            out.append(self.canonical[p])
+            i += len(patterns[p])
+        return "".join(out)
+
+    def equivalent(self, corpus: str, akaza: str) -> bool:
+        return corpus == akaza or self.key(corpus) == self.key(akaza)
+
+
+def load_normalizer(skip_path: str = SKIP_PATTERNS_PATH,
+                    accept_path: str = ACCEPT_PATH) -> Normalizer:
+    # 手で整理した skip-patterns.tsv を先に、accept.tsv の組は多く書かれている順に
+    return load_or_build(
+        "normalizer", content_key([skip_path, accept_path]),
+        lambda: Normalizer(sorted(load_skip_pairs(skip_path))
+                           + [p for p, _ in harvest_accept_pairs(accept_path).most_common()]))
@@ -0,0 +1,192 @@
+"""evaluate の BAD 行から誤変換パターン (期待値 → 変換結果の差分) を集計する。
+
+1文に複数の誤りがあれば、akaza_tools.align で得たそれぞれの誤り箇所を
+別のパターンとして数える。
+
+表記揺れ (evaluate-filter/skip-patterns.tsv) だけで説明できる差分は数えず、
+変換結果側に分節崩壊キーワード (evaluate-filter/segmentation-keywords.txt) を
+含むパターンは分節崩壊として分類する。
+"""
+
+import re
+from collections import Counter, defaultdict
+
+from akaza_tools.align import BunsetsuIndex, align_chars
+from akaza_tools.records import Record
+from akaza_tools.style import load_keyword_automaton, load_style_matcher
+
+
+# 1文字同士の差分 (ノイズが多い)
+MIN_DIFF_LEN = 2
+
+
+_DIGIT_TABLE = str.maketrans("０１２３４５６７８９", "0123456789")
+
+
+def normalize_digits(text: str) -> str:
+    return text.translate(_DIGIT_TABLE)
+
+
+KANJI_RE = re.compile(r"[一-龯々〆ヵヶ]")
+
+# 誤変換の種類 (サンプル抽出の層)。1文に複数の誤りがあれば先に該当するものを採る
+CONFUSION_CLASSES = ("segmentation", "kana_kanji", "homophone", "other")
+
+
+def load_bunsetsu_index() -> BunsetsuIndex | None:
+    try:
+        return BunsetsuIndex()
+    except FileNotFoundError:
+        return None  # 評価コーパスがなければ文字単位の差分だけを使う
+
+
+class ConfusionClassifier:
+    """[BAD] レコードを誤変換の種類 (CONFUSION_CLASSES) に分類する。
+
+    segmentation: 変換結果側に分節崩壊キーワードを含む
+    kana_kanji:   表記揺れ、または片側が漢字を含まない (開き閉じ)
+    homophone:    両側が漢字を含む (同音異義語)
+    """
+
+    def __init__(self, index: BunsetsuIndex | None = None):
+        self.index = index if index is not None else load_bunsetsu_index()
+        self.style = load_style_matcher()
+        self.keywords = load_keyword_automaton()
+
+    def classify(self, record: Record) -> str:
+        if self.index is not None:
+            spans = self.index.align(record.reading, record.corpus, record.akaza)
+        else:
+            spans = align_chars(record.corpus, record.akaza)
+        found = set()
+        for span in spans:
+            c_diff, a_diff = span.corpus, span.akaza
+            if self.keywords.search(a_diff):
+                found.add("segmentation")
+            elif (self.style.equivalent(c_diff, a_diff)
+                  or not KANJI_RE.search(c_diff) or not KANJI_RE.search(a_diff)):
+                found.add("kana_kanji")
+            else:
+                found.add("homophone")
+        return next((c for c in CONFUSION_CLASSES if c in found), "other")
+
+
+class PatternCollector:
+    """[BAD] レコードを1件ずつ受け取り、誤変換パターンを数える。"""
+
+    def __init__(self, index: BunsetsuIndex | None = None):
+        self.index = index if index is not None else load_bunsetsu_index()
+        self.style = load_style_matcher()
+        self.keywords = load_keyword_automaton()
+        self.n_bad = 0
+        self.confusion: Counter[tuple[str, str]] = Counter()
+        self.examples: dict[tuple[str, str], list[tuple[str, str, str]]] = defaultdict(list)
+
+    def feed(self, record: Record) -> None:
+        if record.status != "BAD":
+            return
+        self.n_bad += 1
+        corpus_text = record.corpus
+        akaza_text = record.akaza
+
+        # 数字全角半角の差分のみ → スキップ
+        if normalize_digits(corpus_text) == normalize_digits(akaza_text):
+            return
+
+        if self.index is not None:
+            spans = self.index.align(record.reading, corpus_text, akaza_text)
+        else:
+            spans = align_chars(corpus_text, akaza_text)
+        for span in spans:
+            c_diff, a_diff = span.corpus, span.akaza
+            if not c_diff or not a_diff:
+                continue
+            if self.style.equivalent(c_diff, a_diff):
+                continue
+            if len(c_diff) < MIN_DIFF_LEN and len(a_diff) < MIN_DIFF_LEN:
+                continue
+
+            self.confusion[(c_diff, a_diff)] += 1
+            if len(self.examples[(c_diff, a_diff)]) < 3:
+                self.examples[(c_diff, a_diff)].append(
+                    (record.reading, corpus_text, akaza_text))
+
+    def classify(self) -> tuple[dict[tuple[str, str], int], dict[tuple[str, str], int]]:
+        """3回以上出現したパターンを (分節崩壊, 同音異義語・その他) に分ける。"""
+        # 分節崩壊: 語尾パターンが壊れるもの (must 候補)
+        segmentation_failures = {}
+        # 同音異義語 (should 候補)
+        homophones = {}
+        for (correct, wrong), count in self.confusion.most_common():
+            if count < 3:
+                break
+            if self.keywords.search(wrong):
+                segmentation_failures[(correct, wrong)] = count
+            else:
+                homophones[(correct, wrong)] = count
+        return segmentation_failures, homophones
+
+    def print_report(self) -> None:
+        segmentation_failures, homophones = self.classify()
+
+        # --- 出力 ---
+        print("=" * 70)
+        print("分節崩壊パターン (must 候補)")
+        print("Wikipedia コーパスの偏りや語尾の誤分節が原因")
+        print("=" * 70)
+        for (correct, wrong), count in sorted(
+            segmentation_failures.items(), key=lambda x: -x[1]
+        ):
+            exs = self.examples[(correct, wrong)]
+            print(f"  {correct} → {wrong}  ({count}回)")
+            for _, corpus_text, akaza_text in exs[:1]:
+                print(f"    期待: {corpus_text}")
+                print(f"    実際: {akaza_text}")
+
+        print()
+        print("=" * 70)
+        print("同音異義語・その他パターン (should 候補)")
+        print("=" * 70)
+        for (correct, wrong), count in sorted(
+            homophones.items(), key=lambda x: -x[1]
+        ):
+            exs = self.examples[(correct, wrong)]
+            print(f"  {correct} → {wrong}  ({count}回)")
+            for _, corpus_text, akaza_text in exs[:1]:
+                print(f"    期待: {corpus_text}")
+                print(f"    実際: {akaza_text}")
+
+        # --- LLM プロンプト生成 ---
+        print()
+        print("=" * 70)
+        print("LLM プロンプト (以下をそのまま LLM に渡してください)")
+        print("=" * 70)
+
+        all_patterns = []
+        for (correct, wrong), count in sorted(
+            segmentation_failures.items(), key=lambda x: -x[1]
+        ):
+            all_patterns.append((correct, wrong, count, "must"))
+        for (correct, wrong), count in sorted(
+            homophones.items(), key=lambda x: -x[1]
+        ):
+            all_patterns.append((correct, wrong, count, "should"))
+
+        # バッチに分割 (20パターンずつ)
+        batch_size = 20
+        for batch_idx in range(0, len(all_patterns), batch_size):
+            batch = all_patterns[batch_idx:batch_idx + batch_size]
+            print(f"\n--- バッチ {batch_idx // batch_size + 1} ---\n")
+            print("以下の同音異義語・誤変換パターンについて、「正しい方」が自然に使われる日本語文を各2つ生成してください。")
+            print("出力は `漢字/よみ スペース区切り` のコーパス形式でお願いします。")
+            print("1文は10〜30字程度。口語・書き言葉どちらでも可。")
+            print("各単語を `表層形/読み` のペアにし、スペースで区切ってください。")
+            print()
+            print("出力例:")
+            print("この/この 機能/きのう を/を 使用/しよう する/する")
+            print("性能/せいのう の/の 向上/こうじょう を/を 目指す/めざす")
+            print()
+            print("パターン一覧:")
+            for correct, wrong, count, tier in batch:
+                print(f"- 「{correct}」が正しいのに「{wrong}」と誤変換される")
+            print()
@@ -0,0 +1,106 @@
+"""評価結果から文字単位の再現率 (LCS ベース) を計算し直す。
+
+akaza-data evaluate の再現率は、期待値と変換結果 (1位) の最長共通部分列 (LCS) の
+文字数の合計を、期待値の文字数の合計で割ったもの。ここでは同じ値を
+results.cache から計算し直し、BadFilter の判定を反映した Adjusted Recall も出す。
+
+- ignore.txt に該当する文は分子・分母の両方から除く
+- accept.tsv に該当する文と、正規化キーが同じ文は正解 (LCS = 期待値の文字数) とみなす
+- BAD だけでなく TOP-5 の文も1位が違うので LCS を計算し、同じように判定する
+
+LCS は Hyyrö のビット並列アルゴリズムで求める。期待値の文字ごとの出現位置の
+ビット列を Python の整数で持ち、変換結果の1文字につき数回の整数演算で済む。
+共通の先頭・末尾は先に除くので、ビット列は差分の範囲の長さしかない。
+"""
+
+from dataclasses import dataclass
+
+from akaza_tools.cache import GOOD, STATUS_NAMES, EvalCache
+from akaza_tools.filtering import IGNORED, BadFilter
+from akaza_tools.records import Record
+
+
+def lcs_length(a: str, b: str) -> int:
+    """a と b の最長共通部分列の長さ。"""
+    n = min(len(a), len(b))
+    head = 0
+    while head < n and a[head] == b[head]:
+        head += 1
+    tail = 0
+    while tail < n - head and a[-1 - tail] == b[-1 - tail]:
+        tail += 1
+    a, b = a[head:len(a) - tail], b[head:len(b) - tail]
+    if not a or not b:
+        return head + tail
+
+    masks: dict[str, int] = {}
+    for i, c in enumerate(a):
+        masks[c] = masks.get(c, 0) | (1 << i)
+    full = (1 << len(a)) - 1
+    # v の 0 のビットが LCS に使った a の文字
+    v = full
+    for c in b:
+        u = v & masks.get(c, 0)
+        v = ((v + u) | (v - u)) & full
+    return head + tail + len(a) - v.bit_count()
+
+
+@dataclass
+class RecallReport:
+    sentences: int = 0
+    chars: int = 0  # 期待値の文字数
+    matched: int = 0  # LCS の文字数
+    adjusted_chars: int = 0
+    adjusted_matched: int = 0
+    excluded: int = 0  # ignore で除いた文
+    accepted: int = 0  # 失敗した文のうち正解とみなした文
+
+    @property
+    def recall(self) -> float:
+        return self.matched / self.chars * 100 if self.chars else 0.0
+
+    @property
+    def adjusted_recall(self) -> float:
+        return (self.adjusted_matched / self.adjusted_chars * 100
+                if self.adjusted_chars else 0.0)
+
+    def print_report(self, reference: float | None = None) -> None:
+        note = f" (akaza-data: {reference:.6f})" if reference is not None else ""
+        print(f"  Recall (recomputed):    {self.recall:.6f}{note}")
+        print(f"  Adjusted Recall:        {self.adjusted_recall:.6f} "
+              f"({self.accepted} accepted, {self.excluded} ignored of {self.sentences})")
+
+
+def compute_recall(cache: EvalCache, bad_filter: BadFilter) -> RecallReport:
+    """results.cache の全文について、再現率と Adjusted Recall を計算する。"""
+    report = RecallReport(sentences=cache.n_sentences)
+    status = bytes(cache.status)
+    for i in range(cache.n_sentences):
+        reading = cache.string(cache.reading_ids[i])
+        corpus = cache.string(cache.corpus_ids[i])
+        n = len(corpus)
+        report.chars += n
+        if status[i] == GOOD:
+            report.matched += n
+            if bad_filter.store.is_ignored(reading):
+                report.excluded += 1
+            else:
+                report.adjusted_chars += n
+                report.adjusted_matched += n
+            continue
+
+        akaza = cache.string(cache.akaza_ids[i])
+        lcs = lcs_length(corpus, akaza)
+        report.matched += lcs
+        record = Record(STATUS_NAMES[status[i]], reading, corpus, akaza, "")
+        verdict = bad_filter.classify(record)
+        if verdict == IGNORED:
+            report.excluded += 1
+            continue
+        report.adjusted_chars += n
+        if verdict is None:
+            report.adjusted_matched += lcs
+        else:
+            report.accepted += 1
+            report.adjusted_matched += n
+    return report
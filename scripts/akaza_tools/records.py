@@ -0,0 +1,77 @@
+"""evaluate 出力 ([BAD]/[TOP-5] 行) のパーサーと、評価ディレクトリの探索。
+
+各スクリプトが個別に正規表現で bad.txt/raw.txt を読んでいたのを、
+ここの1つのパーサーとジェネレーターにまとめている。
+"""
+
+import os
+import re
+import sys
+from typing import Iterable, Iterator, NamedTuple
+
+EVALUATE_BASE = "tmp/evaluate"
+ACCEPT_PATH = "evaluate-filter/accept.tsv"
+IGNORE_PATH = "evaluate-filter/ignore.txt"
+
+# "[BAD] よみ => corpus=期待値, akaza=変換結果"
+RECORD_RE = re.compile(r"\[(BAD|TOP-5)\]\s+(.+?)\s+=>\s+corpus=(.+?),\s+akaza=(.+)")
+
+
+class Record(NamedTuple):
+    status: str  # "BAD" または "TOP-5"
+    reading: str
+    corpus: str
+    akaza: str
+    line: str  # 元の行 (前後の空白を除いたもの)
+
+
+def parse_line(line: str) -> Record | None:
+    line = line.strip()
+    m = RECORD_RE.match(line)
+    if not m:
+        return None
+    return Record(m.group(1), m.group(2), m.group(3), m.group(4), line)
+
+
+def iter_records(lines: Iterable[str], statuses=("BAD", "TOP-5")) -> Iterator[Record]:
+    """行のストリームから、指定したステータスのレコードを順に返す。"""
+    for line in lines:
+        record = parse_line(line)
+        if record is not None and record.status in statuses:
+            yield record
+
+
+def read_records(path: str, statuses=("BAD", "TOP-5")) -> Iterator[Record]:
+    """ファイルを1行ずつ読みながらレコードを返す。"""
+    with open(path) as f:
+        yield from iter_records(f, statuses)
+
+
+def find_evaluate_dirs(base_dir: str = EVALUATE_BASE) -> list[str]:
+    """評価結果ディレクトリ (tmp/evaluate/2*) を古い順に返す。"""
+    if not os.path.exists(base_dir):
+        return []
+    return sorted(os.path.join(base_dir, d) for d in os.listdir(base_dir)
+                  if os.path.isdir(os.path.join(base_dir, d)) and d.startswith("2"))
+
+
+def find_latest_evaluate_dir(base_dir: str = EVALUATE_BASE, require: str | None = None) -> str:
+    """最新の評価結果ディレクトリ。require を指定すると、そのファイルがあるものに限る。"""
+    dirs = [d for d in find_evaluate_dirs(base_dir)
+            if require is None or os.path.exists(os.path.join(d, require))]
+    if not dirs:
+        print("ERROR: evaluate ディレクトリが見つかりません", file=sys.stderr)
+        sys.exit(1)
+    return dirs[-1]
+
+
+def read_commit(eval_dir: str) -> str | None:
+    """評価ディレクトリの summary.txt に書かれた評価時のコミット。分からなければ None。"""
+    summary = os.path.join(eval_dir, "summary.txt")
+    if os.path.exists(summary):
+        with open(summary) as f:
+            for line in f:
+                if line.startswith("Commit: "):
+                    commit = line[len("Commit: "):].strip()
+                    return commit if commit and commit != "unknown" else None
+    return None
@@ -0,0 +1,116 @@
+"""複数の評価結果にまたがる文ごとの退行・改善の集計。
+
+各評価ディレクトリの results.cache から「BAD である文」の集合を、文 ID を
+ビット位置とする整数 (ビット集合) として読み込む。改善・退行・状態の反転は
+ビット演算で一括に計算できるので、テキストの sort/diff は使わない。
+"""
+
+from dataclasses import dataclass
+
+from akaza_tools.cache import BAD, TOP5, EvalCache, open_cache
+from akaza_tools.records import read_commit
+
+# status バイト列を、該当するなら "1"、それ以外は "0" の ASCII に変換するテーブル
+_BAD_TABLE = bytes(0x31 if b == BAD else 0x30 for b in range(256))
+_MISS_TABLE = bytes(0x31 if b in (BAD, TOP5) else 0x30 for b in range(256))
+
+
+def status_bitset(cache: EvalCache, include_top5: bool = False) -> int:
+    """BAD (include_top5 なら TOP-5 も) の文 ID をビット位置とする整数を返す。"""
+    table = _MISS_TABLE if include_top5 else _BAD_TABLE
+    digits = bytes(cache.status).translate(table)[::-1]
+    return int(digits, 2) if digits else 0
+
+
+def iter_bits(bits: int):
+    """立っているビットの位置 (文 ID) を小さい順に返す。"""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+@dataclass
+class Run:
+    eval_dir: str
+    commit: str
+    bad: int  # ビット集合
+
+
+class RegressionMatrix:
+    """評価結果の列 (古い順) と、それぞれの BAD ビット集合。"""
+
+    def __init__(self, runs: list[Run], caches: list[EvalCache]):
+        self.runs = runs
+        self.caches = caches
+
+    @classmethod
+    def load(cls, eval_dirs: list[str], include_top5: bool = False,
+             warn=lambda msg: None) -> "RegressionMatrix":
+        """results.cache のある評価ディレクトリを読み込む。
+
+        最新の評価と評価コーパスが異なる (文 ID が対応しない) ものは除外する。
+        """
+        loaded = []
+        for eval_dir in eval_dirs:
+            cache = open_cache(eval_dir)
+            if cache is None:
+                warn(f"skip: {eval_dir} (results.cache がありません)")
+                continue
+            loaded.append((eval_dir, cache))
+        if not loaded:
+            return cls([], [])
+        digest = loaded[-1][1].digest
+        runs, caches = [], []
+        for eval_dir, cache in loaded:
+            if cache.digest != digest:
+                warn(f"skip: {eval_dir} (評価コーパスが異なります)")
+                continue
+            runs.append(Run(eval_dir, read_commit(eval_dir) or "unknown",
+                            status_bitset(cache, include_top5)))
+            caches.append(cache)
+        return cls(runs, caches)
+
+    def improvements(self, old: int, new: int) -> int:
+        """old で BAD、new で BAD でない文のビット集合。"""
+        return self.runs[old].bad & ~self.runs[new].bad
+
+    def regressions(self, old: int, new: int) -> int:
+        """old で BAD でなく、new で BAD になった文のビット集合。"""
+        return ~self.runs[old].bad & self.runs[new].bad
+
+    def flip_flops(self, min_flips: int = 2) -> dict[int, int]:
+        """隣接する評価の間で状態が min_flips 回以上反転した文と、その反転回数。
+
+        at_least[k] は「k+1 回以上反転した文」のビット集合で、各反転の
+        ビット集合を上位から順に繰り上げて数える (ビットスライスのカウンタ)。
+        """
+        if min_flips < 1:
+            raise ValueError("min_flips は 1 以上")
+        at_least = [0] * (len(self.runs) - 1)
+        for k in range(1, len(self.runs)):
+            flipped = self.runs[k - 1].bad ^ self.runs[k].bad
+            for j in range(len(at_least) - 1, 0, -1):
+                at_least[j] |= at_least[j - 1] & flipped
+            if at_least:
+                at_least[0] |= flipped
+
+        counts: dict[int, int] = {}
+        for j in range(min_flips - 1, len(at_least)):
+            for i in iter_bits(at_least[j]):
+                counts[i] = j + 1
+        return counts
+
+    def first_regressions(self) -> dict[int, int]:
+        """最新で BAD の文について、初めて BAD に退行した評価のインデックスを返す。
+
+        最初の評価から BAD の文は含めない。
+        """
+        first: dict[int, int] = {}
+        assigned = 0
+        for k in range(1, len(self.runs)):
+            new = self.regressions(k - 1, k) & ~assigned
+            assigned |= new
+            for i in iter_bits(new & self.runs[-1].bad):
+                first[i] = k
+        return first
@@ -0,0 +1,122 @@
+"""BAD レコードからの分類用サンプル抽出。
+
+候補をすべてメモリに持たず、リザーバサンプリングで k 件だけを保持する。
+層別抽出では誤変換の種類 (akaza_tools.patterns.CONFUSION_CLASSES) ごとに
+リザーバを持ち、種類ごとの件数 (quota) に従って抽出する。
+"""
+
+import os
+import random
+from typing import Callable, Generic, TypeVar
+
+from akaza_tools.records import Record, read_records
+
+T = TypeVar("T")
+
+
+def load_exclude_readings(paths) -> set[str]:
+    """過去のサンプルファイルに含まれる reading を集める。"""
+    readings = set()
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        for record in read_records(path, statuses=("BAD",)):
+            readings.add(record.reading)
+    return readings
+
+
+class Reservoir(Generic[T]):
+    """一様ランダムに最大 k 件を保持するリザーバ (Algorithm R)。"""
+
+    def __init__(self, k: int, rng: random.Random):
+        self.k = k
+        self.rng = rng
+        self.seen = 0
+        self.items: list[T] = []
+
+    def feed(self, item: T) -> None:
+        self.seen += 1
+        if len(self.items) < self.k:
+            self.items.append(item)
+        else:
+            j = self.rng.randrange(self.seen)
+            if j < self.k:
+                self.items[j] = item
+
+
+def _stratum_rng(seed: int | None, name: str) -> random.Random:
+    """層ごとの乱数。seed が同じなら層の並びや件数によらず同じ列になる。"""
+    return random.Random(None if seed is None else f"{seed}:{name}")
+
+
+def allocate_quotas(n: int, strata, quotas: dict[str, int] | None = None) -> dict[str, int]:
+    """層ごとの件数。quotas の指定がない層には残りを均等に割り振る。"""
+    quotas = dict(quotas or {})
+    rest = [s for s in strata if s not in quotas]
+    remaining = max(n - sum(quotas.values()), 0)
+    for i, name in enumerate(rest):
+        quotas[name] = remaining // len(rest) + (1 if i < remaining % len(rest) else 0)
+    return quotas
+
+
+class BadSampler:
+    """除外対象でない [BAD] レコードを流し込み、n 件をランダムに抽出する。
+
+    classify を渡すと層別抽出になる。各層のリザーバは n 件 (quota がそれより
+    多ければ quota 件) まで保持する。quota を指定していない層は n の残りを
+    均等に分け、候補の足りない層の不足分を、候補の余っている層に順に回す。
+    """
+
+    def __init__(self, exclude_readings: set[str], n: int, seed: int | None = None,
+                 classify: Callable[[Record], str] | None = None,
+                 quotas: dict[str, int] | None = None):
+        self.exclude_readings = exclude_readings
+        self.n = n
+        self.seed = seed
+        self.classify = classify
+        self.quotas = quotas
+        self.reservoirs: dict[str, Reservoir[Record]] = {}
+
+    @property
+    def seen(self) -> int:
+        """候補の件数。"""
+        return sum(r.seen for r in self.reservoirs.values())
+
+    def feed(self, record: Record) -> None:
+        if record.status != "BAD" or record.reading in self.exclude_readings:
+            return
+        name = self.classify(record) if self.classify else "all"
+        reservoir = self.reservoirs.get(name)
+        if reservoir is None:
+            k = self.n if self.quotas is None else max(self.n, self.quotas.get(name, 0))
+            reservoir = self.reservoirs[name] = Reservoir(k, _stratum_rng(self.seed, name))
+        reservoir.feed(record)
+
+    def sample(self, strata=None) -> dict[str, list[Record]]:
+        """層ごとのサンプルを返す (層別でなければ "all" の1層)。"""
+        strata = list(strata or sorted(self.reservoirs))
+        strata += [s for s in sorted(self.reservoirs) if s not in strata]
+        quotas = allocate_quotas(self.n, strata, self.quotas)
+        # リザーバ内の並びは一様でないので、混ぜてから先頭を取る
+        pools = {}
+        for s, reservoir in self.reservoirs.items():
+            pools[s] = list(reservoir.items)
+            reservoir.rng.shuffle(pools[s])
+        taken = {s: pools.get(s, [])[:quotas[s]] for s in strata}
+        shortfall = self.n - sum(len(v) for v in taken.values())
+        for s in strata:
+            if shortfall <= 0 or s not in pools or s in (self.quotas or {}):
+                continue
+            extra = pools[s][len(taken[s]):len(taken[s]) + shortfall]
+            taken[s] += extra
+            shortfall -= len(extra)
+        return {s: records for s, records in taken.items() if records}
+
+
+def write_sample(sample: list[Record]) -> str:
+    """サンプルを /tmp/bad-sample-{N}.txt に保存してパスを返す。"""
+    outfile = f"/tmp/bad-sample-{len(sample)}.txt"
+    with open(outfile, "w") as f:
+        for record in sample:
+            f.write(record.line + "\n")
+    return outfile
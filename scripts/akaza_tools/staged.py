@@ -0,0 +1,256 @@
+"""エポック数の上限を段階的に上げる learn-corpus の学習と、収束・チャタリングの検出。
+
+learn-corpus は tier ごとに「全文が正解になるか、エポック数の上限に達するまで」
+学習する。途中から再開したり外から止めたりはできないので、小さい上限で学習し、
+ログから tier ごとのエポックごとの補正された文を取り出して判定する。
+
+- converged:   最後のエポックで補正された文がない (収束したのをログで確かめた)
+- oscillating: 直近 window エポックの補正数の最小値が、その前の window エポックから
+               減っていない。エポックを増やしてもコストが上がり続けるだけなので止める
+- improving:   それ以外。上限を growth 倍にして次の段階で学習し直す
+- unknown:     ログから判定できなかった
+
+すべての tier が converged か oscillating になるか、上限が最大値に達したら、
+その段階のモデルを採用する。unknown の tier が1つでもあれば、最大の上限
+(Makefile と同じ設定) で学習し直す。段階ごとのモデルとログは
+work/train/<入力のハッシュ>/<設定名>/ に残すので、やり直したときは
+学習済みの段階を再利用する。入力のハッシュは learn-corpus が読むファイル
+(コーパスと work/ の統計) の内容と akaza-data のバージョンから作るので、
+統計を作り直したり akaza-data を更新したりすると学習し直す。
+
+ログは既定では learn-corpus -v の次の形式を受け付ける。この形式は実際の
+learn-corpus の出力ではまだ確かめていないので、合わなければすべての段階が
+unknown になり、最大の上限で学習するだけになる。実際のログに合わせるときは
+EPOCH_RE / LEARN_RE と同じように、エポック番号と補正された文を1つ目のグループに
+取る正規表現を LogFormat に渡す (train-staged.py の --epoch-pattern /
+--learn-pattern、--check-log で保存したログに合うかを確かめられる)。
+
+    [INFO] epoch=1
+    [DEBUG] learn: 今日/きょう は/は      (そのエポックで補正された文。何行でもよい)
+    [INFO] epoch=2
+    ...
+
+epoch= の行がエポックの区切りで、tier ごとに 1 から1ずつ増える。1 に戻ったところで
+次の tier (may → should → must の順) に移る。tier がちょうど3つあり、各 tier の
+エポック数が上限以下で、上限より前に止まった tier は最後のエポックに補正がない
+(learn-corpus は全文が正解になると止まる) ときだけ読み取れたとみなし、
+それ以外はすべての tier を unknown とする。
+"""
+
+import hashlib
+import itertools
+import os
+import re
+import shutil
+import subprocess
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from akaza_tools.buildcache import akaza_data_version
+from akaza_tools.diskcache import content_key
+from akaza_tools.incremental import TRAINING_CORPORA
+from akaza_tools.sweep import Config, learn_corpus_command, learn_corpus_inputs
+
+# learn-corpus が学習する順序
+TRAIN_ORDER = ("may", "should", "must")
+CONVERGED = "converged"
+OSCILLATING = "oscillating"
+IMPROVING = "improving"
+UNKNOWN = "unknown"
+
+EPOCH_RE = re.compile(r"\bepoch=(\d+)$")
+LEARN_RE = re.compile(r"\blearn: (.+)$")
+MODEL_FILES = ("unigram.model", "bigram.model", "skip_bigram.model")
+
+
+@dataclass(frozen=True)
+class LogFormat:
+    """learn-corpus のログの、エポックの区切りの行と補正された文の行の正規表現。"""
+    epoch: re.Pattern = EPOCH_RE
+    learn: re.Pattern = LEARN_RE
+
+
+def parse_log(lines, config: Config,
+              log_format: LogFormat = LogFormat()) -> dict[str, list[set[str]]] | None:
+    """tier → エポックごとの補正された文の集合。形式が合わなければ None。"""
+    segments: list[list[set[str]]] = []
+    for line in lines:
+        line = line.rstrip()
+        m = log_format.epoch.search(line)
+        if m:
+            epoch = int(m.group(1))
+            if epoch == 1:
+                segments.append([])
+            elif not segments or epoch != len(segments[-1]) + 1:
+                return None
+            segments[-1].append(set())
+            continue
+        m = log_format.learn.search(line)
+        if m:
+            if not segments:
+                return None
+            segments[-1][-1].add(" ".join(m.group(1).split()))
+    if len(segments) != len(TRAIN_ORDER):
+        return None
+    for tier, epochs in zip(TRAIN_ORDER, segments):
+        cap = getattr(config, f"{tier}_epochs")
+        if len(epochs) > cap or (len(epochs) < cap and epochs[-1]):
+            return None
+    return dict(zip(TRAIN_ORDER, segments))
+
+
+def tier_status(epochs: list[set[str]] | None, window: int) -> str:
+    if not epochs:
+        return UNKNOWN
+    if not epochs[-1]:
+        return CONVERGED
+    counts = [len(e) for e in epochs]
+    if len(counts) >= 2 * window and min(counts[-window:]) >= min(counts[-2 * window:-window]):
+        return OSCILLATING
+    return IMPROVING
+
+
+def _readings(line: str) -> set[str]:
+    return {token.split("/", 1)[1] for token in line.split() if len(token.split("/", 1)[-1]) > 1}
+
+
+def chattering(epochs: list[set[str]], window: int) -> tuple[list[str], list[tuple[str, str]]]:
+    """直近 window エポックの半分以上で補正された文と、そのうち交互に補正されている組。
+
+    組は、補正されたエポックが重ならず、共通の読みを持つ2文。
+    """
+    recent = epochs[-window:]
+    hits = {}
+    for i, corrected in enumerate(recent):
+        for line in corrected:
+            hits.setdefault(line, set()).add(i)
+    recurring = sorted(line for line, h in hits.items() if len(h) * 2 >= len(recent))
+    pairs = [(a, b) for a, b in itertools.combinations(recurring, 2)
+             if not hits[a] & hits[b] and _readings(a) & _readings(b)]
+    return recurring, pairs
+
+
+@dataclass
+class TierResult:
+    tier: str
+    cap: int
+    epochs: int
+    status: str
+    corrections: list[int]
+    recurring: list[str] = field(default_factory=list)
+    pairs: list[tuple[str, str]] = field(default_factory=list)
+
+
+@dataclass
+class Stage:
+    config: Config
+    model_dir: Path
+    tiers: dict[str, TierResult]
+
+    @property
+    def done(self) -> bool:
+        return all(t.status not in (IMPROVING, UNKNOWN) for t in self.tiers.values())
+
+    @property
+    def unknown(self) -> bool:
+        return any(t.status == UNKNOWN for t in self.tiers.values())
+
+
+def stage_key(corpora=TRAINING_CORPORA) -> str:
+    """learn-corpus の入力ファイルの内容と akaza-data のバージョンのハッシュ。"""
+    key = f"{content_key(learn_corpus_inputs(corpora))}\0{akaza_data_version()}"
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+class StagedTrainer:
+    def __init__(self, work_dir: str, max_config: Config, start_epochs: dict[str, int],
+                 growth: int = 10, window: int = 20, verbosity: str = "-vv",
+                 corpora=TRAINING_CORPORA, log_format: LogFormat = LogFormat(), log=print):
+        self.max_config = max_config
+        self.start_epochs = start_epochs
+        self.growth = growth
+        self.window = window
+        self.verbosity = verbosity
+        self.log_format = log_format
+        self.log = log
+        self.corpora = corpora
+        self.base_dir = Path(work_dir) / stage_key(corpora)
+
+    def _cap(self, tier: str) -> int:
+        return getattr(self.max_config, f"{tier}_epochs")
+
+    def run_stage(self, config: Config) -> Stage:
+        model_dir = self.base_dir / config.name
+        log_path = model_dir / "learn-corpus.log"
+        if (model_dir / "_SUCCESS").exists():
+            self.log(f"{config.name}: 学習済みの段階を使います")
+        else:
+            model_dir.mkdir(parents=True, exist_ok=True)
+            with open(log_path, "w") as f:
+                command = learn_corpus_command(config, str(model_dir), self.corpora)
+                subprocess.run(command + [self.verbosity], stdout=f, stderr=subprocess.STDOUT,
+                               check=True)
+            (model_dir / "_SUCCESS").touch()
+
+        with open(log_path, errors="replace") as f:
+            parsed = parse_log(f, config, self.log_format) or {}
+        tiers = {}
+        for tier in TRAIN_ORDER:
+            epochs = parsed.get(tier, [])
+            cap = getattr(config, f"{tier}_epochs")
+            status = tier_status(epochs, self.window)
+            recurring, pairs = (chattering(epochs, self.window)
+                                if status in (OSCILLATING, IMPROVING) else ([], []))
+            tiers[tier] = TierResult(tier, cap, len(epochs), status,
+                                     [len(e) for e in epochs], recurring, pairs)
+        return Stage(config, model_dir, tiers)
+
+    def next_config(self, stage: Stage) -> Config | None:
+        """improving な tier の上限を growth 倍にした設定。これ以上上げられなければ None。"""
+        epochs = {}
+        for tier in TRAIN_ORDER:
+            result = stage.tiers[tier]
+            cap = result.cap
+            if result.status == IMPROVING and cap < self._cap(tier):
+                cap = min(cap * self.growth, self._cap(tier))
+            epochs[f"{tier}_epochs"] = cap
+        config = Config(self.max_config.delta, **epochs)
+        return None if config == stage.config else config
+
+    def run(self) -> list[Stage]:
+        config = Config(self.max_config.delta, **{
+            f"{tier}_epochs": min(self.start_epochs[tier], self._cap(tier))
+            for tier in TRAIN_ORDER})
+        stages = []
+        while config is not None:
+            self.log(f"stage {len(stages) + 1}: {config.name}")
+            stage = self.run_stage(config)
+            stages.append(stage)
+            for t in stage.tiers.values():
+                self.log(f"  {t.tier:<7} {t.status:<11} {t.epochs}/{t.cap} epochs, "
+                         f"last corrections {t.corrections[-1] if t.corrections else 0}")
+            if stage.unknown:
+                # ログを読み取れなければ判定できないので、最大の上限で学習する
+                self.log(f"  WARNING: ログからエポックを読み取れませんでした "
+                         f"({stage.model_dir / 'learn-corpus.log'})")
+                config = None if config == self.max_config else self.max_config
+                continue
+            config = None if stage.done else self.next_config(stage)
+        return stages
+
+    def unverified_tiers(self, stage: Stage) -> list[str]:
+        """収束を確かめられず、上限も最大値より小さい tier。
+
+        このような tier は Makefile より学習が足りない可能性があるので、
+        その段階のモデルを data/ に入れてはいけない。
+        """
+        return [t.tier for t in stage.tiers.values()
+                if t.status != CONVERGED and t.cap < self._cap(t.tier)]
+
+
+def install_models(model_dir: Path, dest: str) -> None:
+    os.makedirs(dest, exist_ok=True)
+    for name in MODEL_FILES:
+        tmp = os.path.join(dest, f"{name}.{os.getpid()}.tmp")
+        shutil.copyfile(model_dir / name, tmp)
+        os.replace(tmp, os.path.join(dest, name))
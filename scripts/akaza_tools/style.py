@@ -0,0 +1,84 @@
+"""表記揺れ (evaluate-filter/skip-patterns.tsv) と分節崩壊キーワード
+(evaluate-filter/segmentation-keywords.txt) の照合。
+
+どちらも Aho–Corasick のオートマトンに一度だけコンパイルし、ファイルの内容の
+ハッシュをキーに tmp/cache/ へ保存する。
+"""
+
+from akaza_tools.ahocorasick import Automaton
+from akaza_tools.diskcache import content_key, load_or_build
+
+SKIP_PATTERNS_PATH = "evaluate-filter/skip-patterns.tsv"
+SEGMENTATION_KEYWORDS_PATH = "evaluate-filter/segmentation-keywords.txt"
+
+
+def _iter_data_lines(path: str):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.strip() and not line.startswith("#"):
+                yield line
+
+
+def load_skip_pairs(path: str = SKIP_PATTERNS_PATH) -> set[tuple[str, str]]:
+    """表記揺れの組を、両方向の (期待値, 変換結果) として読み込む。"""
+    pairs = set()
+    for line in _iter_data_lines(path):
+        fields = line.split("\t")
+        if len(fields) < 2 or not fields[0] or not fields[1]:
+            raise ValueError(f"{path}: 不正な行: {line!r}")
+        pairs.add((fields[0], fields[1]))
+        pairs.add((fields[1], fields[0]))
+    return pairs
+
+
+class StyleMatcher:
+    """期待値と変換結果の差分が、表記揺れの置き換えだけで説明できるかを判定する。"""
+
+    def __init__(self, pairs: set[tuple[str, str]]):
+        self.pairs = pairs
+        variants = sorted({x for x, _ in pairs})
+        self.automaton = Automaton(variants)
+        index = {x: i for i, x in enumerate(variants)}
+        self.partners: list[list[str]] = [[] for _ in variants]
+        for x, y in sorted(pairs):
+            self.partners[index[x]].append(y)
+
+    def equivalent(self, corpus: str, akaza: str) -> bool:
+        """corpus の中の表記揺れをいくつか相手の表記に置き換えると akaza になるか。
+
+        (例: 事は無 → ことはな は 事→こと・無→な の置き換えで一致する)
+        """
+        if corpus == akaza:
+            return True
+        starts = self.automaton.matches_by_start(corpus)
+        if not starts:
+            return False
+        # (corpus の位置, akaza の位置) の到達可能集合を corpus の位置の順に広げる
+        frontier = {(0, 0)}
+        seen = set(frontier)
+        while frontier:
+            nxt = set()
+            for i, j in frontier:
+                if i == len(corpus) and j == len(akaza):
+                    return True
+                if i < len(corpus) and j < len(akaza) and corpus[i] == akaza[j]:
+                    nxt.add((i + 1, j + 1))
+                for p in starts.get(i, ()):
+                    x = self.automaton.patterns[p]
+                    for y in self.partners[p]:
+                        if akaza.startswith(y, j):
+                            nxt.add((i + len(x), j + len(y)))
+            frontier = nxt - seen
+            seen |= frontier
+        return False
+
+
+def load_style_matcher(path: str = SKIP_PATTERNS_PATH) -> StyleMatcher:
+    return load_or_build("skip-patterns", content_key([path]),
+                         lambda: StyleMatcher(load_skip_pairs(path)))
+
+
+def load_keyword_automaton(path: str = SEGMENTATION_KEYWORDS_PATH) -> Automaton:
+    return load_or_build("segmentation-keywords", content_key([path]),
+                         lambda: Automaton(sorted(set(_iter_data_lines(path)))))
@@ -0,0 +1,275 @@
+"""learn-corpus のハイパーパラメータ (delta・各 tier のエポック数) のスイープ。
+
+設定ごとに専用のディレクトリでモデルを学習し、評価コーパスを交互に振り分けた
+シャードで evaluate する。シャードが終わるたびに途中までの Bad 率を見て、
+それまでの最良の設定より明らかに悪い (信頼区間の下限でも上回る) 設定は
+残りのシャードを実行せずに打ち切る。
+"""
+
+import itertools
+import math
+import os
+import random
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+
+from akaza_tools.evaluate import (
+    EUCJP_DICT, EVALUATE_CORPORA, UTF8_DICT, Summary, iter_corpus_lines,
+    merge_summaries, run_evaluate, split_interleaved, surface_length,
+)
+from akaza_tools.incremental import TRAINING_CORPORA
+
+# Makefile の LEARN_DELTA / MAY_EPOCHS / SHOULD_EPOCHS / MUST_EPOCHS の既定値
+DEFAULTS = {"delta": 2000, "may_epochs": 10, "should_epochs": 100, "must_epochs": 10000}
+
+STATS_UNIGRAM = "work/stats-vibrato-unigram.wordcnt.trie"
+STATS_BIGRAM = "work/stats-vibrato-bigram.wordcnt.trie"
+STATS_SKIP_BIGRAM = "work/stats-vibrato-skip-bigram.wordcnt.trie"
+
+RESULT_COLUMNS = ("name", "delta", "may_epochs", "should_epochs", "must_epochs",
+                  "status", "good", "top5", "bad", "recall", "evaluated",
+                  "train_s", "evaluate_s")
+
+
+@dataclass(frozen=True)
+class Config:
+    delta: int
+    may_epochs: int
+    should_epochs: int
+    must_epochs: int
+
+    @property
+    def name(self) -> str:
+        return (f"d{self.delta}-may{self.may_epochs}"
+                f"-should{self.should_epochs}-must{self.must_epochs}")
+
+
+def grid(values: dict[str, list[int]]) -> list[Config]:
+    """パラメータごとの値の一覧の直積。"""
+    names = [f.name for f in fields(Config)]
+    return [Config(**dict(zip(names, combo)))
+            for combo in itertools.product(*(values[n] for n in names))]
+
+
+def sample_configs(values: dict[str, list[int]], n: int, rng: random.Random) -> list[Config]:
+    """グリッドから重複なく n 個をランダムに選ぶ。"""
+    configs = grid(values)
+    return rng.sample(configs, min(n, len(configs)))
+
+
+def learn_corpus_inputs(corpora=TRAINING_CORPORA) -> list[str]:
+    """learn_corpus_command が読むファイル (コーパスと work/ の統計)。"""
+    return [*corpora, STATS_UNIGRAM, STATS_BIGRAM, STATS_SKIP_BIGRAM]
+
+
+def learn_corpus_command(config: Config, model_dir: str,
+                         corpora=TRAINING_CORPORA) -> list[str]:
+    """Makefile の data/bigram.model と同じ learn-corpus の実行コマンド。
+
+    corpora は must, should, may の順。
+    """
+    return [
+        "akaza-data", "learn-corpus",
+        f"--delta={config.delta}",
+        f"--may-epochs={config.may_epochs}",
+        f"--should-epochs={config.should_epochs}",
+        f"--must-epochs={config.must_epochs}",
+        corpora[2], corpora[1], corpora[0],
+        STATS_UNIGRAM, STATS_BIGRAM,
+        os.path.join(model_dir, "unigram.model"), os.path.join(model_dir, "bigram.model"),
+        f"--src-skip-bigram={STATS_SKIP_BIGRAM}",
+        f"--dst-skip-bigram={os.path.join(model_dir, 'skip_bigram.model')}",
+    ]
+
+
+@dataclass
+class Result:
+    config: Config
+    status: str  # done / abandoned / failed
+    summary: Summary | None = None
+    evaluated: int = 0  # 評価した文の数
+    train_s: float = 0.0
+    evaluate_s: float = 0.0
+
+    @property
+    def bad_rate(self) -> float:
+        return self.summary.bad / self.evaluated if self.summary and self.evaluated else 1.0
+
+    def row(self) -> list[str]:
+        s = self.summary
+        return [self.config.name, *map(str, asdict(self.config).values()), self.status,
+                *(str(v) for v in ((s.good, s.top5, s.bad) if s else ("", "", ""))),
+                f"{s.recall:.4f}" if s else "", str(self.evaluated),
+                f"{self.train_s:.0f}", f"{self.evaluate_s:.0f}"]
+
+
+class BestTracker:
+    """完了した設定の中で最良の Bad 率。スレッド間で共有する。"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rate = math.inf
+
+    def update(self, rate: float) -> None:
+        with self.lock:
+            self.rate = min(self.rate, rate)
+
+    def clearly_worse(self, bad: int, n: int, z: float) -> bool:
+        """n 文中 bad 件の Bad 率の信頼区間の下限が、最良の Bad 率を上回るか。"""
+        if n == 0:
+            return False
+        p = bad / n
+        return p - z * math.sqrt(p * (1 - p) / n) > self.rate
+
+
+class _Processes(set):
+    """実行中の evaluate のプロセス。close() の後に加わったものもすぐ kill する。"""
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def add(self, proc) -> None:
+        with self.lock:
+            super().add(proc)
+            if self.closed:
+                proc.kill()
+
+    def discard(self, proc) -> None:
+        with self.lock:
+            super().discard(proc)
+
+    def close(self) -> None:
+        with self.lock:
+            self.closed = True
+            for proc in self:
+                proc.kill()
+
+
+class Sweep:
+    def __init__(self, out_dir: Path, eval_jobs: int, shards: int | None = None,
+                 abandon_z: float | None = 3.0, min_fraction: float = 0.25,
+                 keep_models: bool = False, corpora=EVALUATE_CORPORA,
+                 eucjp_dict: str = EUCJP_DICT, utf8_dict: str = UTF8_DICT,
+                 training_corpora=TRAINING_CORPORA, log=print):
+        self.out_dir = out_dir
+        self.eval_jobs = eval_jobs
+        self.abandon_z = abandon_z
+        self.min_fraction = min_fraction
+        self.keep_models = keep_models
+        self.eucjp_dict = eucjp_dict
+        self.utf8_dict = utf8_dict
+        self.training_corpora = training_corpora
+        self.log = log
+        self.best = BestTracker()
+
+        lines = list(iter_corpus_lines(corpora))
+        self.n_sentences = len(lines)
+        shard_lines = split_interleaved(lines, shards or eval_jobs * 4)
+        shard_dir = out_dir / "shards"
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        self.shards = []
+        for i, shard in enumerate(shard_lines):
+            path = shard_dir / f"shard-{i:03d}.txt"
+            path.write_text("".join(line + "\n" for line in shard))
+            self.shards.append((str(path), len(shard), sum(map(surface_length, shard))))
+
+    def run_config(self, config: Config) -> Result:
+        model_dir = self.out_dir / config.name
+        model_dir.mkdir(parents=True, exist_ok=True)
+        log_path = model_dir / "learn-corpus.log"
+
+        start = time.monotonic()
+        with open(log_path, "w") as log:
+            proc = subprocess.run(learn_corpus_command(config, str(model_dir), self.training_corpora),
+                                  stdout=log, stderr=subprocess.STDOUT)
+        train_s = time.monotonic() - start
+        if proc.returncode != 0:
+            self.log(f"{config.name}: learn-corpus が失敗しました ({log_path})")
+            return Result(config, "failed", train_s=train_s)
+
+        start = time.monotonic()
+        result = self.evaluate(config, str(model_dir))
+        result.train_s = train_s
+        result.evaluate_s = time.monotonic() - start
+        if result.status == "done":
+            self.best.update(result.bad_rate)
+        if not self.keep_models:
+            for name in ("unigram.model", "bigram.model", "skip_bigram.model"):
+                (model_dir / name).unlink(missing_ok=True)
+        return result
+
+    def evaluate(self, config: Config, model_dir: str) -> Result:
+        """シャードを並列に evaluate する。
+
+        evaluate が失敗したら failed、打ち切ったら abandoned の Result を返す。
+        どちらの場合も実行中のシャードの evaluate は kill し、終わるのを待たない。
+        """
+        summaries, weights = [], []
+        evaluated = 0
+        running = _Processes()
+        pool = ThreadPoolExecutor(max_workers=self.eval_jobs)
+        try:
+            pending = {pool.submit(run_evaluate, [path], model_dir,
+                                   self.eucjp_dict, self.utf8_dict, running): (n, weight)
+                       for path, n, weight in self.shards}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    n, weight = pending.pop(future)
+                    try:
+                        _, summary = future.result()
+                    except subprocess.CalledProcessError as e:
+                        self.log(f"{config.name}: evaluate が失敗しました "
+                                 f"({e.cmd[2].removeprefix('--corpus=')}: exit {e.returncode})")
+                        return Result(config, "failed", evaluated=evaluated)
+                    except RuntimeError as e:
+                        self.log(f"{config.name}: {e}")
+                        return Result(config, "failed", evaluated=evaluated)
+                    summaries.append(summary)
+                    weights.append(weight)
+                    evaluated += n
+                bad = sum(s.bad for s in summaries)
+                if (pending and self.abandon_z is not None
+                        and evaluated >= self.min_fraction * self.n_sentences
+                        and self.best.clearly_worse(bad, evaluated, self.abandon_z)):
+                    self.log(f"{config.name}: 打ち切り (Bad {bad}/{evaluated})")
+                    return Result(config, "abandoned",
+                                  merge_summaries(summaries, weights, 0), evaluated)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            running.close()
+        return Result(config, "done", merge_summaries(summaries, weights, 0), evaluated)
+
+    def run(self, configs: list[Config], jobs: int) -> list[Result]:
+        """jobs 個の設定を並行して学習・評価し、終わったものから results.tsv に書く。"""
+        results_path = self.out_dir / "results.tsv"
+        with open(results_path, "w") as f:
+            f.write("\t".join(RESULT_COLUMNS) + "\n")
+        results = []
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(self.run_config, c) for c in configs]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                with open(results_path, "a") as f:
+                    f.write("\t".join(result.row()) + "\n")
+                self.log(f"{result.config.name}: {result.status} "
+                         f"{result.summary.format() if result.summary else ''}")
+        return results
+
+
+def check_inputs(training_corpora=TRAINING_CORPORA) -> list[str]:
+    """学習に必要なファイルのうち、存在しないもの。"""
+    required = [*learn_corpus_inputs(training_corpora), UTF8_DICT, *EVALUATE_CORPORA]
+    return [p for p in required if not os.path.exists(p)]
+
+
+def remove_shards(out_dir: Path) -> None:
+    shutil.rmtree(out_dir / "shards", ignore_errors=True)
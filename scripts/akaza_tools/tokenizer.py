@@ -0,0 +1,87 @@
+"""akaza-data tokenize-line のバッチ実行と、行ごとの結果のキャッシュ。
+
+tokenize-line は起動のたびに vibrato の system.dic を読み込むが、stdin から
+複数行を流し込めば1回の読み込みで済む。未キャッシュの行を jobs 個に分けて
+jobs 個の tokenize-line に流し込み、出力を元の順序に戻す。
+
+結果は行の sha1 をキーにして tmp/cache/tokenize-<key>.pickle に保存する。
+key は system.dic の mtime・サイズと akaza-data のバージョンから作るので、
+辞書や akaza-data が変わるとキャッシュは作り直しになる。
+"""
+
+import hashlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from akaza_tools.buildcache import akaza_data_version
+from akaza_tools.diskcache import CACHE_DIR, load_or_build, mtime_key, save
+from akaza_tools.evaluate import split_interleaved
+
+SYSTEM_DIC = "work/vibrato/ipadic-mecab-2_7_0/system.dic"
+
+
+def line_key(line: str) -> str:
+    return hashlib.sha1(line.encode()).hexdigest()[:16]
+
+
+def _tokenize_chunk(lines: list[str], system_dic: str) -> list[str]:
+    cmd = ["akaza-data", "tokenize-line", "--system-dict", system_dic]
+    proc = subprocess.run(cmd, input="".join(line + "\n" for line in lines),
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, proc.stdout, proc.stderr)
+    output = proc.stdout.splitlines()
+    if len(output) != len(lines):
+        raise RuntimeError(f"tokenize-line の出力が {len(output)} 行でした "
+                           f"(入力 {len(lines)} 行)")
+    return output
+
+
+@dataclass
+class BatchStats:
+    lines: int = 0
+    cached: int = 0
+    tokenized: int = 0
+    workers: int = 0
+
+
+class BatchTokenizer:
+    def __init__(self, system_dic: str = SYSTEM_DIC, jobs: int = 1,
+                 use_cache: bool = True, cache_dir: str = CACHE_DIR):
+        self.system_dic = system_dic
+        self.jobs = jobs
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        h = hashlib.sha1(f"{mtime_key([system_dic])}\0{akaza_data_version()}".encode())
+        self.cache_key = h.hexdigest()[:16]
+        self.cache: dict[str, str] = (
+            load_or_build("tokenize", self.cache_key, dict, cache_dir) if use_cache else {})
+        self.stats = BatchStats()
+
+    def tokenize(self, lines: list[str]) -> list[str]:
+        """lines を tokenize-line にかけた結果を同じ順序で返す。空行は空のまま。"""
+        self.stats.lines += len(lines)
+        pending = []
+        seen = set()
+        for line in lines:
+            key = line_key(line)
+            if not line.strip() or key in self.cache or key in seen:
+                continue
+            seen.add(key)
+            pending.append(line)
+        self.stats.cached += sum(1 for line in lines if line.strip()) - len(pending)
+
+        if pending:
+            chunks = split_interleaved(pending, self.jobs)
+            self.stats.workers = max(self.stats.workers, len(chunks))
+            with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+                outputs = list(pool.map(lambda c: _tokenize_chunk(c, self.system_dic), chunks))
+            for chunk, output in zip(chunks, outputs):
+                for line, tokens in zip(chunk, output):
+                    self.cache[line_key(line)] = tokens
+            self.stats.tokenized += len(pending)
+            if self.use_cache:
+                save("tokenize", self.cache_key, self.cache, self.cache_dir)
+
+        return [self.cache[line_key(line)] if line.strip() else "" for line in lines]
@@ -0,0 +1,187 @@
+"""評価結果を文ごとに SQLite (tmp/evaluate/results.sqlite) に貯める。
+
+    runs       評価1回 (tmp/evaluate/<timestamp>/) ごとの日時・コミット・集計
+    sentences  評価コーパスの (読み, 期待値)。読みに索引
+    results    (run, sentence) ごとの status (0=GOOD, 1=TOP-5, 2=BAD) と変換結果
+               (GOOD は NULL)。主キーが (run_id, sentence_id)、status と文にも索引
+
+文ごとの結果は results.cache (なければ raw.txt から作る) から読み、1回の
+トランザクションでまとめて入れる。同じ評価ディレクトリを入れ直すと置き換える。
+evaluate が出力する変換結果は1位の候補だけなので、akaza 列もそれだけを持つ。
+"""
+
+import os
+import re
+import sqlite3
+from dataclasses import dataclass
+
+from akaza_tools.cache import GOOD, STATUS_NAMES, open_or_build_cache
+from akaza_tools.records import EVALUATE_BASE
+
+DB_PATH = os.path.join(EVALUATE_BASE, "results.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    datetime TEXT NOT NULL,
+    commit_id TEXT,
+    mode TEXT,
+    good INTEGER,
+    top5 INTEGER,
+    bad INTEGER,
+    recall REAL
+);
+CREATE TABLE IF NOT EXISTS sentences (
+    id INTEGER PRIMARY KEY,
+    reading TEXT NOT NULL,
+    corpus TEXT NOT NULL,
+    UNIQUE (reading, corpus)
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    sentence_id INTEGER NOT NULL REFERENCES sentences(id),
+    status INTEGER NOT NULL,
+    akaza TEXT,
+    PRIMARY KEY (run_id, sentence_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sentences_reading ON sentences (reading);
+CREATE INDEX IF NOT EXISTS results_sentence ON results (sentence_id, run_id);
+CREATE INDEX IF NOT EXISTS results_status ON results (status, run_id);
+"""
+
+_SUMMARY_FIELDS = {"Date": "datetime", "Commit": "commit_id", "Mode": "mode",
+                   "Good": "good", "Top-5": "top5", "Bad": "bad", "Recall": "recall"}
+_DIR_TIME_RE = re.compile(r"(\d{4})(\d{2})(\d{2})(\d{2})(\d{2})")
+
+
+def connect(path: str = DB_PATH) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def read_summary(eval_dir: str) -> dict:
+    """summary.txt の値。日時がなければディレクトリ名 (YYYYMMDDHHMM) から作る。"""
+    values = {}
+    path = os.path.join(eval_dir, "summary.txt")
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                key, sep, value = line.partition(": ")
+                if sep and key in _SUMMARY_FIELDS:
+                    values[_SUMMARY_FIELDS[key]] = value.strip()
+    for key in ("good", "top5", "bad"):
+        values[key] = int(values[key]) if values.get(key, "").isdigit() else None
+    try:
+        values["recall"] = float(values["recall"])
+    except (KeyError, ValueError):
+        values["recall"] = None
+    if "datetime" not in values:
+        m = _DIR_TIME_RE.match(os.path.basename(os.path.normpath(eval_dir)))
+        values["datetime"] = (f"{m[1]}-{m[2]}-{m[3]} {m[4]}:{m[5]}" if m
+                              else "1970-01-01 00:00")
+    return values
+
+
+def ingest(conn: sqlite3.Connection, eval_dir: str) -> int | None:
+    """評価ディレクトリを入れて文の数を返す。結果がなければ None。"""
+    cache = open_or_build_cache(eval_dir)
+    if cache is None:
+        return None
+    name = os.path.basename(os.path.normpath(eval_dir))
+    summary = read_summary(eval_dir)
+    n = cache.n_sentences
+    # 同じ文字列は results.cache の中で1つの ID にまとめられている
+    strings = {}
+
+    def string(sid: int) -> str:
+        s = strings.get(sid)
+        if s is None:
+            s = strings[sid] = cache.string(sid)
+        return s
+
+    keys = [(string(cache.reading_ids[i]), string(cache.corpus_ids[i])) for i in range(n)]
+    with conn:
+        conn.execute("DELETE FROM runs WHERE name = ?", (name,))
+        run_id = conn.execute(
+            "INSERT INTO runs (name, datetime, commit_id, mode, good, top5, bad, recall)"
+            " VALUES (:name, :datetime, :commit_id, :mode, :good, :top5, :bad, :recall)",
+            {"name": name, "commit_id": None, "mode": None, **summary}).lastrowid
+        conn.executemany("INSERT OR IGNORE INTO sentences (reading, corpus) VALUES (?, ?)",
+                         keys)
+        ids = {}
+        for sid, reading, corpus in conn.execute("SELECT id, reading, corpus FROM sentences"):
+            ids[reading, corpus] = sid
+        status = bytes(cache.status)
+        conn.executemany(
+            "INSERT OR REPLACE INTO results (run_id, sentence_id, status, akaza)"
+            " VALUES (?, ?, ?, ?)",
+            ((run_id, ids[keys[i]], status[i],
+              None if status[i] == GOOD else string(cache.akaza_ids[i]))
+             for i in range(n)))
+    return n
+
+
+def ingested_runs(conn: sqlite3.Connection) -> set[str]:
+    return {name for name, in conn.execute("SELECT name FROM runs")}
+
+
+@dataclass
+class HistoryRow:
+    datetime: str
+    commit_id: str
+    reading: str
+    corpus: str
+    status: str
+    akaza: str | None
+
+
+def history(conn: sqlite3.Connection, reading: str) -> list[HistoryRow]:
+    """読みが reading の文の、評価ごとの結果 (古い順)。"""
+    rows = conn.execute(
+        "SELECT r.datetime, r.commit_id, s.reading, s.corpus, x.status, x.akaza"
+        " FROM sentences s JOIN results x ON x.sentence_id = s.id"
+        " JOIN runs r ON r.id = x.run_id"
+        " WHERE s.reading = ? ORDER BY r.datetime, s.corpus", (reading,))
+    return [HistoryRow(d, c, rd, cp, STATUS_NAMES[st], ak) for d, c, rd, cp, st, ak in rows]
+
+
+@dataclass
+class Regression:
+    reading: str
+    corpus: str
+    old_run: str
+    old_status: str
+    new_run: str
+    new_status: str
+    akaza: str | None
+
+
+def regressions(conn: sqlite3.Connection, contains: str = "", since: str = "",
+                until: str = "9999") -> list[Regression]:
+    """since〜until の最初と最後の評価の間で status が悪くなった文。
+
+    contains を指定すると、読みにその文字列を含む文だけを対象にする。
+    """
+    # until は前方一致で比べる ("2026-10-18" はその日の評価を含む)
+    runs = conn.execute("SELECT id, name FROM runs WHERE datetime >= :since"
+                        " AND substr(datetime, 1, length(:until)) <= :until ORDER BY datetime",
+                        {"since": since, "until": until}).fetchall()
+    if len(runs) < 2:
+        return []
+    (old_id, old_name), (new_id, new_name) = runs[0], runs[-1]
+    rows = conn.execute(
+        "SELECT s.reading, s.corpus, o.status, n.status, n.akaza"
+        " FROM sentences s"
+        " JOIN results o ON o.sentence_id = s.id AND o.run_id = ?"
+        " JOIN results n ON n.sentence_id = s.id AND n.run_id = ?"
+        " WHERE n.status > o.status AND instr(s.reading, ?) > 0"
+        " ORDER BY n.status DESC, s.reading",
+        (old_id, new_id, contains))
+    return [Regression(reading, corpus, old_name, STATUS_NAMES[old], new_name,
+                       STATUS_NAMES[new], akaza)
+            for reading, corpus, old, new, akaza in rows]
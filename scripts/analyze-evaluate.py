@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""evaluate 結果の後処理 (フィルタ・パターン抽出・サンプル抽出・分類適用) を1パスで行う。
+
+Usage:
+    python3 scripts/analyze-evaluate.py [evaluate_dir] [--sample N] [--exclude FILE...]
+                                        [--seed S] [--stratify] [--classification TSV]
+
+bad.txt (results.cache があればそちら) を1回だけ読み、各レコードを以下のステージに順に流す。
+
+    filter-evaluate.py      → {evaluate_dir}/bad-filtered.txt (Adjusted Recall も表示)
+    extract-patterns.py     → {evaluate_dir}/patterns.txt
+    sample-bad.py           → /tmp/bad-sample-{N}.txt (--sample 指定時)
+    apply-classification.py → accept.tsv ほか (--classification 指定時)
+
+個別のスクリプトと同じ結果になる。
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+
+from akaza_tools.cache import open_or_build_cache, read_eval_records
+from akaza_tools.classification import CorpusMap, apply_classification
+from akaza_tools.filtering import BadFilter, filtered_bad_path
+from akaza_tools.filterstore import load_filter_store
+from akaza_tools.patterns import (
+    CONFUSION_CLASSES, ConfusionClassifier, PatternCollector, load_bunsetsu_index,
+)
+from akaza_tools.recall import compute_recall
+from akaza_tools.records import find_latest_evaluate_dir
+from akaza_tools.sampling import BadSampler, load_exclude_readings, write_sample
+from akaza_tools.warehouse import read_summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="evaluate 結果の後処理を1パスで実行")
+    parser.add_argument("eval_dir", nargs="?", default=None,
+                        help="evaluate ディレクトリ (省略時は最新)")
+    parser.add_argument("--sample", type=int, default=None, help="サンプル数")
+    parser.add_argument("--exclude", nargs="*", default=[], help="除外する過去サンプルファイル")
+    parser.add_argument("--seed", type=int, default=None, help="乱数シード")
+    parser.add_argument("--stratify", action="store_true", help="誤変換の種類ごとに層別抽出")
+    parser.add_argument("--classification", default=None, help="適用する分類 TSV")
+    args = parser.parse_args()
+
+    eval_dir = args.eval_dir or find_latest_evaluate_dir()
+    bad_file = os.path.join(eval_dir, "bad.txt")
+    if not os.path.exists(bad_file):
+        print(f"ERROR: {bad_file} が見つかりません", file=sys.stderr)
+        sys.exit(1)
+
+    store = load_filter_store()
+    bad_filter = BadFilter(store)
+    index = load_bunsetsu_index()
+    patterns = PatternCollector(index)
+    corpus_map = CorpusMap()
+    sampler = BadSampler(load_exclude_readings(args.exclude) | store.accepted_readings,
+                         args.sample or 0, args.seed,
+                         classify=ConfusionClassifier(index).classify if args.stratify else None)
+
+    for record in read_eval_records(eval_dir, statuses=("BAD",)):
+        corpus_map.feed(record)
+        patterns.feed(record)
+        if bad_filter.feed(record) and args.sample is not None:
+            sampler.feed(record)
+
+    filtered_bad_file = filtered_bad_path(eval_dir)
+    bad_filter.write(filtered_bad_file)
+    bad_filter.print_report(eval_dir, filtered_bad_file)
+    cache = open_or_build_cache(eval_dir)
+    if cache is not None:
+        compute_recall(cache, bad_filter).print_report(read_summary(eval_dir)["recall"])
+
+    patterns_file = os.path.join(eval_dir, "patterns.txt")
+    with open(patterns_file, "w") as f, contextlib.redirect_stdout(f):
+        patterns.print_report()
+    print(f"  Patterns saved to:     {patterns_file}")
+
+    if args.sample is not None:
+        strata = sampler.sample(CONFUSION_CLASSES if args.stratify else None)
+        sample = [record for records in strata.values() for record in records]
+        outfile = write_sample(sample)
+        print(f"  Sampled {len(sample)} from {sampler.seen} candidates → {outfile}")
+
+    if args.classification:
+        apply_classification(args.classification, corpus_map.corpus,
+                             store.accepted_readings)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,33 +14,29 @@ Usage:
     number_issue, skip  → スキップ
 
 注意: homophone と should 候補は tokenize-line.sh での検証が必要なため、
-      自動追加ではなく候補ファイルを出力する。
+      自動追加ではなく候補ファイルを出力する。should 候補はまとめて
+      python3 scripts/tokenize-batch.py --column 4 /tmp/should-candidates.txt
+      で検証できる。
 """
 
 import os
-import re
 import sys
 
+from akaza_tools.classification import CorpusMap, apply_classification
+from akaza_tools.filterstore import load_filter_store
+from akaza_tools.records import find_evaluate_dirs, read_records
+
 
 def load_bad_corpus_map():
     """最新の bad.txt から reading→corpus マッピングを作る。"""
-    corpus_map = {}
-    eval_base = 'tmp/evaluate'
-    if not os.path.exists(eval_base):
-        return corpus_map
-    dirs = sorted(d for d in os.listdir(eval_base)
-                  if os.path.isdir(os.path.join(eval_base, d)) and d.startswith('2'))
-    for d in reversed(dirs):
-        bad_file = os.path.join(eval_base, d, 'bad.txt')
+    corpus_map = CorpusMap()
+    for d in reversed(find_evaluate_dirs()):
+        bad_file = os.path.join(d, 'bad.txt')
         if os.path.exists(bad_file):
-            with open(bad_file) as f:
-                for line in f:
-                    m = re.match(r'\[BAD\]\s+(.+?)\s+=>\s+corpus=(.+?),\s+akaza=(.+)',
-                                 line.strip())
-                    if m:
-                        corpus_map[m.group(1)] = m.group(2)
+            for record in read_records(bad_file, statuses=('BAD',)):
+                corpus_map.feed(record)
             break
-    return corpus_map
+    return corpus_map.corpus
 
 
 def main():
@@ -52,79 +48,9 @@ def main():
     corpus_map = load_bad_corpus_map()
 
     # 既存の accept reading を読む
-    accept_path = 'evaluate-filter/accept.tsv'
-    existing_accept = set()
-    if os.path.exists(accept_path):
-        with open(accept_path) as f:
-            for line in f:
-                if line.startswith('#') or not line.strip():
-                    continue
-                parts = line.split('\t')
-                if parts:
-                    existing_accept.add(parts[0])
-
-    accept_lines = []
-    homophone_pairs = []
-    should_candidates = []
-    skip_count = 0
-    number_count = 0
-
-    with open(tsv_file) as f:
-        header = f.readline()
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            parts = line.split('\t')
-            if len(parts) < 4:
-                continue
-            reading, corpus_val, akaza, category = parts[0], parts[1], parts[2], parts[3]
-            subcategory = parts[4] if len(parts) > 4 else ''
-            notes = parts[5] if len(parts) > 5 else ''
-
-            corpus_expected = corpus_map.get(reading, corpus_val)
-
-            if category in ('style', 'corpus_wrong'):
-                if reading not in existing_accept:
-                    reason = f'{category}:{subcategory}' if subcategory else category
-                    accept_lines.append(f'{reading}\t{akaza}\t{corpus_expected}\t{reason}')
-
-            elif category == 'homophone':
-                homophone_pairs.append(f'{subcategory}\t{reading}\t{corpus_expected}\t{akaza}')
-
-            elif category in ('colloquial_breakdown', 'bigram_needed', 'idiom_unknown'):
-                should_candidates.append(
-                    f'{category}\t{subcategory}\t{reading}\t{corpus_expected}\t{akaza}')
-
-            elif category == 'number_issue':
-                number_count += 1
-            else:
-                skip_count += 1
-
-    # accept.tsv に追記
-    if accept_lines:
-        with open(accept_path, 'a') as f:
-            for line in accept_lines:
-                f.write(line + '\n')
-        print(f'accept.tsv: +{len(accept_lines)} entries', file=sys.stderr)
-
-    # homophone ペア一覧
-    if homophone_pairs:
-        outfile = '/tmp/homophone-pairs.txt'
-        with open(outfile, 'w') as f:
-            for line in homophone_pairs:
-                f.write(line + '\n')
-        print(f'Homophone pairs: {len(homophone_pairs)} → {outfile}', file=sys.stderr)
-
-    # should 候補一覧
-    if should_candidates:
-        outfile = '/tmp/should-candidates.txt'
-        with open(outfile, 'w') as f:
-            for line in should_candidates:
-                f.write(line + '\n')
-        print(f'Should candidates: {len(should_candidates)} → {outfile}', file=sys.stderr)
+    existing_accept = load_filter_store().accepted_readings
 
-    print(f'Skipped: {skip_count}, Number issues: {number_count}', file=sys.stderr)
+    apply_classification(tsv_file, corpus_map, existing_accept)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""評価コーパスを1文ずつ変換し、読みの長さ別のレイテンシを測る。
+
+Usage:
+    python3 scripts/bench-latency.py [--per-bucket N] [--seed S] [--repeat R] [--out FILE]
+                                     [--baseline FILE] [--max-regression R] [--check]
+
+読みの長さの区間ごとに N 文 (デフォルト 30) を選び、1文ずつ akaza-data evaluate で
+変換して p50/p95/p99、区間ごとのヒストグラム、モデルの読み込み時間、ピーク RSS を
+表示する。akaza-data の elapsed はミリ秒単位なので、1文を R 回 (デフォルト 20)
+並べて変換し、R で割ったものを1文のレイテンシとする。
+--out で結果を JSON に保存する (run-evaluate.sh は評価ディレクトリの
+latency.json に保存する)。
+
+--check を指定すると、baseline (省略時は tmp/evaluate/ の latency.json のうち、
+同じマシン・同じ --repeat で測った直近のもの) から いずれかの指標が
+--max-regression (デフォルト 0.2 = 20%) を超えて悪化したときに終了コード 1 で終わる。
+baseline が別のマシンや別の --repeat で測ったものなら比べずに終わる。
+リリース前の確認に使う (タグのビルドでは .github/workflows/model.yml が
+前回のリリースの latency.json を --baseline に渡す)。
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+from akaza_tools.evaluate import MODEL_DIR
+from akaza_tools.latency import (
+    LATENCY_BINS, LatencyReport, incomparable, regressions, run_benchmark, select_sentences,
+)
+from akaza_tools.records import find_evaluate_dirs
+
+
+def find_baseline(report: LatencyReport, exclude: str | None) -> str | None:
+    """tmp/evaluate/ の latency.json のうち、report と比べられる直近のもの。"""
+    for eval_dir in reversed(find_evaluate_dirs()):
+        path = os.path.join(eval_dir, "latency.json")
+        if not os.path.exists(path) or (exclude is not None and os.path.samefile(path, exclude)):
+            continue
+        if incomparable(report, LatencyReport.load(path)) is None:
+            return path
+    return None
+
+
+def print_report(report: LatencyReport) -> None:
+    bins = [f"<{b}" for b in LATENCY_BINS] + [f">={LATENCY_BINS[-1]}"]
+    print(f"{'reading':>8} {'n':>4} {'p50':>6} {'p95':>6} {'p99':>6} {'max':>6}  "
+          + " ".join(f"{b:>5}" for b in bins))
+    for label, s in report.buckets.items():
+        print(f"{label:>8} {s.count:>4} {s.p50_ms:>6g} {s.p95_ms:>6g} {s.p99_ms:>6g} "
+              f"{s.max_ms:>6g}  " + " ".join(f"{n:>5}" for n in s.histogram))
+    print()
+    print(f"  sentences: {report.n_sentences}")
+    print(f"  latency:   p50={report.p50_ms:g}ms p95={report.p95_ms:g}ms p99={report.p99_ms:g}ms "
+          f"(repeat {report.repeat})")
+    print(f"  load:      {report.load_ms:.0f}ms")
+    print(f"  peak RSS:  {report.peak_rss_mb:g}MB")
+    print(f"  runner:    {report.runner}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="変換レイテンシのベンチマーク")
+    parser.add_argument("--per-bucket", type=int, default=30, help="読みの長さの区間ごとの文数")
+    parser.add_argument("--seed", type=int, default=0, help="文の選択の乱数シード")
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="1文を何回並べて変換するか (レイテンシの分解能は 1/R ms)")
+    parser.add_argument("--load-runs", type=int, default=3, help="読み込み時間の計測回数")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--out", default=None, help="結果の JSON の保存先")
+    parser.add_argument("--baseline", default=None, help="比較する latency.json")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="許容する悪化の割合")
+    parser.add_argument("--check", action="store_true", help="悪化していたら終了コード 1")
+    args = parser.parse_args()
+
+    sentences = select_sentences(args.per_bucket, random.Random(args.seed))
+    progress = lambda i, n: print(f"\r  {i}/{n}", end="", file=sys.stderr, flush=True)
+    with tempfile.TemporaryDirectory(prefix="bench-latency-") as work_dir:
+        report = run_benchmark(sentences, Path(work_dir), args.load_runs, args.repeat,
+                               model_dir=args.model_dir, progress=progress)
+    print(file=sys.stderr)
+    print_report(report)
+    if args.out:
+        report.save(args.out)
+        print(f"  saved to:  {args.out}")
+
+    baseline_path = args.baseline or find_baseline(report, args.out)
+    if baseline_path is None:
+        print("  baseline:  なし")
+        return
+    baseline = LatencyReport.load(baseline_path)
+    print(f"  baseline:  {baseline_path}")
+    reason = incomparable(report, baseline)
+    if reason is not None:
+        print(f"  比べません: {reason}")
+        return
+    found = regressions(report, baseline, args.max_regression)
+    for message in found:
+        print(f"  REGRESSION {message}")
+    if found and args.check:
+        print(f"ERROR: レイテンシが {args.max_regression * 100:.0f}% を超えて悪化しました",
+              file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
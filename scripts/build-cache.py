@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""モデル・辞書の生成物のキャッシュ (work/cache/) を操作する。
+
+Usage:
+    python3 scripts/build-cache.py run {model,dict} [--salt S] [--max-size SIZE] -- COMMAND...
+    python3 scripts/build-cache.py list
+    python3 scripts/build-cache.py evict --max-size SIZE
+
+run は入力の正規化した内容と COMMAND からキーを作り、キャッシュがあれば
+生成物を取り出す。なければ COMMAND を実行して生成物を保存する。
+Makefile の data/bigram.model と data/SKK-JISYO.akaza から使う。
+キーの詳細は akaza_tools/buildcache.py を参照。
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from akaza_tools.buildcache import CACHE_DIR, TARGETS, evict, list_entries, parse_size, run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="モデル・辞書の生成物のキャッシュ")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="キャッシュから取り出すか、実行して保存する")
+    p_run.add_argument("target", choices=sorted(TARGETS))
+    p_run.add_argument("--salt", default="", help="キーに含める文字列 (CORPUS_STATS_VERSION など)")
+    p_run.add_argument("--max-size", type=parse_size, default=None, help="キャッシュの上限 (例: 4G)")
+    p_run.add_argument("cmd", nargs=argparse.REMAINDER, help="-- の後に生成コマンド")
+
+    sub.add_parser("list", help="キャッシュの一覧")
+
+    p_evict = sub.add_parser("evict", help="上限を超えた分を古いものから消す")
+    p_evict.add_argument("--max-size", type=parse_size, required=True)
+
+    args = parser.parse_args()
+    log = lambda msg: print(msg, file=sys.stderr)
+
+    if args.command == "run":
+        cmd = args.cmd[1:] if args.cmd[:1] == ["--"] else args.cmd
+        if not cmd:
+            parser.error("run には -- の後に生成コマンドが必要です")
+        sys.exit(run(args.target, cmd, args.salt, args.max_size, args.cache_dir, log))
+
+    if args.command == "list":
+        entries = list_entries(args.cache_dir)
+        for mtime, size, path in entries:
+            used = time.strftime("%Y-%m-%d %H:%M", time.localtime(mtime))
+            print(f"{used}  {size / 1024 ** 2:9.1f}M  {os.path.relpath(path, args.cache_dir)}")
+        print(f"total {sum(size for _, size, _ in entries) / 1024 ** 2:.1f}M")
+        return
+
+    for path in evict(args.max_size, args.cache_dir):
+        log(f"evict {path}")
+
+
+if __name__ == "__main__":
+    main()
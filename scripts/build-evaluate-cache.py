@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""評価結果ディレクトリの raw.txt から results.cache を作成する。
+
+Usage:
+    python3 scripts/build-evaluate-cache.py [evaluate_dir...]
+    python3 scripts/build-evaluate-cache.py --all  # tmp/evaluate/ 以下すべて
+
+results.cache は文 ID ごとの GOOD/TOP-5/BAD と読み・期待値・変換結果を
+保持するバイナリファイルで、分析スクリプトはこれを mmap して読む
+(フォーマットは akaza_tools/cache.py を参照)。
+評価コーパスが変わる前の raw.txt は文 ID が対応しないので、キャッシュを作らずに
+飛ばす (あった results.cache は消す)。
+"""
+
+import argparse
+import os
+import sys
+
+from akaza_tools.cache import build_cache, corpus_keys
+from akaza_tools.records import find_evaluate_dirs, find_latest_evaluate_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="raw.txt から results.cache を作成")
+    parser.add_argument("eval_dirs", nargs="*", help="evaluate ディレクトリ (省略時は最新)")
+    parser.add_argument("--all", action="store_true", help="tmp/evaluate/ 以下すべてを対象にする")
+    args = parser.parse_args()
+
+    if args.all:
+        eval_dirs = find_evaluate_dirs()
+    else:
+        eval_dirs = args.eval_dirs or [find_latest_evaluate_dir()]
+
+    keys = corpus_keys()
+    for eval_dir in eval_dirs:
+        if not os.path.exists(os.path.join(eval_dir, "raw.txt")):
+            print(f"skip: {eval_dir} (raw.txt がありません)", file=sys.stderr)
+            continue
+        try:
+            print(build_cache(eval_dir, keys))
+        except ValueError as e:
+            print(f"skip: {e}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
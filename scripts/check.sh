@@ -1,4 +1,7 @@
 #!/bin/bash
+# akaza-data check で変換する。変換結果の確認にはこれを使う。
+# scripts/lattice-score.py は Python 版のラティスによる近似で、結果が一致しないことがある
+# (一致率は python3 scripts/lattice-score.py --agreement で確かめる)。
 set -euo pipefail
 cd "$(dirname "$0")/.."
 akaza-data check \
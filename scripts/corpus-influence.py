@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""training-corpus のエントリを抜いて学習し直し、evaluate に効いていないエントリを探す。
+
+Usage:
+    python3 scripts/corpus-influence.py [--tiers should,may] [--chunk-size N]
+                                        [--tolerance T] [--jobs J] [--eval-jobs E]
+                                        [--corpus-dir DIR]
+
+training-corpus/ (--corpus-dir) の指定した tier のエントリを N 行 (既定 64) ずつのグループに分け、
+グループを抜いたコーパスで学習・評価する。結果が変わらなければそのグループは
+redundant、変わったグループは半分に分けて調べ直し、1行ずつの harmful
+(抜くと Bad が減る) / useful (抜くと Bad が増える) を求める。学習か評価が
+失敗したグループは failed になる。J 個の学習・評価を並行して実行する。
+
+結果は tmp/influence/<timestamp>/results.tsv に、エントリのファイルと行番号とともに書く。
+判定の詳細と注意点は akaza_tools/influence.py を参照。
+事前に make data/SKK-JISYO.akaza work/corpus-stats/_SUCCESS が必要。
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from akaza_tools.aggregate import TIERS, tier_corpora
+from akaza_tools.influence import (
+    FAILED, HARMFUL, REDUNDANT, USEFUL, InfluenceAnalysis, load_entries,
+)
+from akaza_tools.sweep import DEFAULTS, Config, check_inputs, remove_shards
+
+
+def main():
+    parser = argparse.ArgumentParser(description="training-corpus のエントリの影響の分析")
+    parser.add_argument("--tiers", default="should,may", help="調べる tier (カンマ区切り)")
+    parser.add_argument("--chunk-size", type=int, default=64, help="最初のグループの大きさ")
+    parser.add_argument("--tolerance", type=int, default=0,
+                        help="変化なしとみなす Good/Bad の差")
+    parser.add_argument("--jobs", "-j", type=int, default=2, help="並行して学習する数")
+    parser.add_argument("--eval-jobs", type=int, default=None,
+                        help="学習ごとの evaluate の並列数 (既定: nproc / jobs)")
+    for name, default in DEFAULTS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default)
+    parser.add_argument("--corpus-dir", default="training-corpus",
+                        help="学習に使うコーパスのディレクトリ")
+    parser.add_argument("--out", default=None, help="出力先 (既定: tmp/influence/<timestamp>)")
+    args = parser.parse_args()
+
+    tiers = [t for t in args.tiers.split(",") if t]
+    unknown = [t for t in tiers if t not in TIERS]
+    if unknown:
+        parser.error(f"不明な tier: {', '.join(unknown)}")
+    corpora = tier_corpora(args.corpus_dir)
+    missing = check_inputs(corpora)
+    if missing:
+        print(f"ERROR: 必要なファイルがありません: {', '.join(missing)}", file=sys.stderr)
+        sys.exit(1)
+
+    entries = load_entries(tiers, corpora)
+    config = Config(**{name: getattr(args, name) for name in DEFAULTS})
+    eval_jobs = args.eval_jobs or max(1, (os.cpu_count() or 1) // args.jobs)
+    out_dir = Path(args.out or f"tmp/influence/{time.strftime('%Y%m%d%H%M')}")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    log = lambda msg: print(msg, file=sys.stderr)
+    log(f"{len(entries)} entries ({', '.join(tiers)}), chunk {args.chunk_size}, "
+        f"jobs={args.jobs}, eval-jobs={eval_jobs} → {out_dir}")
+
+    analysis = InfluenceAnalysis(out_dir, config, entries, eval_jobs, args.tolerance, corpora,
+                                 log=log)
+    try:
+        verdicts = analysis.run(args.chunk_size, args.jobs)
+    except RuntimeError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        remove_shards(out_dir)
+
+    with open(out_dir / "results.tsv", "w") as f:
+        f.write("tier\tverdict\tdelta_good\tdelta_bad\tgroup_size\tsource\tline\n")
+        for v in sorted(verdicts, key=lambda v: (v.entry.tier, v.verdict, v.delta_bad)):
+            f.write(f"{v.entry.tier}\t{v.verdict}\t{v.delta_good}\t{v.delta_bad}\t"
+                    f"{v.group_size}\t{v.entry.source}\t{v.entry.line}\n")
+
+    counts = Counter((v.entry.tier, v.verdict) for v in verdicts)
+    print(f"baseline: {analysis.baseline.format()}")
+    print(f"{'tier':<8} {REDUNDANT:>10} {HARMFUL:>8} {USEFUL:>7} {FAILED:>7}")
+    for tier in tiers:
+        print(f"{tier:<8} {counts[tier, REDUNDANT]:>10} {counts[tier, HARMFUL]:>8} "
+              f"{counts[tier, USEFUL]:>7} {counts[tier, FAILED]:>7}")
+    harmful = [v for v in verdicts if v.verdict == HARMFUL]
+    if harmful:
+        print(f"\n{HARMFUL} (抜くと Bad が減る):")
+        for v in sorted(harmful, key=lambda v: v.delta_bad):
+            print(f"  {v.delta_bad:+4d}  {v.entry.source}: {v.entry.line}")
+    print(f"\nResults: {out_dir / 'results.tsv'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""[BAD] を「辞書に語がない (absent)」と「候補にはあるがスコアで負けた (outscored)」に分ける。
+
+Usage:
+    python3 scripts/dict-coverage.py [evaluate_dir] [--top N]
+
+SKK-JISYO.L・data/SKK-JISYO.akaza・dict/SKK-JISYO.akaza を1つの索引にまとめ
+(tmp/cache/ にキャッシュ)、bad.txt の各行の誤り箇所の文節が辞書の語で
+組み立てられるかを調べる。結果は {evaluate_dir}/coverage.tsv に書き、
+件数と、absent の文節のうち多いものを表示する。
+
+absent は dict/SKK-JISYO.akaza への追加、outscored はコーパスでの対処の候補になる
+(docs/conversion-improvement-strategy.md の「辞書で直せるものは辞書で直す」)。
+判定の詳細は akaza_tools/coverage.py を参照。
+"""
+
+import argparse
+import os
+import sys
+from collections import Counter
+
+from akaza_tools.cache import read_eval_records
+from akaza_tools.coverage import (
+    ABSENT, COVERAGE_DICTS, OUTSCORED, CoverageClassifier, load_coverage_index,
+)
+from akaza_tools.patterns import load_bunsetsu_index
+from akaza_tools.records import find_latest_evaluate_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BAD を語彙の不足とスコアの負けに分ける")
+    parser.add_argument("eval_dir", nargs="?", default=None,
+                        help="evaluate ディレクトリ (省略時は最新)")
+    parser.add_argument("--top", type=int, default=20, help="表示する absent の文節の数")
+    args = parser.parse_args()
+
+    eval_dir = args.eval_dir or find_latest_evaluate_dir()
+    bad_file = os.path.join(eval_dir, "bad.txt")
+    if not os.path.exists(bad_file):
+        print(f"ERROR: {bad_file} が見つかりません", file=sys.stderr)
+        sys.exit(1)
+
+    for path, _ in COVERAGE_DICTS:
+        if not os.path.exists(path):
+            print(f"WARNING: {path} がないので、その語は absent として数えます", file=sys.stderr)
+
+    classifier = CoverageClassifier(load_coverage_index(), load_bunsetsu_index())
+    counts = Counter()
+    missing_words = Counter()
+    out_path = os.path.join(eval_dir, "coverage.tsv")
+    with open(out_path, "w") as f:
+        f.write("reading\tcorpus\takaza\tclass\tmissing\n")
+        for record in read_eval_records(eval_dir, statuses=("BAD",)):
+            label, missing = classifier.classify(record)
+            counts[label] += 1
+            missing_words.update(missing)
+            f.write(f"{record.reading}\t{record.corpus}\t{record.akaza}\t{label}\t"
+                    f"{' '.join(missing)}\n")
+
+    total = sum(counts.values())
+    print(f"=== Dictionary coverage: {eval_dir} ===")
+    for label in (ABSENT, OUTSCORED):
+        print(f"  {label:<10} {counts[label]:>6} ({counts[label] / max(total, 1) * 100:.1f}%)")
+    if missing_words:
+        print(f"\n  absent の文節 (上位 {args.top}):")
+        for word, n in missing_words.most_common(args.top):
+            print(f"    {n:>4}  {word}")
+    print(f"\nSaved to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
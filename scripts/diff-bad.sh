@@ -6,6 +6,8 @@
 #
 # 出力:
 #   改善(removed from BAD)と退行(added to BAD)の件数とリスト
+#
+# 学習し直したモデルのどの n-gram のコストが動いたかは scripts/diff-model.py で調べる。
 
 set -euo pipefail
 
@@ -28,6 +30,16 @@ else
     exit 1
 fi
 
+# results.cache が raw.txt より古くなければ使える (akaza_tools/cache.py の open_cache と同じ判定)
+cache_fresh() {
+    [ -f "$1/results.cache" ] && ! [ "$1/raw.txt" -nt "$1/results.cache" ]
+}
+
+# 両方に新しい results.cache があれば文 ID で比較する (テキストの sort/diff を省略)
+if cache_fresh "$OLD" && cache_fresh "$NEW"; then
+    exec python3 "$(dirname "$0")/diff-evaluate.py" "$OLD" "$NEW"
+fi
+
 OLD_BAD="$OLD/bad.txt"
 NEW_BAD="$NEW/bad.txt"
 
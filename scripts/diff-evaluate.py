@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""2つの evaluate 結果の BAD を results.cache から比較する。
+
+Usage:
+    python3 scripts/diff-evaluate.py OLD_DIR NEW_DIR
+
+scripts/diff-bad.sh から、両方のディレクトリに results.cache があるときに呼ばれる。
+出力は diff-bad.sh のテキスト diff 版と同じ。
+"""
+
+import sys
+
+from akaza_tools.cache import BAD, open_cache
+
+
+def main():
+    if len(sys.argv) != 3:
+        print(f"Usage: {sys.argv[0]} OLD_DIR NEW_DIR", file=sys.stderr)
+        sys.exit(1)
+
+    old_dir, new_dir = sys.argv[1], sys.argv[2]
+    old, new = open_cache(old_dir), open_cache(new_dir)
+    if old is None or new is None:
+        print("ERROR: results.cache が見つかりません", file=sys.stderr)
+        sys.exit(1)
+    if old.digest != new.digest:
+        print("ERROR: 評価コーパスが異なるため文 ID で比較できません", file=sys.stderr)
+        sys.exit(1)
+
+    improved = []
+    regressed = []
+    for i, (o, n) in enumerate(zip(old.status, new.status)):
+        if o != BAD and n != BAD:
+            continue
+        old_line = old.record(i).line if o == BAD else None
+        new_line = new.record(i).line if n == BAD else None
+        if old_line == new_line:
+            continue
+        if old_line is not None:
+            improved.append(old_line)
+        if new_line is not None:
+            regressed.append(new_line)
+
+    print("=== Comparing ===")
+    print(f"  OLD: {old_dir}")
+    print(f"  NEW: {new_dir}")
+    print("")
+    print(f"  Improved (removed from BAD): {len(improved)}")
+    print(f"  Regressed (added to BAD):    {len(regressed)}")
+    print(f"  Net change:                   -{len(improved) - len(regressed)}")
+    print("")
+
+    if regressed:
+        print("=== Regressions ===")
+        for line in sorted(regressed):
+            print(line)
+        print("")
+
+    if improved:
+        print("=== Improvements ===")
+        for line in sorted(improved):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
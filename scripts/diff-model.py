@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""学習した2つのモデルの n-gram のコストの差分を表示する。
+
+Usage:
+    python3 scripts/diff-model.py OLD_DIR [NEW_DIR] [--top N] [--models unigram,bigram]
+                                  [--examples K] [--chunk C]
+
+OLD_DIR と NEW_DIR (既定: data/) の unigram.model / bigram.model / skip_bigram.model を
+突き合わせ、種類ごとに次を表示する。
+
+    - 共通のキー・コストが変わったキー・追加・削除されたキーの件数
+    - |コストの変化| の分布と平均の変化
+    - コストの変化が大きい上位 N 件と、追加・削除されたキーのうちコストの低い上位 N 件
+    - 上の各キーを含む training-corpus の行 (K 件まで)
+
+コーパスを変えて学習し直したら evaluate が悪くなったときに、どの n-gram が
+動いたのかを調べるのに使う (diff-bad.sh は結果の文しか比べない)。
+例えば、変更前のモデルを work/before/ にコピーしておき、
+`python3 scripts/diff-model.py work/before/` で学習し直した data/ と比べる。
+どちらのモデルも dict には読み込まず、C 件ずつ整列した一時ファイル (tmp/ の下) を
+マージしながら突き合わせる。キーのレイアウトが想定と違うモデルは比べずにエラーにする。
+詳細は akaza_tools/modeldiff.py を参照。
+"""
+
+import argparse
+import os
+import sys
+
+from akaza_tools.evaluate import MODEL_DIR
+from akaza_tools.modeldiff import CHUNK, KINDS, diff_models, link_corpus
+from akaza_tools.modelprune import COST_DELTA_BINS
+
+
+def show_key(key: str) -> str:
+    return key.replace("\t", " → ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="2つのモデルのコストの差分")
+    parser.add_argument("old_dir")
+    parser.add_argument("new_dir", nargs="?", default=MODEL_DIR)
+    parser.add_argument("--top", type=int, default=20, help="表示する上位の件数")
+    parser.add_argument("--models", default=",".join(KINDS), help="比べるモデル (カンマ区切り)")
+    parser.add_argument("--examples", type=int, default=3,
+                        help="キーごとに表示する training-corpus の行数 (0 で探さない)")
+    parser.add_argument("--chunk", type=int, default=CHUNK,
+                        help="一時ファイルに書くまでにメモリに溜める件数")
+    args = parser.parse_args()
+
+    kinds = [k for k in args.models.split(",") if k]
+    unknown = [k for k in kinds if k not in KINDS]
+    if unknown:
+        parser.error(f"不明なモデル: {', '.join(unknown)}")
+    for model_dir in (args.old_dir, args.new_dir):
+        if not os.path.exists(os.path.join(model_dir, "unigram.model")):
+            print(f"ERROR: {model_dir}/unigram.model がありません", file=sys.stderr)
+            sys.exit(1)
+
+    os.makedirs("tmp", exist_ok=True)
+    try:
+        diffs = diff_models(args.old_dir, args.new_dir, kinds, args.top, args.chunk,
+                            tmp_dir="tmp", log=lambda msg: print(msg, file=sys.stderr))
+    except (ModuleNotFoundError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    hits = {}
+    if args.examples:
+        wanted = {d.kind: {item[0] for item in d.top_changed + d.top_added + d.top_removed}
+                  for d in diffs}
+        hits = link_corpus(wanted, max_examples=args.examples)
+
+    def examples(kind: str, key: str) -> None:
+        h = hits.get((kind, key))
+        if h is None:
+            return
+        for where in h.examples:
+            print(f"        {where}")
+        if h.count > len(h.examples):
+            print(f"        ... ({h.count} lines)")
+
+    print(f"{args.old_dir} → {args.new_dir}")
+    bins = [f"<{b}" for b in COST_DELTA_BINS] + [f">={COST_DELTA_BINS[-1]}"]
+    print(f"\n{'model':<12} {'common':>9} {'changed':>9} {'up':>9} {'added':>9} {'removed':>9} "
+          f"{'mean Δ':>7}")
+    for d in diffs:
+        print(f"{d.kind:<12} {d.common:>9} {d.changed:>9} {d.increased:>9} {d.added:>9} "
+              f"{d.removed:>9} {d.mean_delta:>+7.3f}")
+    print("\n|Δcost| の分布 (コストが変わったキーの件数)")
+    print(f"{'model':<12} " + " ".join(f"{b:>8}" for b in bins))
+    for d in diffs:
+        print(f"{d.kind:<12} " + " ".join(f"{n:>8}" for n in d.delta_histogram))
+
+    for d in diffs:
+        print(f"\n=== {d.kind} ===")
+        if d.default_costs is not None and d.default_costs[0] != d.default_costs[1]:
+            print(f"  default edge cost: {d.default_costs[0]:.4f} → {d.default_costs[1]:.4f}")
+        if d.top_changed:
+            print(f"  コストの変化が大きいキー (上位 {len(d.top_changed)} 件):")
+            for key, old, new in d.top_changed:
+                print(f"    {new - old:>+8.4f}  {old:.4f} → {new:.4f}  {show_key(key)}")
+                examples(d.kind, key)
+        for title, items in (("追加", d.top_added), ("削除", d.top_removed)):
+            if items:
+                print(f"  {title}されたキー (コストの低い {len(items)} 件):")
+                for key, cost in items:
+                    print(f"    {cost:>9.4f}  {show_key(key)}")
+                    examples(d.kind, key)
+        if not (d.changed or d.added or d.removed):
+            print("  変化なし")
+
+
+if __name__ == "__main__":
+    main()
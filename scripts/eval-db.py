@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""評価結果を文ごとに SQLite (tmp/evaluate/results.sqlite) に貯めて問い合わせる。
+
+Usage:
+    python3 scripts/eval-db.py ingest [EVAL_DIR...] [--all]
+    python3 scripts/eval-db.py runs
+    python3 scripts/eval-db.py history READING
+    python3 scripts/eval-db.py regressions [--contains S] [--since DATE] [--until DATE]
+    python3 scripts/eval-db.py sql QUERY
+
+ingest は run-evaluate.sh が評価のたびに実行する。--all は tmp/evaluate/ の
+まだ入れていない評価をすべて入れる。
+history は読みが READING の文の評価ごとの結果と、最後に GOOD だった評価を出す。
+regressions は --since〜--until (「2026-10-01」のような日時) の最初と最後の
+評価の間で悪くなった文を出す。--contains で読みに含む文字列を絞り込める。
+テーブルの定義は akaza_tools/warehouse.py を参照。
+"""
+
+import argparse
+import sqlite3
+import sys
+
+from akaza_tools.records import find_evaluate_dirs, find_latest_evaluate_dir
+from akaza_tools.warehouse import DB_PATH, connect, history, ingest, ingested_runs, regressions
+
+
+def cmd_ingest(conn, args):
+    if args.all:
+        done = ingested_runs(conn)
+        eval_dirs = [d for d in find_evaluate_dirs() if d.rsplit("/", 1)[-1] not in done]
+    else:
+        eval_dirs = args.eval_dirs or [find_latest_evaluate_dir()]
+    for eval_dir in eval_dirs:
+        n = ingest(conn, eval_dir)
+        if n is None:
+            print(f"{eval_dir}: results.cache がなく、raw.txt からも作れません "
+                  "(raw.txt がないか、今の評価コーパスの結果ではありません)", file=sys.stderr)
+        else:
+            print(f"{eval_dir}: {n} sentences")
+
+
+def cmd_runs(conn, args):
+    print(f"{'name':<14} {'datetime':<17} {'commit':<10} {'mode':<12} "
+          f"{'good':>6} {'top5':>6} {'bad':>6} {'recall':>8}")
+    rows = conn.execute("SELECT r.name, r.datetime, r.commit_id, r.mode, r.good, r.top5,"
+                        " r.bad, r.recall FROM runs r ORDER BY r.datetime")
+    fmt = lambda v: "-" if v is None else v
+    for name, dt, commit, mode, good, top5, bad, recall in rows:
+        print(f"{name:<14} {dt:<17} {fmt(commit):<10} {fmt(mode):<12} {fmt(good):>6} "
+              f"{fmt(top5):>6} {fmt(bad):>6} {fmt(recall):>8}")
+
+
+def cmd_history(conn, args):
+    rows = history(conn, args.reading)
+    if not rows:
+        print(f"ERROR: 読みが {args.reading} の文がありません", file=sys.stderr)
+        sys.exit(1)
+    last_good = {}
+    for row in rows:
+        print(f"{row.datetime}  {row.commit_id or '-':<10} {row.status:<6} "
+              f"{row.corpus}" + (f"  → {row.akaza}" if row.akaza else ""))
+        if row.status == "GOOD":
+            last_good[row.corpus] = row
+    print()
+    for corpus in dict.fromkeys(row.corpus for row in rows):
+        good = last_good.get(corpus)
+        since = f"{good.datetime} ({good.commit_id or '-'})" if good else "なし"
+        print(f"last GOOD: {since}  {corpus}")
+
+
+def cmd_regressions(conn, args):
+    found = regressions(conn, args.contains, args.since, args.until)
+    if not found:
+        print("退行した文はありません")
+        return
+    print(f"{found[0].old_run} → {found[0].new_run}: {len(found)} sentences")
+    for r in found:
+        print(f"  {r.old_status:>5} → {r.new_status:<5} {r.reading}\n"
+              f"      expected: {r.corpus}\n"
+              f"      akaza:    {r.akaza}")
+
+
+def cmd_sql(conn, args):
+    try:
+        cur = conn.execute(args.query)
+    except sqlite3.Error as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    if cur.description:
+        print("\t".join(c[0] for c in cur.description))
+    for row in cur:
+        print("\t".join("" if v is None else str(v) for v in row))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="評価結果の SQLite への蓄積と問い合わせ")
+    parser.add_argument("--db", default=DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("ingest", help="評価結果を入れる (既定: 最新の評価)")
+    p.add_argument("eval_dirs", nargs="*")
+    p.add_argument("--all", action="store_true", help="まだ入れていない評価をすべて入れる")
+    sub.add_parser("runs", help="入っている評価の一覧")
+    p = sub.add_parser("history", help="文の評価ごとの結果")
+    p.add_argument("reading")
+    p = sub.add_parser("regressions", help="期間の最初と最後の評価の間で悪くなった文")
+    p.add_argument("--contains", default="", help="読みに含む文字列")
+    p.add_argument("--since", default="", help="期間の始め (例: 2026-10-01)")
+    p.add_argument("--until", default="9999", help="期間の終わり")
+    p = sub.add_parser("sql", help="SQL を実行して TSV で出力")
+    p.add_argument("query")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    {"ingest": cmd_ingest, "runs": cmd_runs, "history": cmd_history,
+     "regressions": cmd_regressions, "sql": cmd_sql}[args.command](conn, args)
+
+
+if __name__ == "__main__":
+    main()
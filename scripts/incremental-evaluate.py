@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""前回の評価結果から、変更の影響を受ける文だけを再評価する。
+
+Usage:
+    python3 scripts/incremental-evaluate.py [--base DIR] [--jobs N] [--verify]
+
+前回の評価ディレクトリ (省略時は tmp/evaluate/ の最新) の summary.txt の
+コミットから現在の作業ツリーまでの training-corpus/*.txt と
+dict/SKK-JISYO.akaza の差分を取り、変更された読みを含む文だけを再評価する。
+それ以外の文の結果は前回の raw.txt から引き継ぎ、`make evaluate` と同じ形式で
+全文の結果を stdout に出力する。再現率は計算できないので nan になる。
+
+--verify を指定するとフル評価も実行し、[BAD]/[TOP-5] の結果が一致しなければ
+差分を stderr に出して exit 1 する (CI 用)。
+
+事前に `make data/bigram.model` でモデルをビルドしておくこと。
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from akaza_tools.evaluate import evaluate_sharded
+from akaza_tools.incremental import evaluate_incremental
+from akaza_tools.records import find_latest_evaluate_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="変更の影響を受ける文だけを再評価")
+    parser.add_argument("--base", default=None,
+                        help="結果を引き継ぐ評価ディレクトリ (省略時は最新)")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1,
+                        help="シャード数 (並列プロセス数)")
+    parser.add_argument("--verify", action="store_true",
+                        help="フル評価と結果が一致するか検証する")
+    args = parser.parse_args()
+
+    base_dir = Path(args.base or find_latest_evaluate_dir(require="raw.txt"))
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="akaza-evaluate-") as tmp:
+            lines, summary, n_affected = evaluate_incremental(
+                base_dir, Path(tmp), args.jobs)
+            print(f"Incremental: re-evaluated {n_affected}/{summary.total} sentences "
+                  f"(base: {base_dir})", file=sys.stderr)
+            if args.verify:
+                full_lines, _ = evaluate_sharded(Path(tmp) / "full", args.jobs)
+    except subprocess.CalledProcessError as e:
+        print(e.stdout, file=sys.stderr)
+        print(f"ERROR: {' '.join(e.cmd)} が失敗しました (exit={e.returncode})",
+              file=sys.stderr)
+        sys.exit(1)
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    for line in lines:
+        print(line)
+    print(summary.format())
+
+    if args.verify:
+        incremental = {l for l in lines if l.startswith(("[BAD]", "[TOP-5]"))}
+        full = {l for l in full_lines if l.startswith(("[BAD]", "[TOP-5]"))}
+        if incremental != full:
+            print("=== Incremental/full mismatch ===", file=sys.stderr)
+            for line in sorted(full - incremental):
+                print(f"  missing: {line}", file=sys.stderr)
+            for line in sorted(incremental - full):
+                print(f"  stale:   {line}", file=sys.stderr)
+            sys.exit(1)
+        print("Incremental result matches full evaluation.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
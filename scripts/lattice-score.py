@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""data/*.model を使って読みを変換し、k-best の候補とコストの内訳を表示する。
+
+Usage:
+    python3 scripts/lattice-score.py [-k K] [--breakdown] [LINE...]
+    python3 scripts/lattice-score.py < training-corpus/should.txt
+    python3 scripts/lattice-score.py --agreement [EVAL_DIR] [--sample N]
+
+LINE (省略時は stdin の各行) は読みか、コーパス形式 (表層/読み をスペース区切り)。
+コーパス形式なら、その分割の期待値のコストと順位も表示する。should.txt に
+追加する前に、期待値と1位の候補のコスト差を確かめるのに使う。
+
+akaza-data を起動せず Python でラティスを作るので、結果は akaza-data check と
+完全には一致しない (akaza_tools/lattice.py を参照)。--agreement を指定すると、
+評価ディレクトリ (省略時は tmp/evaluate/ の最新) の各文を変換し、akaza-data evaluate の
+1位とどれだけ一致するかを status ごとに表示する。この出力をどこまで信用できるかの
+目安になる。モデルを学習し直したら確かめ直すこと。変換結果の確認には check.sh を使う。
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from akaza_tools.cache import STATUS_NAMES, open_or_build_cache
+from akaza_tools.evaluate import EUCJP_DICT, MODEL_DIR, UTF8_DICT
+from akaza_tools.lattice import Path, Scorer, compare_with_evaluate
+from akaza_tools.records import find_latest_evaluate_dir
+
+
+def parse_line(line: str) -> tuple[str, list[tuple[str, str]] | None]:
+    """(読み, コーパス形式なら [(表層, 読み), ...]) を返す。"""
+    if "/" not in line:
+        return line.replace(" ", ""), None
+    words = [tuple(token.split("/", 1)) for token in line.split(" ") if token]
+    return "".join(reading for _, reading in words), words
+
+
+def print_breakdown(path: Path, indent: str) -> None:
+    for s in path.segments:
+        print(f"{indent}{s.surface}/{s.reading:<12} word={s.word_cost:7.3f} "
+              f"edge={s.edge_cost:7.3f} skip={s.skip_cost:6.3f}")
+    print(f"{indent}EOS{'':<12} edge={path.eos_cost:7.3f}")
+
+
+def print_agreement(scorer: Scorer, eval_dir: str, sample: int | None, seed: int) -> None:
+    cache = open_or_build_cache(eval_dir)
+    if cache is None:
+        print(f"ERROR: {eval_dir} に評価結果がありません", file=sys.stderr)
+        sys.exit(1)
+    records = list(cache.iter_records(tuple(STATUS_NAMES.values())))
+    if sample is not None and sample < len(records):
+        records = random.Random(seed).sample(records, sample)
+
+    start = time.perf_counter()
+    result = compare_with_evaluate(scorer, records)
+    elapsed = time.perf_counter() - start
+
+    print(f"{eval_dir}: Python 版と akaza-data の1位の一致率")
+    for status in STATUS_NAMES.values():
+        n = result.total[status]
+        if n:
+            print(f"  {status:<6} {result.agreed[status]:>6}/{n:<6} "
+                  f"({result.agreed[status] / n * 100:.2f}%)")
+    print(f"  total  {sum(result.agreed.values()):>6}/{sum(result.total.values()):<6} "
+          f"({result.rate:.2f}%)")
+    for status, reading, akaza, ours in result.mismatches:
+        print(f"  [{status}] {reading}\n      akaza-data: {akaza}\n      lattice.py: {ours}")
+    print(f"{len(records)} sentences in {elapsed:.1f}s", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Python 版ラティスで k-best の変換候補を表示")
+    parser.add_argument("lines", nargs="*", help="読み、またはコーパス形式の行")
+    parser.add_argument("-k", type=int, default=5, help="表示する候補数")
+    parser.add_argument("--breakdown", action="store_true", help="1位と期待値のコストの内訳")
+    parser.add_argument("--agreement", nargs="?", const="", default=None, metavar="EVAL_DIR",
+                        help="評価結果の akaza-data の1位との一致率を表示する")
+    parser.add_argument("--sample", type=int, default=None, help="--agreement で調べる文数")
+    parser.add_argument("--seed", type=int, default=0, help="--sample の乱数シード")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--eucjp-dict", default=EUCJP_DICT)
+    parser.add_argument("--utf8-dict", default=UTF8_DICT)
+    args = parser.parse_args()
+
+    try:
+        scorer = Scorer.load(args.model_dir, args.eucjp_dict, args.utf8_dict)
+    except (ModuleNotFoundError, OSError, ValueError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.agreement is not None:
+        print_agreement(scorer, args.agreement or find_latest_evaluate_dir(),
+                        args.sample, args.seed)
+        return
+
+    lines = args.lines or (line.strip() for line in sys.stdin)
+    queries = [parse_line(line) for line in lines if line and not line.startswith(";;")]
+
+    start = time.perf_counter()
+    results = scorer.score_batch(reading for reading, _ in queries)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    for reading, words in queries:
+        paths = results[reading][:args.k]
+        print(reading)
+        for rank, path in enumerate(paths, 1):
+            print(f"  {rank:2d} {path.cost:8.3f}  {path.format()}")
+        if args.breakdown and paths:
+            print_breakdown(paths[0], "       ")
+        if words is None:
+            continue
+        expected = scorer.score_words(words)
+        surfaces = [p.surface for p in paths]
+        rank = (f"rank {surfaces.index(expected.surface) + 1}"
+                if expected.surface in surfaces else f"not in top-{args.k}")
+        gap = expected.cost - paths[0].cost if paths else 0.0
+        print(f"  expected {expected.cost:8.3f} ({gap:+.3f}, {rank})  {expected.format()}")
+        if args.breakdown:
+            print_breakdown(expected, "       ")
+
+    print(f"{len(results)} readings in {elapsed:.1f}ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""anthy-corpus をシャードに分割して akaza-data evaluate を並列実行する。
+
+Usage:
+    python3 scripts/parallel-evaluate.py [--jobs N] [--model-dir DIR]
+
+`make evaluate` と同じ形式の出力 ([BAD]/[TOP-5] 行とサマリー行) を stdout に書く。
+シャードはコーパスの連続区間なので、出力の順序は `make evaluate` と同じになる。
+サマリーの elapsed は全シャードの wall-clock 時間、再現率は文字数重み付きの合算値。
+
+事前に `make data/bigram.model` でモデルをビルドしておくこと。
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from akaza_tools.evaluate import MODEL_DIR, evaluate_sharded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="akaza-data evaluate をシャード並列で実行")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1,
+                        help="シャード数 (並列プロセス数)")
+    parser.add_argument("--model-dir", default=MODEL_DIR, help="モデルディレクトリ")
+    parser.add_argument("--shard-dir", default=None,
+                        help="シャードファイルの出力先 (省略時は一時ディレクトリ)")
+    args = parser.parse_args()
+
+    try:
+        if args.shard_dir:
+            lines, summary = evaluate_sharded(Path(args.shard_dir), args.jobs,
+                                              model_dir=args.model_dir)
+        else:
+            with tempfile.TemporaryDirectory(prefix="akaza-evaluate-") as tmp:
+                lines, summary = evaluate_sharded(Path(tmp), args.jobs,
+                                                  model_dir=args.model_dir)
+    except subprocess.CalledProcessError as e:
+        print(e.stdout, file=sys.stderr)
+        print(f"ERROR: akaza-data evaluate が失敗しました (exit={e.returncode})",
+              file=sys.stderr)
+        sys.exit(1)
+
+    for line in lines:
+        print(line)
+    print(summary.format())
+
+
+if __name__ == "__main__":
+    main()
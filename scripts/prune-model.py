@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""モデルの容量の分析と、bigram.model / skip_bigram.model の枝刈り。
+
+Usage:
+    python3 scripts/prune-model.py profile [--model-dir data/]
+    python3 scripts/prune-model.py apply --threshold T [--quantize-bits B] [--out work/pruned/]
+    python3 scripts/prune-model.py report [--levels 0.05,0.1,0.2,0.5] [--quantize-bits B]
+                                          [--jobs N]
+
+profile はモデルごとのキー数・ファイルサイズと、bigram のコストがデフォルト
+(バックオフ) のコストにどれだけ近いかのヒストグラムを表示する。
+
+apply は |コスト - デフォルト| が T 未満のエントリを消したモデルを --out に書く
+(unigram.model はコピーする)。`make prune` から使い、
+`make install INSTALL_MODEL_DIR=work/pruned` でインストールする。
+
+report は枝刈りの強さごとに tmp/prune/<level>/ にモデルを作って evaluate し、
+サイズと再現率・Bad を枝刈りしないモデルと比べた表を表示する。
+枝刈りの詳細は akaza_tools/modelprune.py を参照。
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from akaza_tools.evaluate import MODEL_DIR, evaluate_sharded
+from akaza_tools.modelprune import (
+    COST_DELTA_BINS, PRUNABLE, models_size, profile_models, prune_models,
+)
+
+PRUNE_DIR = "tmp/prune"
+
+
+def float_list(value: str) -> list[float]:
+    try:
+        return [float(v) for v in value.split(",") if v]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"カンマ区切りの数値で指定してください: {value!r}")
+
+
+def print_profile(model_dir: str) -> None:
+    profiles = profile_models(model_dir)
+    print(f"{'model':<20} {'keys':>10} {'size':>9} {'bytes/key':>9}")
+    for p in profiles:
+        print(f"{os.path.basename(p.path):<20} {p.keys:>10} {p.size / 1024 ** 2:>8.1f}M "
+              f"{p.size / max(p.keys, 1):>9.1f}")
+    print(f"{'total':<20} {sum(p.keys for p in profiles):>10} "
+          f"{sum(p.size for p in profiles) / 1024 ** 2:>8.1f}M")
+
+    bins = [f"<{b}" for b in COST_DELTA_BINS] + [f">={COST_DELTA_BINS[-1]}"]
+    print()
+    print("|cost - default| の分布 (累積の割合)")
+    print(f"{'model':<20} {'default':>7} {'costs':>8}  " + " ".join(f"{b:>6}" for b in bins))
+    for p in profiles:
+        if p.default_cost is None:
+            continue
+        cumulative, cells = 0, []
+        for n in p.delta_histogram:
+            cumulative += n
+            cells.append(f"{cumulative / max(p.edges, 1) * 100:>5.1f}%")
+        print(f"{os.path.basename(p.path):<20} {p.default_cost:>7.2f} {p.distinct_costs:>8}  "
+              + " ".join(cells))
+
+
+def evaluate_level(model_dir: str, jobs: int | None):
+    _, summary = evaluate_sharded(Path(PRUNE_DIR) / "shards", jobs, model_dir=model_dir)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="モデルの容量の分析と枝刈り")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("profile", help="キー数・サイズ・コストの分布を表示する")
+
+    p_apply = sub.add_parser("apply", help="枝刈りしたモデルを書き出す")
+    p_apply.add_argument("--threshold", type=float, required=True,
+                         help="|コスト - デフォルト| がこれ未満のエントリを消す")
+    p_apply.add_argument("--quantize-bits", type=int, default=None, help="コストを丸めるビット数")
+    p_apply.add_argument("--out", default="work/pruned/")
+
+    p_report = sub.add_parser("report", help="枝刈りの強さごとに evaluate して比べる")
+    p_report.add_argument("--levels", type=float_list, default=[0.05, 0.1, 0.2, 0.5])
+    p_report.add_argument("--quantize-bits", type=int, default=None)
+    p_report.add_argument("--jobs", "-j", type=int, default=None, help="evaluate の並列数")
+
+    args = parser.parse_args()
+    missing = [name for name in ("unigram.model", *PRUNABLE)
+               if not os.path.exists(os.path.join(args.model_dir, name))]
+    if missing:
+        print(f"ERROR: {args.model_dir} に {', '.join(missing)} がありません", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == "profile":
+        print_profile(args.model_dir)
+        return
+
+    if args.command == "apply":
+        for s in prune_models(args.model_dir, args.out, args.threshold, args.quantize_bits):
+            print(f"{s.name}: {s.before} → {s.after} entries, "
+                  f"{s.size_before / 1024 ** 2:.1f}M → {s.size_after / 1024 ** 2:.1f}M")
+        return
+
+    log = lambda msg: print(msg, file=sys.stderr)
+    log("baseline: evaluate")
+    base = evaluate_level(args.model_dir, args.jobs)
+    base_size = models_size(args.model_dir)
+    rows = [("none", base_size, base)]
+    for level in args.levels:
+        level_dir = os.path.join(PRUNE_DIR, f"{level:g}" + (
+            f"-q{args.quantize_bits}" if args.quantize_bits else ""))
+        log(f"{level_dir}: prune")
+        prune_models(args.model_dir, level_dir, level, args.quantize_bits)
+        log(f"{level_dir}: evaluate")
+        rows.append((level_dir, models_size(level_dir), evaluate_level(level_dir, args.jobs)))
+
+    print(f"{'level':<22} {'size':>9} {'size%':>6} {'good':>6} {'bad':>6} {'Δbad':>6} "
+          f"{'recall':>9} {'Δrecall':>8}")
+    for name, size, s in rows:
+        print(f"{name:<22} {size / 1024 ** 2:>8.1f}M {size / base_size * 100:>5.1f}% "
+              f"{s.good:>6} {s.bad:>6} {s.bad - base.bad:>+6} "
+              f"{s.recall:>9.4f} {s.recall - base.recall:>+8.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""tmp/evaluate/ 以下の全評価結果から、文ごとの退行・改善を集計する。
+
+Usage:
+    python3 scripts/regression-matrix.py [--last N] [--top5] [--pair OLD NEW]
+                                         [--min-flips K] [--limit L]
+
+出力:
+    - 評価ごとの BAD 件数と、直前の評価からの改善・退行件数
+    - 状態が K 回以上反転している (チャタリングしている) 文
+    - 最新で BAD の文が初めて退行したコミットごとの件数と例
+    --pair を指定すると、その2つの評価 (tmp/evaluate/ のディレクトリ名) の間の
+    改善・退行した文の一覧も出す。
+
+results.cache のない評価は `python3 scripts/build-evaluate-cache.py --all` で作成する。
+"""
+
+import argparse
+import os
+import sys
+from collections import Counter
+
+from akaza_tools.records import EVALUATE_BASE, find_evaluate_dirs
+from akaza_tools.regression import RegressionMatrix, iter_bits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全評価結果の退行・改善を集計")
+    parser.add_argument("--last", type=int, default=None, help="最新 N 件の評価だけを使う")
+    parser.add_argument("--top5", action="store_true", help="TOP-5 も失敗として扱う")
+    parser.add_argument("--pair", nargs=2, metavar=("OLD", "NEW"), default=None,
+                        help="改善・退行した文を一覧する評価の組")
+    parser.add_argument("--min-flips", type=int, default=3, help="チャタリングとみなす反転回数")
+    parser.add_argument("--limit", type=int, default=20, help="一覧の表示件数")
+    args = parser.parse_args()
+
+    eval_dirs = find_evaluate_dirs()
+    if args.last:
+        eval_dirs = eval_dirs[-args.last:]
+    matrix = RegressionMatrix.load(eval_dirs, args.top5,
+                                   warn=lambda msg: print(msg, file=sys.stderr))
+    runs = matrix.runs
+    if len(runs) < 2:
+        print("ERROR: 比較するには results.cache のある評価結果が2つ以上必要です",
+              file=sys.stderr)
+        sys.exit(1)
+
+    print("=== Runs ===")
+    print(f"  {'run':<16} {'commit':<10} {'bad':>6} {'improved':>9} {'regressed':>10}")
+    for k, run in enumerate(runs):
+        name = os.path.basename(run.eval_dir)
+        if k == 0:
+            print(f"  {name:<16} {run.commit:<10} {run.bad.bit_count():>6}")
+            continue
+        improved = matrix.improvements(k - 1, k).bit_count()
+        regressed = matrix.regressions(k - 1, k).bit_count()
+        print(f"  {name:<16} {run.commit:<10} {run.bad.bit_count():>6} "
+              f"{improved:>9} {regressed:>10}")
+    print()
+
+    latest = matrix.caches[-1]
+
+    flips = matrix.flip_flops(args.min_flips)
+    print(f"=== Flip-flopping sentences (>= {args.min_flips} flips): {len(flips)} ===")
+    for i, count in sorted(flips.items(), key=lambda x: -x[1])[:args.limit]:
+        record = latest.record(i)
+        print(f"  {count:3d}  {record.reading} => corpus={record.corpus}")
+    print()
+
+    first = matrix.first_regressions()
+    print(f"=== First regression of currently-BAD sentences: {len(first)} ===")
+    by_run = Counter(first.values())
+    for k in sorted(by_run, key=lambda k: -by_run[k])[:args.limit]:
+        run = runs[k]
+        example = latest.record(next(i for i, r in first.items() if r == k))
+        print(f"  {run.commit:<10} {os.path.basename(run.eval_dir):<16} {by_run[k]:5d}  "
+              f"e.g. {example.line}")
+
+    if args.pair:
+        names = [os.path.basename(run.eval_dir) for run in runs]
+        try:
+            old, new = (names.index(os.path.basename(os.path.normpath(p)))
+                        for p in args.pair)
+        except ValueError:
+            print(f"ERROR: {EVALUATE_BASE} に指定の評価がありません: {args.pair}",
+                  file=sys.stderr)
+            sys.exit(1)
+        for title, bits, cache in (
+                ("Regressions", matrix.regressions(old, new), matrix.caches[new]),
+                ("Improvements", matrix.improvements(old, new), matrix.caches[old])):
+            print()
+            print(f"=== {title}: {bits.bit_count()} ===")
+            for i in iter_bits(bits):
+                print(cache.record(i).line)
+
+
+if __name__ == "__main__":
+    main()
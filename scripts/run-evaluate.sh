@@ -1,6 +1,20 @@
 #!/bin/bash
 # 評価実行 + 結果保存スクリプト
-# Usage: scripts/run-evaluate.sh
+# Usage: scripts/run-evaluate.sh [--incremental]
+#
+# --incremental を指定すると、前回の評価結果からコーパス・辞書の変更に
+# 関係する文だけを再評価する (scripts/incremental-evaluate.py)。
+#
+# EVALUATE_JOBS でシャード数を指定する (デフォルト: CPU コア数)。
+# EVALUATE_JOBS=1 のときは従来どおり make evaluate を1プロセスで実行する。
+#
+# BENCH_LATENCY=1 を指定すると、変換レイテンシのベンチマーク (scripts/bench-latency.py)
+# も実行して HISTORY.tsv に記録し、同じマシンで測った前回より 20% を超えて悪化していたら
+# 終了コード 1 で終わる。手元では指定したときだけ測る。リリース (タグ) のビルドでは
+# .github/workflows/model.yml が前回のリリースの latency.json と比べて同じ確認をする
+# (前回と別のマシンで測ったときは比べない)。
+#
+# 文ごとの結果は tmp/evaluate/results.sqlite にも入れる (scripts/eval-db.py で問い合わせる)。
 set -euo pipefail
 
 SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
@@ -10,12 +24,38 @@ cd "$PROJECT_DIR"
 TIMESTAMP="$(date '+%Y%m%d%H%M')"
 OUTDIR="tmp/evaluate/$TIMESTAMP"
 HISTORY="tmp/evaluate/HISTORY.tsv"
+JOBS="${EVALUATE_JOBS:-$(nproc)}"
+
+MODE="full"
+if [ "${1:-}" = "--incremental" ]; then
+    MODE="incremental"
+    # 評価結果がないと ls が失敗し、pipefail で黙って終了してしまうので || true
+    BASE_DIR=$(ls -d tmp/evaluate/2*/ 2>/dev/null | sort | tail -1 | sed 's:/$::' || true)
+    if [ -z "$BASE_DIR" ] || [ ! -f "$BASE_DIR/raw.txt" ]; then
+        echo "ERROR: 前回の評価結果がありません。フル評価を実行してください" >&2
+        exit 1
+    fi
+    if [ "$BASE_DIR" = "$OUTDIR" ]; then
+        echo "ERROR: 前回の評価と同じ時刻の出力先です。1分待ってから実行してください" >&2
+        exit 1
+    fi
+fi
 
 mkdir -p "$OUTDIR"
 
 # 評価実行
-echo "Running make evaluate..."
-make evaluate 2>&1 | tee "$OUTDIR/raw.txt"
+if [ "$MODE" = "incremental" ]; then
+    make data/bigram.model
+    echo "Running incremental evaluate (base: $BASE_DIR)..."
+    python3 scripts/incremental-evaluate.py --base "$BASE_DIR" --jobs "$JOBS" 2>&1 | tee "$OUTDIR/raw.txt"
+elif [ "$JOBS" -gt 1 ]; then
+    make data/bigram.model
+    echo "Running evaluate ($JOBS shards)..."
+    python3 scripts/parallel-evaluate.py --jobs "$JOBS" 2>&1 | tee "$OUTDIR/raw.txt"
+else
+    echo "Running make evaluate..."
+    make evaluate 2>&1 | tee "$OUTDIR/raw.txt"
+fi
 
 # BAD 行抽出
 grep '^\[BAD\]' "$OUTDIR/raw.txt" > "$OUTDIR/bad.txt" || true
@@ -23,8 +63,11 @@ grep '^\[BAD\]' "$OUTDIR/raw.txt" > "$OUTDIR/bad.txt" || true
 # TOP-5 行抽出
 grep '^\[TOP-5\]' "$OUTDIR/raw.txt" > "$OUTDIR/top5.txt" || true
 
-# パターン分析
-python3 scripts/extract-patterns.py < "$OUTDIR/raw.txt" > "$OUTDIR/patterns.txt" 2>&1 || true
+# 文 ID ごとの結果キャッシュ (results.cache)
+python3 scripts/build-evaluate-cache.py "$OUTDIR" > /dev/null || true
+
+# フィルタ + パターン分析 (bad-filtered.txt, patterns.txt)
+python3 scripts/analyze-evaluate.py "$OUTDIR" || true
 
 # スコア抽出 (最終行: "Good=5962, Top-5=473, Bad=4630, elapsed=183403ms, 再現率=91.646194")
 SUMMARY_LINE=$(grep 'Good=[0-9].*再現率=' "$OUTDIR/raw.txt" | tail -1)
@@ -32,6 +75,21 @@ GOOD=$(echo "$SUMMARY_LINE" | grep -oP 'Good=\K[0-9]+' || echo "0")
 TOP5=$(echo "$SUMMARY_LINE" | grep -oP 'Top-5=\K[0-9]+' || echo "0")
 BAD=$(echo "$SUMMARY_LINE" | grep -oP 'Bad=\K[0-9]+' || echo "0")
 RECALL=$(echo "$SUMMARY_LINE" | grep -oP '再現率=\K[0-9.]+' || echo "N/A")
+ELAPSED=$(echo "$SUMMARY_LINE" | grep -oP 'elapsed=\K[0-9]+' || echo "")
+
+# 変換レイテンシ (latency.json)
+P50=""; P95=""; P99=""; LOAD_MS=""; PEAK_RSS=""
+LATENCY_FAILED=0
+if [ "${BENCH_LATENCY:-0}" = "1" ]; then
+    python3 scripts/bench-latency.py --out "$OUTDIR/latency.json" --check || LATENCY_FAILED=1
+    if [ -f "$OUTDIR/latency.json" ]; then
+        read -r P50 P95 P99 LOAD_MS PEAK_RSS < <(python3 -c '
+import json, sys
+d = json.load(open(sys.argv[1]))
+print(d["p50_ms"], d["p95_ms"], d["p99_ms"], round(d["load_ms"]), d["peak_rss_mb"])
+' "$OUTDIR/latency.json")
+    fi
+fi
 
 COMMIT=$(git rev-parse --short HEAD 2>/dev/null || echo "unknown")
 DATE=$(date '+%Y-%m-%d %H:%M')
@@ -44,13 +102,31 @@ Good: $GOOD
 Top-5: $TOP5
 Bad: $BAD
 Recall: $RECALL
+Mode: $MODE
+Elapsed: ${ELAPSED}ms
 EOF
+if [ -n "$P99" ]; then
+    cat >> "$OUTDIR/summary.txt" <<EOF
+Latency: p50=${P50}ms p95=${P95}ms p99=${P99}ms load=${LOAD_MS}ms peak_rss=${PEAK_RSS}MB
+EOF
+fi
 
-# HISTORY.tsv に追記 (ヘッダーがなければ作成)
+# HISTORY.tsv に追記 (ヘッダーがなければ作成、古いヘッダーなら列を追加)
+HISTORY_HEADER="datetime\tcommit\tgood\ttop5\tbad\trecall\telapsed_ms\tp50_ms\tp95_ms\tp99_ms\tload_ms\tpeak_rss_mb"
 if [ ! -f "$HISTORY" ]; then
-    printf "datetime\tcommit\tgood\ttop5\tbad\trecall\n" > "$HISTORY"
+    printf "$HISTORY_HEADER\n" > "$HISTORY"
+elif ! head -1 "$HISTORY" | grep -q 'p99_ms'; then
+    # 古い行は列が少ないので、足りない列を空にしてヘッダーと揃える
+    awk -v header="$HISTORY_HEADER" 'BEGIN { FS = OFS = "\t" } NR == 1 { print header; next } { NF = 12; print }' \
+        "$HISTORY" > "$HISTORY.tmp"
+    mv "$HISTORY.tmp" "$HISTORY"
 fi
-printf "%s\t%s\t%s\t%s\t%s\t%s\n" "$DATE" "$COMMIT" "$GOOD" "$TOP5" "$BAD" "$RECALL" >> "$HISTORY"
+printf "%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\n" "$DATE" "$COMMIT" "$GOOD" "$TOP5" "$BAD" "$RECALL" \
+    "$ELAPSED" "$P50" "$P95" "$P99" "$LOAD_MS" "$PEAK_RSS" >> "$HISTORY"
+
+# 文ごとの結果を SQLite に入れる (失敗しても評価結果は残っているので続ける)
+python3 scripts/eval-db.py ingest "$OUTDIR" > /dev/null \
+    || echo "WARNING: results.sqlite への登録に失敗しました" >&2
 
 # サマリー表示
 echo ""
@@ -63,6 +139,15 @@ echo "  Good:    $GOOD"
 echo "  Top-5:   $TOP5"
 echo "  Bad:     $BAD"
 echo "  Recall:  $RECALL"
+echo "  Elapsed: ${ELAPSED}ms"
+if [ -n "$P99" ]; then
+    echo "  Latency: p50=${P50}ms p95=${P95}ms p99=${P99}ms (load ${LOAD_MS}ms, ${PEAK_RSS}MB)"
+fi
 echo "=========================================="
 echo "  Results saved to: $OUTDIR/"
 echo "=========================================="
+
+if [ "$LATENCY_FAILED" = "1" ]; then
+    echo "ERROR: 変換レイテンシが悪化しました ($OUTDIR/latency.json)" >&2
+    exit 1
+fi
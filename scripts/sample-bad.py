@@ -2,11 +2,18 @@
 """bad-filtered.txt からランダムサンプルを抽出する。
 
 Usage:
-    python3 scripts/sample-bad.py [N] [--exclude FILE...]
+    python3 scripts/sample-bad.py [N] [--exclude FILE...] [--seed S]
+                                  [--stratify] [--quota CLASS=K...]
 
 引数:
     N               サンプル数（デフォルト: 100）
     --exclude FILE  除外する過去のサンプルファイル（複数指定可）
+    --seed S        乱数シード（同じシードなら同じサンプル）
+    --stratify      誤変換の種類 (segmentation, kana_kanji, homophone, other) ごとに
+                    均等に抽出する
+    --quota CLASS=K 種類ごとの件数（--stratify 時。指定のない種類は残りを均等に割る）
+
+候補は全件をメモリに載せず、リザーバサンプリングで抽出する。
 
 出力:
     /tmp/bad-sample-{N}.txt にサンプルを保存
@@ -14,81 +21,77 @@ Usage:
 
 import argparse
 import os
-import random
-import re
 import sys
 
+from akaza_tools.cache import open_cache, read_eval_records
+from akaza_tools.filtering import BadFilter, filtered_bad_path
+from akaza_tools.filterstore import load_filter_store
+from akaza_tools.patterns import CONFUSION_CLASSES, ConfusionClassifier
+from akaza_tools.records import find_latest_evaluate_dir, read_records
+from akaza_tools.sampling import BadSampler, load_exclude_readings, write_sample
+
+
+def parse_quota(value):
+    name, sep, count = value.partition('=')
+    if not sep or name not in CONFUSION_CLASSES or not count.isdigit():
+        raise argparse.ArgumentTypeError(
+            f'CLASS=K の形式で指定してください (CLASS: {", ".join(CONFUSION_CLASSES)})')
+    return name, int(count)
+
 
 def main():
     parser = argparse.ArgumentParser(description='bad-filtered.txt からランダムサンプルを抽出')
     parser.add_argument('n', nargs='?', type=int, default=100, help='サンプル数')
     parser.add_argument('--exclude', nargs='*', default=[], help='除外する過去サンプルファイル')
     parser.add_argument('--seed', type=int, default=None, help='乱数シード')
+    parser.add_argument('--stratify', action='store_true', help='誤変換の種類ごとに層別抽出')
+    parser.add_argument('--quota', type=parse_quota, action='append', default=[],
+                        help='種類ごとの件数 (CLASS=K, 複数指定可)')
     args = parser.parse_args()
-
-    if args.seed is not None:
-        random.seed(args.seed)
+    if args.quota and not args.stratify:
+        parser.error('--quota は --stratify と一緒に指定してください')
 
     # 最新の evaluate ディレクトリを探す
-    eval_base = 'tmp/evaluate'
-    dirs = sorted(d for d in os.listdir(eval_base)
-                  if os.path.isdir(os.path.join(eval_base, d)) and d.startswith('2'))
-    if not dirs:
-        print('ERROR: evaluate ディレクトリが見つかりません', file=sys.stderr)
-        sys.exit(1)
-    eval_dir = os.path.join(eval_base, dirs[-1])
-
-    # filter-evaluate を実行して最新の bad-filtered.txt を生成
-    bad_filtered = os.path.join(eval_dir, 'bad-filtered.txt')
-    if not os.path.exists(bad_filtered):
-        print(f'filter-evaluate.py を実行中...', file=sys.stderr)
-        os.system(f'python3 scripts/filter-evaluate.py {eval_dir}')
-
-    if not os.path.exists(bad_filtered):
-        print(f'ERROR: {bad_filtered} が見つかりません', file=sys.stderr)
-        sys.exit(1)
+    eval_dir = find_latest_evaluate_dir()
+    store = load_filter_store()
 
     # 除外 reading を収集
-    exclude_readings = set()
-    for excl_file in args.exclude:
-        if not os.path.exists(excl_file):
-            continue
-        with open(excl_file) as f:
-            for line in f:
-                m = re.match(r'\[BAD\]\s+(.+?)\s+=>', line.strip())
-                if m:
-                    exclude_readings.add(m.group(1))
-
+    exclude_readings = load_exclude_readings(args.exclude)
     # accept.tsv の reading も除外（既に処理済み）
-    accept_path = 'evaluate-filter/accept.tsv'
-    if os.path.exists(accept_path):
-        with open(accept_path) as f:
-            for line in f:
-                if line.startswith('#') or not line.strip():
-                    continue
-                parts = line.split('\t')
-                if parts:
-                    exclude_readings.add(parts[0])
-
-    # 候補を収集
-    candidates = []
-    with open(bad_filtered) as f:
-        for line in f:
-            line = line.strip()
-            m = re.match(r'\[BAD\]\s+(.+?)\s+=>', line)
-            if m and m.group(1) not in exclude_readings:
-                candidates.append(line)
-
-    n = min(args.n, len(candidates))
-    sample = random.sample(candidates, n)
-
-    outfile = f'/tmp/bad-sample-{n}.txt'
-    with open(outfile, 'w') as f:
-        for s in sample:
-            f.write(s + '\n')
-
-    print(f'Sampled {n} from {len(candidates)} candidates '
+    exclude_readings |= store.accepted_readings
+
+    if args.stratify:
+        sampler = BadSampler(exclude_readings, args.n, args.seed,
+                             classify=ConfusionClassifier().classify,
+                             quotas=dict(args.quota) or None)
+    else:
+        sampler = BadSampler(exclude_readings, args.n, args.seed)
+    bad_filtered = filtered_bad_path(eval_dir)
+    if os.path.exists(bad_filtered):
+        for record in read_records(bad_filtered, statuses=('BAD',)):
+            sampler.feed(record)
+    else:
+        # bad-filtered.txt がなければ results.cache か bad.txt をフィルタしながら候補を集める
+        bad_file = os.path.join(eval_dir, 'bad.txt')
+        if open_cache(eval_dir) is None and not os.path.exists(bad_file):
+            print(f'ERROR: {eval_dir} に results.cache も bad.txt もありません', file=sys.stderr)
+            sys.exit(1)
+        print(f'{eval_dir} の BAD をフィルタ中...', file=sys.stderr)
+        bad_filter = BadFilter(store)
+        for record in read_eval_records(eval_dir, statuses=('BAD',)):
+            if bad_filter.feed(record):
+                sampler.feed(record)
+        bad_filter.write(bad_filtered)
+
+    strata = sampler.sample(CONFUSION_CLASSES if args.stratify else None)
+    sample = [record for records in strata.values() for record in records]
+    outfile = write_sample(sample)
+
+    print(f'Sampled {len(sample)} from {sampler.seen} candidates '
           f'(excluded {len(exclude_readings)} readings)', file=sys.stderr)
+    if args.stratify:
+        for name, reservoir in sorted(sampler.reservoirs.items()):
+            print(f'  {name}: {len(strata.get(name, []))} / {reservoir.seen}', file=sys.stderr)
     print(f'Saved to: {outfile}', file=sys.stderr)
     print(outfile)
 
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""learn-corpus の delta・エポック数をスイープし、設定ごとの評価結果を表にする。
+
+Usage:
+    python3 scripts/sweep-learn.py [--delta 1000,2000,4000] [--may-epochs ...]
+                                   [--should-epochs ...] [--must-epochs 1000,10000]
+                                   [--random N] [--seed S] [--jobs J] [--eval-jobs E]
+                                   [--no-abandon] [--keep-models] [--corpus-dir DIR]
+
+各パラメータはカンマ区切りの値の一覧で、省略時は Makefile の既定値のみ。
+全組み合わせ (--random N なら N 個をランダムに選ぶ) について
+tmp/sweep/<timestamp>/<設定名>/ でモデルを学習し、シャードに分けて evaluate する。
+結果は tmp/sweep/<timestamp>/results.tsv に、終わった設定から追記される。
+
+最良の設定より明らかに Bad 率の高い設定は、評価の途中で打ち切る (--no-abandon で無効)。
+学習には --corpus-dir (既定: training-corpus) の must/should/may.txt を使う。
+事前に make data/SKK-JISYO.akaza work/corpus-stats/_SUCCESS が必要。
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+from akaza_tools.aggregate import tier_corpora
+from akaza_tools.sweep import DEFAULTS, Sweep, check_inputs, grid, remove_shards, sample_configs
+
+
+def int_list(value: str) -> list[int]:
+    try:
+        return [int(v) for v in value.split(",") if v]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"カンマ区切りの整数で指定してください: {value!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="learn-corpus のハイパーパラメータのスイープ")
+    for name, default in DEFAULTS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int_list, default=[default],
+                            help=f"値の一覧 (既定: {default})")
+    parser.add_argument("--random", type=int, default=None, help="グリッドから N 個を選ぶ")
+    parser.add_argument("--seed", type=int, default=None, help="--random の乱数シード")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="並行して学習する設定の数")
+    parser.add_argument("--eval-jobs", type=int, default=None,
+                        help="設定ごとの evaluate の並列数 (既定: nproc / jobs)")
+    parser.add_argument("--abandon-z", type=float, default=3.0,
+                        help="打ち切りに使う Bad 率の信頼区間の幅 (標準誤差の倍数)")
+    parser.add_argument("--no-abandon", action="store_true", help="途中での打ち切りをしない")
+    parser.add_argument("--keep-models", action="store_true", help="評価後もモデルを残す")
+    parser.add_argument("--corpus-dir", default="training-corpus",
+                        help="学習に使うコーパスのディレクトリ (Makefile の CORPUS_DIR)")
+    parser.add_argument("--out", default=None, help="出力先 (既定: tmp/sweep/<timestamp>)")
+    args = parser.parse_args()
+
+    training_corpora = tier_corpora(args.corpus_dir)
+    missing = check_inputs(training_corpora)
+    if missing:
+        print(f"ERROR: 必要なファイルがありません: {', '.join(missing)}", file=sys.stderr)
+        sys.exit(1)
+
+    values = {name: getattr(args, name) for name in DEFAULTS}
+    configs = (sample_configs(values, args.random, random.Random(args.seed))
+               if args.random else grid(values))
+    eval_jobs = args.eval_jobs or max(1, (os.cpu_count() or 1) // args.jobs)
+    out_dir = Path(args.out or f"tmp/sweep/{time.strftime('%Y%m%d%H%M')}")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    log = lambda msg: print(msg, file=sys.stderr)
+    log(f"{len(configs)} configs, jobs={args.jobs}, eval-jobs={eval_jobs} → {out_dir}")
+
+    sweep = Sweep(out_dir, eval_jobs, abandon_z=None if args.no_abandon else args.abandon_z,
+                  keep_models=args.keep_models, training_corpora=training_corpora, log=log)
+    results = sweep.run(configs, args.jobs)
+    remove_shards(out_dir)
+
+    print(f"{'config':<36} {'status':<9} {'good':>6} {'top5':>6} {'bad':>6} "
+          f"{'bad%':>6} {'recall':>7} {'train':>6} {'eval':>5}")
+    for r in sorted(results, key=lambda r: (r.status != "done", r.bad_rate)):
+        s = r.summary
+        stats = (f"{s.good:>6} {s.top5:>6} {s.bad:>6} {r.bad_rate * 100:>6.2f} {s.recall:>7.4f}"
+                 if s else f"{'':>6} {'':>6} {'':>6} {'':>6} {'':>7}")
+        print(f"{r.config.name:<36} {r.status:<9} {stats} {r.train_s:>5.0f}s {r.evaluate_s:>4.0f}s")
+    print(f"\nResults: {out_dir / 'results.tsv'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""複数の文をまとめて akaza-data tokenize-line でコーパス形式にする。
+
+Usage:
+    python3 scripts/tokenize-batch.py [FILE...] [--column N] [--jobs J] [--no-cache]
+
+FILE (省略時は stdin) の各行を tokenize-line にかけ、1行ずつ出力する。
+tokenize-line.sh と違い、辞書の読み込みはワーカーごとに1回だけで、
+一度変換した行は tmp/cache/ のキャッシュから返す。
+
+--column N を指定すると、TSV の N 列目 (1始まり) を変換し、変換結果を
+最後の列に追加した行を出力する。apply-classification.py が書き出す
+/tmp/should-candidates.txt の期待値 (4列目) を検証するときは:
+
+    python3 scripts/tokenize-batch.py --column 4 /tmp/should-candidates.txt
+"""
+
+import argparse
+import fileinput
+import os
+import sys
+
+from akaza_tools.tokenizer import SYSTEM_DIC, BatchTokenizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="tokenize-line のバッチ実行")
+    parser.add_argument("files", nargs="*", help="入力ファイル (省略時は stdin)")
+    parser.add_argument("--column", type=int, default=None, help="変換する TSV の列 (1始まり)")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1,
+                        help="tokenize-line のワーカー数")
+    parser.add_argument("--system-dict", default=SYSTEM_DIC)
+    parser.add_argument("--no-cache", action="store_true", help="キャッシュを使わない")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.system_dict):
+        print(f"ERROR: {args.system_dict} がありません", file=sys.stderr)
+        sys.exit(1)
+
+    rows = [line.rstrip("\n") for line in fileinput.input(args.files)]
+    if args.column is None:
+        texts = rows
+    else:
+        fields = [row.split("\t") for row in rows]
+        texts = [f[args.column - 1] if len(f) >= args.column else "" for f in fields]
+
+    tokenizer = BatchTokenizer(args.system_dict, args.jobs, use_cache=not args.no_cache)
+    for row, tokens in zip(rows, tokenizer.tokenize(texts)):
+        print(f"{row}\t{tokens}" if args.column is not None and row else tokens)
+
+    s = tokenizer.stats
+    print(f"{s.lines} lines: {s.cached} cached, {s.tokenized} tokenized "
+          f"({s.workers} workers)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
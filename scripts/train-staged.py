@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""エポック数の上限を段階的に上げながら learn-corpus で学習し、収束したところで止める。
+
+Usage:
+    python3 scripts/train-staged.py [--delta D] [--must-epochs N] [--start-must-epochs N]
+                                    [--growth G] [--window W] [--corpus-dir DIR] [--out data/]
+                                    [--epoch-pattern RE] [--learn-pattern RE]
+    python3 scripts/train-staged.py --check-log LOG [--*-epochs N] [--epoch-pattern RE] ...
+
+小さい上限 (既定では must は 100 エポック) で学習し、ログから tier ごとの
+エポックごとの補正数を数える。まだ補正数が減っている tier だけ上限を G 倍にして
+学習し直し、すべての tier が収束するか振動し始めたら止める。--*-epochs は
+上限の最大値 (Makefile の既定値)。ログを読み取れなければ最大の上限で学習する。
+
+最後の段階のモデルを --out にコピーするのは、どの tier もログで収束を確かめたか、
+最大の上限で学習した (Makefile と同じ) ときだけ。振動して止めた tier や判定できない
+tier があるとコピーせずに終了する (モデルは --work の下に残る)。
+
+振動している tier では、交互に補正されている文の組 (チャタリング) を表示する。
+must.txt に入れるとコストが上がり続ける組なので、どちらかを should.txt に移すか
+削除を検討する。判定の詳細は akaza_tools/staged.py を参照。
+ログの形式 (akaza_tools/staged.py の EPOCH_RE / LEARN_RE) は実際の learn-corpus の
+出力でまだ確かめていない。--check-log で learn-corpus -v のログを読み、--*-epochs を
+上限として tier ごとのエポック数と補正数を表示して、読み取れるかを確かめられる。
+合わなければ --epoch-pattern / --learn-pattern (1つ目のグループがエポック番号・
+補正された文) で指定する。
+学習には --corpus-dir (既定: training-corpus) の must/should/may.txt を使う。
+事前に make data/SKK-JISYO.akaza work/corpus-stats/_SUCCESS が必要。
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+
+from akaza_tools.aggregate import tier_corpora
+from akaza_tools.staged import (
+    CONVERGED, EPOCH_RE, LEARN_RE, TRAIN_ORDER, LogFormat, StagedTrainer, install_models,
+    parse_log,
+)
+from akaza_tools.sweep import DEFAULTS, Config, check_inputs
+
+START_EPOCHS = {"may": 10, "should": 100, "must": 100}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="収束を見ながら段階的に learn-corpus で学習")
+    parser.add_argument("--delta", type=int, default=DEFAULTS["delta"])
+    for tier in TRAIN_ORDER:
+        parser.add_argument(f"--{tier}-epochs", type=int, default=DEFAULTS[f"{tier}_epochs"],
+                            help="エポック数の上限の最大値")
+        parser.add_argument(f"--start-{tier}-epochs", type=int, default=START_EPOCHS[tier],
+                            help="最初の段階のエポック数の上限")
+    parser.add_argument("--growth", type=int, default=10, help="段階ごとに上限を何倍にするか")
+    parser.add_argument("--window", type=int, default=20, help="振動の判定に使うエポック数")
+    parser.add_argument("--verbosity", default="-vv", help="learn-corpus に渡す -v の数")
+    parser.add_argument("--corpus-dir", default="training-corpus",
+                        help="学習に使うコーパスのディレクトリ (Makefile の CORPUS_DIR)")
+    parser.add_argument("--work", default="work/train")
+    parser.add_argument("--out", default="data/", help="採用したモデルのコピー先")
+    parser.add_argument("--epoch-pattern", type=re.compile, default=EPOCH_RE,
+                        help="エポックの区切りの行の正規表現 (1つ目のグループがエポック番号)")
+    parser.add_argument("--learn-pattern", type=re.compile, default=LEARN_RE,
+                        help="補正された文の行の正規表現 (1つ目のグループが文)")
+    parser.add_argument("--check-log", default=None,
+                        help="学習せずに、このログを読み取れるかだけを確かめる")
+    args = parser.parse_args()
+
+    max_config = Config(args.delta, args.may_epochs, args.should_epochs, args.must_epochs)
+    log_format = LogFormat(args.epoch_pattern, args.learn_pattern)
+    if args.check_log:
+        with open(args.check_log, errors="replace") as f:
+            parsed = parse_log(f, max_config, log_format)
+        if parsed is None:
+            print(f"ERROR: {args.check_log} からエポックを読み取れません", file=sys.stderr)
+            sys.exit(1)
+        for tier, epochs in parsed.items():
+            print(f"{tier:<7} {len(epochs):>6} epochs, corrections "
+                  f"{' '.join(str(len(e)) for e in epochs[-10:])}")
+        return
+
+    corpora = tier_corpora(args.corpus_dir)
+    missing = check_inputs(corpora)
+    if missing:
+        print(f"ERROR: 必要なファイルがありません: {', '.join(missing)}", file=sys.stderr)
+        sys.exit(1)
+
+    start = {tier: getattr(args, f"start_{tier}_epochs") for tier in TRAIN_ORDER}
+    trainer = StagedTrainer(args.work, max_config, start, args.growth, args.window,
+                            args.verbosity, corpora, log_format,
+                            log=lambda msg: print(msg, file=sys.stderr))
+    try:
+        stages = trainer.run()
+    except subprocess.CalledProcessError as e:
+        print(f"ERROR: learn-corpus が失敗しました (exit {e.returncode})", file=sys.stderr)
+        sys.exit(1)
+
+    final = stages[-1]
+    print(f"{'tier':<7} {'status':<11} {'epochs':>13}")
+    for t in final.tiers.values():
+        print(f"{t.tier:<7} {t.status:<11} {t.epochs:>6}/{t.cap:<6}")
+        if t.status == CONVERGED:
+            continue
+        for a, b in t.pairs:
+            print(f"  chattering: {a}\n              {b}")
+        paired = {line for pair in t.pairs for line in pair}
+        for line in t.recurring:
+            if line not in paired:
+                print(f"  recurring:  {line}")
+
+    ran = sum(t.epochs for stage in stages for t in stage.tiers.values())
+    print(f"\n{len(stages)} stages, {ran} epochs in total")
+    unverified = trainer.unverified_tiers(final)
+    if unverified:
+        print(f"ERROR: {', '.join(unverified)} の収束を確かめられなかったので "
+              f"{args.out} には入れません (モデル: {final.model_dir})", file=sys.stderr)
+        sys.exit(1)
+    install_models(final.model_dir, args.out)
+    print(f"Installed {final.model_dir} → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,63 +1,280 @@
 #!/usr/bin/env python3
-"""Validate corpus and dict/SKK-JISYO.akaza formats."""
+"""Validate corpus and dict/SKK-JISYO.akaza formats.
 
-import sys
+Files are read line by line in byte-range chunks spread across a process
+pool, so multi-hundred-MB generated corpora can be checked quickly.
+
+Format errors always fail. The deeper checks below are reported as warnings
+(errors with --strict):
+
+- duplicate sentences within or across must/should/may
+- readings containing characters other than kana (digits and symbols that
+  also appear in the surface are allowed)
+- tokens whose surface cannot be built from the reading with SKK dictionary
+  entries and kana (only when skk-dev-dict/SKK-JISYO.L is available)
+
+Usage:
+    python3 scripts/validate.py [--jobs N] [--strict] [--no-segmentation] [CORPUS...]
+"""
+
+import argparse
+import hashlib
+import os
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+ROOT = Path(__file__).resolve().parent.parent
+TIERS = ("must", "should", "may")
+CHUNK_BYTES = 32 << 20
+
+SKK_LINE_RE = re.compile(r"^[^ ]+ /.+/$")
+KANA_RE = re.compile(r"[ぁ-ゖー]+")
+# Characters allowed in a reading besides kana, as long as the surface has them too
+PASSTHROUGH_RE = re.compile(r"[0-9０-９]")
+
+# reading -> candidate surfaces, loaded once per worker process
+_skk_entries: dict[str, set[str]] = {}
+_skk_max_len = 0
+
+
+def _katakana_to_hiragana(text: str) -> str:
+    return "".join(chr(ord(c) - 0x60) if "ァ" <= c <= "ヶ" else c for c in text)
+
+
+def load_skk_entries(paths: list[tuple[Path, str]]) -> None:
+    """Load SKK dictionaries (path, encoding) into the per-process table.
+
+    Okuri-ari entries (e.g. "きm /決/") are indexed by their stem reading;
+    the okurigana that follows is matched as plain kana.
+    """
+    global _skk_max_len
+    for path, encoding in paths:
+        with path.open(encoding=encoding, errors="replace") as f:
+            for line in f:
+                if line.startswith(";;"):
+                    continue
+                reading, sep, cands = line.rstrip("\n").partition(" /")
+                if not sep:
+                    continue
+                if reading and reading[-1].isascii() and reading[-1].isalpha():
+                    reading = reading[:-1]
+                if not reading:
+                    continue
+                entry = _skk_entries.setdefault(reading, set())
+                for cand in cands.split("/"):
+                    cand = cand.split(";", 1)[0]
+                    if cand:
+                        entry.add(cand)
+                _skk_max_len = max(_skk_max_len, len(reading))
+
+
+def segmentable(surface: str, reading: str) -> bool:
+    """Whether the surface can be spelled from the reading with SKK entries and kana."""
+    if not _skk_entries:
+        return True
+    surface_kana = _katakana_to_hiragana(surface)
+    reachable = {(0, 0)}
+    stack = [(0, 0)]
+    while stack:
+        i, j = stack.pop()
+        if i == len(surface) and j == len(reading):
+            return True
+        nexts = []
+        if i < len(surface) and j < len(reading) and surface_kana[i] == reading[j]:
+            nexts.append((i + 1, j + 1))
+        for n in range(1, min(_skk_max_len, len(reading) - j) + 1):
+            for cand in _skk_entries.get(reading[j:j + n], ()):
+                if surface.startswith(cand, i):
+                    nexts.append((i + len(cand), j + n))
+        for state in nexts:
+            if state not in reachable:
+                reachable.add(state)
+                stack.append(state)
+    return False
+
+
+def check_token(token: str, segmentation: bool) -> tuple[list[str], list[str]]:
+    """Return (errors, warnings) for one surface/reading token."""
+    if "/" not in token:
+        return [f"token missing '/': {token!r}"], []
+    if token.count("/") != 1:
+        return [f"token has multiple '/': {token!r}"], []
+    surface, reading = token.split("/")
+    errors = []
+    if not surface:
+        errors.append(f"empty surface in token: {token!r}")
+    if not reading:
+        errors.append(f"empty reading in token: {token!r}")
+    if errors:
+        return errors, []
+
+    warnings = []
+    rest = KANA_RE.sub("", reading)
+    bad = [c for c in rest if not (PASSTHROUGH_RE.match(c) or c in surface)]
+    if bad:
+        warnings.append(f"reading has non-kana characters {''.join(bad)!r}: {token!r}")
+    elif segmentation and surface != reading and not segmentable(surface, reading):
+        warnings.append(f"reading cannot be segmented against SKK dictionary: {token!r}")
+    return errors, warnings
+
+
+def _iter_chunk_lines(path: Path, start: int, end: int):
+    """Yield (relative line number, decoded line or None) for one byte range."""
+    with path.open("rb") as f:
+        f.seek(start)
+        pos = start
+        lineno = 0
+        while pos < end:
+            raw = f.readline()
+            if not raw:
+                break
+            pos += len(raw)
+            lineno += 1
+            try:
+                yield lineno, raw.decode("utf-8").rstrip("\r\n")
+            except UnicodeDecodeError:
+                yield lineno, None
+
 
-def validate_corpus(path: Path) -> list[str]:
-    """Validate corpus file format.
+def validate_corpus_chunk(path: Path, start: int, end: int, segmentation: bool):
+    """Validate corpus lines in [start, end).
 
     Expected: space-separated 漢字/よみ tokens per line.
     Lines starting with ;; are comments.
+
+    Returns (n_lines, errors, warnings, first_seen, repeats) with line numbers
+    relative to the chunk. first_seen maps each sentence digest to its first
+    line; repeats lists (line, digest) for later occurrences in the chunk.
     """
-    errors = []
-    for lineno, line in enumerate(path.read_text().splitlines(), 1):
+    errors, warnings = [], []
+    first_seen: dict[bytes, int] = {}
+    repeats: list[tuple[int, bytes]] = []
+    n_lines = 0
+    for lineno, line in _iter_chunk_lines(path, start, end):
+        n_lines = lineno
+        if line is None:
+            errors.append((lineno, 0, "invalid UTF-8"))
+            continue
         if not line or line.startswith(";;"):
             continue
-        tokens = line.split(" ")
-        for token in tokens:
-            if "/" not in token:
-                errors.append(f"{path}:{lineno}: token missing '/': {token!r}")
-            elif token.count("/") != 1:
-                errors.append(f"{path}:{lineno}: token has multiple '/': {token!r}")
-            else:
-                surface, reading = token.split("/")
-                if not surface:
-                    errors.append(f"{path}:{lineno}: empty surface in token: {token!r}")
-                if not reading:
-                    errors.append(f"{path}:{lineno}: empty reading in token: {token!r}")
-    return errors
+        col = 1
+        for token in line.split(" "):
+            token_errors, token_warnings = check_token(token, segmentation)
+            errors.extend((lineno, col, e) for e in token_errors)
+            warnings.extend((lineno, col, w) for w in token_warnings)
+            col += len(token) + 1
+        digest = hashlib.blake2b(line.encode(), digest_size=8).digest()
+        if digest in first_seen:
+            repeats.append((lineno, digest))
+        else:
+            first_seen[digest] = lineno
+    return n_lines, errors, warnings, first_seen, repeats
 
 
-def validate_skk_dict(path: Path) -> list[str]:
-    """Validate SKK dictionary format.
+def validate_skk_chunk(path: Path, start: int, end: int):
+    """Validate SKK dictionary lines in [start, end).
 
     Expected: よみ /候補1/候補2/.../
     Lines starting with ;; are comments.
     """
     errors = []
-    pattern = re.compile(r"^[^ ]+ /.+/$")
-    for lineno, line in enumerate(path.read_text().splitlines(), 1):
-        if not line or line.startswith(";;"):
-            continue
-        if not pattern.match(line):
-            errors.append(f"{path}:{lineno}: invalid format: {line!r}")
-    return errors
+    n_lines = 0
+    for lineno, line in _iter_chunk_lines(path, start, end):
+        n_lines = lineno
+        if line is None:
+            errors.append((lineno, 0, "invalid UTF-8"))
+        elif line and not line.startswith(";;") and not SKK_LINE_RE.match(line):
+            errors.append((lineno, 0, f"invalid format: {line!r}"))
+    return n_lines, errors
+
+
+def split_chunks(path: Path, chunk_bytes: int = CHUNK_BYTES) -> list[tuple[int, int]]:
+    """Split a file into byte ranges that start at line boundaries."""
+    size = path.stat().st_size
+    bounds = [0]
+    with path.open("rb") as f:
+        while bounds[-1] + chunk_bytes < size:
+            f.seek(bounds[-1] + chunk_bytes)
+            f.readline()
+            if f.tell() >= size:
+                break
+            bounds.append(f.tell())
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _tier_order(path: Path) -> tuple[int, str]:
+    return (TIERS.index(path.stem) if path.stem in TIERS else len(TIERS), str(path))
+
+
+def _format(path: Path, lineno: int, col: int, message: str) -> str:
+    return f"{path}:{lineno}:{col}: {message}" if col else f"{path}:{lineno}: {message}"
 
 
 def main() -> int:
-    root = Path(__file__).resolve().parent.parent
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("corpora", nargs="*", type=Path,
+                        help="corpus files (default: training-corpus/*.txt)")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--strict", action="store_true", help="treat warnings as errors")
+    parser.add_argument("--no-segmentation", action="store_true",
+                        help="skip the SKK dictionary segmentation check")
+    args = parser.parse_args()
+
+    corpora = sorted(args.corpora or ROOT.glob("training-corpus/*.txt"), key=_tier_order)
+    skk = ROOT / "dict" / "SKK-JISYO.akaza"
+    skk_large = ROOT / "skk-dev-dict" / "SKK-JISYO.L"
+    segmentation = not args.no_segmentation and skk_large.exists()
+    if not args.no_segmentation and not segmentation:
+        print(f"note: {skk_large.relative_to(ROOT)} not found, "
+              f"skipping segmentation check", file=sys.stderr)
+    skk_paths = [(skk_large, "euc-jp")] + ([(skk, "utf-8")] if skk.exists() else [])
+
     errors: list[str] = []
+    warnings: list[str] = []
+    initializer, initargs = (load_skk_entries, (skk_paths,)) if segmentation else (None, ())
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=initializer,
+                             initargs=initargs) as pool:
+        corpus_jobs = [(path, [pool.submit(validate_corpus_chunk, path, start, end, segmentation)
+                               for start, end in split_chunks(path)])
+                       for path in corpora]
+        skk_jobs = ([pool.submit(validate_skk_chunk, skk, start, end)
+                     for start, end in split_chunks(skk)] if skk.exists() else [])
+
+        # Chunks are merged in file order, so a duplicate is reported on the
+        # lower tier (must < should < may) and on the later line.
+        seen: dict[bytes, str] = {}
+        for path, futures in corpus_jobs:
+            offset = 0
+            for future in futures:
+                n_lines, chunk_errors, chunk_warnings, first_seen, repeats = future.result()
+                errors.extend(_format(path, offset + n, col, m) for n, col, m in chunk_errors)
+                warnings.extend(_format(path, offset + n, col, m) for n, col, m in chunk_warnings)
+                duplicates = []
+                for digest, n in first_seen.items():
+                    if digest in seen:
+                        duplicates.append((n, seen[digest]))
+                    else:
+                        seen[digest] = f"{path}:{offset + n}"
+                duplicates.extend((n, seen[digest]) for n, digest in repeats)
+                for n, first in sorted(duplicates):
+                    warnings.append(_format(path, offset + n, 0,
+                                            f"duplicate sentence (first at {first})"))
+                offset += n_lines
 
-    for corpus in sorted(root.glob("training-corpus/*.txt")):
-        errors.extend(validate_corpus(corpus))
+        offset = 0
+        for future in skk_jobs:
+            n_lines, chunk_errors = future.result()
+            errors.extend(_format(skk, offset + n, col, m) for n, col, m in chunk_errors)
+            offset += n_lines
 
-    skk = root / "dict" / "SKK-JISYO.akaza"
-    if skk.exists():
-        errors.extend(validate_skk_dict(skk))
+    if args.strict:
+        errors, warnings = errors + warnings, []
 
+    for w in warnings:
+        print(f"warning: {w}", file=sys.stderr)
     for e in errors:
         print(e, file=sys.stderr)
 
@@ -65,7 +282,7 @@ def main() -> int:
         print(f"\n{len(errors)} error(s) found.", file=sys.stderr)
         return 1
 
-    print("All files valid.")
+    print("All files valid." + (f" ({len(warnings)} warning(s))" if warnings else ""))
     return 0
 
 